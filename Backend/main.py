@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form, Depends
+from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form, Depends, Header, Response
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -8,7 +8,6 @@ import base64
 from pathlib import Path
 from docx import Document
 from pydantic import BaseModel
-from groq import Groq
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
@@ -17,6 +16,8 @@ import logging
 import fitz  # PyMuPDF
 from PIL import Image as PILImage
 import io
+import sys
+import asyncio
 import uvicorn
 from sqlalchemy.orm import Session
 
@@ -55,8 +56,34 @@ CHAT_HISTORY_DIR = CHATBOT_DIR / "chat_history"
 # Ensure directories exist
 CHAT_HISTORY_DIR.mkdir(parents=True, exist_ok=True)
 
-# Clients
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Shared chatbot modules live alongside the chatbot backend
+sys.path.append(str(CHATBOT_DIR))
+import llm_client
+import template_cache
+import template_selector
+import template_fields
+import document_ingest
+import extraction_pool
+import ocr
+import image_prep
+from template_registry import get_registry
+import chat_context
+from session_store import get_session_store
+from response_cache import BYPASS_HEADER, bypass_requested, get_response_cache
+from semantic_cache import get_semantic_cache
+from analysis_cache import cache_key, get_analysis_cache
+from document_analysis import ANALYZE_MAX_CHUNKS, all_parts_analysed, analyze_chunks, merge_analyses, parse_json_reply, part_header
+
+session_store = get_session_store()
+template_registry = get_registry()
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm_client.close()
+
+@app.on_event("shutdown")
+def close_extraction_pool():
+    extraction_pool.shutdown()
 
 # Create tables on startup
 try:
@@ -75,6 +102,7 @@ class AIStartRequest(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
+    # Only needed for sessions the server has not stored yet; known sessions are loaded server-side
     history: List[dict] = []
     session_id: str | None = None
 
@@ -82,6 +110,7 @@ class AINextRequest(BaseModel):
     category: str
     filename: str
     messages: List[dict]
+    session_id: str | None = None
 
 class AICompleteRequest(BaseModel):
     category: str
@@ -90,30 +119,36 @@ class AICompleteRequest(BaseModel):
 
 # --- Helper Functions ---
 def load_metadata(category: str, subtype: str | None = None):
-    if subtype:
-        target_path = TEMPLATES_DIR / category / subtype / "metadata.json"
-    else:
-        target_path = TEMPLATES_DIR / category / "metadata.json"
-    
-    if not target_path.exists():
-        logging.error(f"Metadata file not found at expected path: {target_path.absolute()}")
+    folder = template_registry.folder(category, subtype)
+    if folder is None or (folder["metadata"] is None and not folder["metadata_error"]):
+        logging.error(f"Metadata not found for category='{category}' subtype='{subtype}'")
         raise HTTPException(status_code=404, detail="metadata.json not found")
-    
-    try:
-        with open(target_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="metadata.json is not a valid JSON file")
+    if folder["metadata_error"]:
+        raise HTTPException(status_code=500, detail=folder["metadata_error"])
+    return folder["metadata"]
+
+def resolve_template_path(category: str, filename: str) -> Path | None:
+    """Resolve a "name" or "subtype/name" template reference through the registry."""
+    subtype_path = filename.replace(".docx", "").split("/", 1)
+    if len(subtype_path) == 2:
+        return template_registry.docx_path(category, subtype_path[0], subtype_path[1])
+    return template_registry.docx_path(category, None, subtype_path[0])
 
 # --- Chatbot API Endpoints ---
 
 @app.get("/api/templates/{category}")
 def list_templates(category: str):
-    category_path = TEMPLATES_DIR / category
-    if not category_path.exists() or not category_path.is_dir():
+    if template_registry.folder(category) is None:
         raise HTTPException(status_code=404, detail="Category not found")
-    files = [f.name for f in category_path.glob("*.docx")]
-    return {"templates": files}
+    return {"templates": template_registry.template_names(category)}
+
+@app.get("/api/template/cache/stats")
+def get_template_cache_stats():
+    return template_cache.cache_stats()
+
+@app.get("/api/analyze/stats")
+def get_extraction_pool_stats():
+    return extraction_pool.stats()
 
 @app.get("/api/template")
 def get_template(category: str = Query(...), name: str = Query(...)):
@@ -124,76 +159,119 @@ def get_template(category: str = Query(...), name: str = Query(...)):
         encoded = base64.b64encode(f.read()).decode("utf-8")
     return {"base64": encoded}
 
+async def generate_first_question(template: dict, doc_path: Path) -> str:
+    """Question for the template's first field if it has any, else the precomputed question or the LLM. Starts no form session."""
+    parsed = await asyncio.to_thread(template_cache.get_template, doc_path)
+    if parsed["fields"]:
+        return await template_fields.phrase_question(parsed["key"], parsed["fields"][0])
+
+    if template.get("first_question"):
+        return template["first_question"]
+
+    full_text = parsed["text"]
+    question_prompt = (
+        "You are a professional legal assistant helping a user complete a legal document.\n"
+        "Ask questions one at a time to gather the exact information needed to fill in these blanks."
+    )
+
+    q_response = await llm_client.chat_completion(
+        model=GROQ_MODEL,
+        messages=[{"role": "system", "content": question_prompt}, {"role": "user", "content": full_text}],
+        temperature=0.3,
+        max_tokens=150,
+    )
+    return q_response.choices[0].message.content.strip()
+
+async def start_form_session(doc_path: Path) -> str | None:
+    """Id of a new form session tracking the template's fields, or None if it has none."""
+    parsed = await asyncio.to_thread(template_cache.get_template, doc_path)
+    if not parsed["fields"]:
+        return None
+    form_id, _ = template_fields.form_sessions.create(parsed["key"], parsed["fields"])
+    return form_id
+
 @app.post("/api/ai/start")
-def start_ai_flow(data: AIStartRequest):
+async def start_ai_flow(data: AIStartRequest):
     try:
         templates = load_metadata(data.category, data.subtype)
-        summaries_str = "\n\n".join([f"Title: {t['title']}\nSummary: {t['summary']}\nFilename: {t['filename']}" for t in templates])
-
-        selection_prompt = (
-            "You are an expert legal assistant helping users find the most suitable document template.\n"
-            f"A user described their issue as:\n\n{data.user_input.strip()}\n\n"
-            "Here are the available legal document templates:\n\n"
-            f"{summaries_str}\n\n"
-            "Your task: Select the single most suitable template. Respond ONLY with the filename. If unsure, pick the closest reasonable match."
-        )
+        ranked = template_selector.rank_templates(data.user_input, templates)
+        matched_template = template_selector.confident_choice(ranked)
 
-        response = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[{"role": "user", "content": selection_prompt}],
-            temperature=0.3,
-            max_tokens=60,
-        )
+        question_task = None
 
-        selected_filename = response.choices[0].message.content.strip()
-        matched_template = next((t for t in templates if t["filename"].strip().lower() == selected_filename.lower()), None)
+        # Only ask the LLM when the local ranking is too close to call
         if not matched_template:
-            raise HTTPException(status_code=404, detail="Template match not found")
-
-        doc_filename = f"{selected_filename}.docx"
-        doc_path = (TEMPLATES_DIR / data.category / data.subtype / doc_filename) if data.subtype else (TEMPLATES_DIR / data.category / doc_filename)
+            candidates = [t for _, t in ranked[:5]]
+            summaries_str = "\n\n".join([f"Title: {t['title']}\nSummary: {t['summary']}\nFilename: {t['filename']}" for t in candidates])
+
+            selection_prompt = (
+                "You are an expert legal assistant helping users find the most suitable document template.\n"
+                f"A user described their issue as:\n\n{data.user_input.strip()}\n\n"
+                "Here are the available legal document templates:\n\n"
+                f"{summaries_str}\n\n"
+                "Your task: Select the single most suitable template. Respond ONLY with the filename. If unsure, pick the closest reasonable match."
+            )
 
-        if not doc_path.exists():
+            # Draft first questions for the two likeliest templates while the LLM chooses
+            drafts = {}
+            for t in candidates[:2]:
+                path = template_registry.docx_path(data.category, data.subtype, t["filename"])
+                if path is not None and not t.get("first_question"):
+                    task = asyncio.create_task(generate_first_question(t, path))
+                    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+                    drafts[t["filename"]] = task
+            try:
+                response = await llm_client.chat_completion(
+                    model=GROQ_MODEL,
+                    messages=[{"role": "user", "content": selection_prompt}],
+                    temperature=0.3,
+                    max_tokens=60,
+                )
+                matched_template = template_selector.match_filename(response.choices[0].message.content, candidates)
+            finally:
+                if matched_template:
+                    question_task = drafts.pop(matched_template["filename"], None)
+                for task in drafts.values():
+                    task.cancel()
+
+            if not matched_template:
+                raise HTTPException(status_code=404, detail="Template match not found")
+
+        selected_filename = matched_template["filename"].strip()
+        doc_path = template_registry.docx_path(data.category, data.subtype, selected_filename)
+        if doc_path is None:
             raise HTTPException(status_code=404, detail="Template file not found")
 
-        doc = Document(doc_path)
-        full_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
-        
-        question_prompt = (
-            "You are a professional legal assistant helping a user complete a legal document.\n"
-            "Ask questions one at a time to gather the exact information needed to fill in these blanks."
-        )
-
-        q_response = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[{"role": "system", "content": question_prompt}, {"role": "user", "content": full_text}],
-            temperature=0.3,
-            max_tokens=150,
-        )
+        question = await (question_task or generate_first_question(matched_template, doc_path))
+        # Only the chosen template gets a form session, never a dropped draft
+        form_id = await start_form_session(doc_path)
 
         return {
-            "question": q_response.choices[0].message.content.strip(),
-            "filename": f"{data.subtype}/{selected_filename}" if data.subtype else selected_filename
+            "question": question,
+            "filename": f"{data.subtype}/{selected_filename}" if data.subtype else selected_filename,
+            "session_id": form_id
         }
     except Exception as e:
         logging.exception("Error in /api/ai/start")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/ai/next")
-def ai_next_question(data: AINextRequest):
+async def ai_next_question(data: AINextRequest):
     try:
-        subtype_path = data.filename.split("/", 1)
-        if len(subtype_path) == 2:
-            subfolder, filename = subtype_path
-            file_path = TEMPLATES_DIR / data.category / subfolder / f"{filename}.docx"
-        else:
-            file_path = TEMPLATES_DIR / data.category / f"{data.filename}.docx"
+        form = template_fields.form_sessions.get(data.session_id)
+        if form is not None:
+            answer = next((m.get("content", "") for m in reversed(data.messages) if m.get("role") == "user"), "")
+            follow_up = await template_fields.record_answer(form, answer)
+            return {"reply": follow_up or await template_fields.next_question(form)}
 
-        doc = Document(file_path)
-        template_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+        file_path = resolve_template_path(data.category, data.filename)
+        if file_path is None:
+            raise HTTPException(status_code=404, detail="Template not found")
+
+        template_text = (await asyncio.to_thread(template_cache.get_template, file_path))["text"]
 
         system_prompt = "You are a legal assistant. Ask ONE specific question at a time to fill placeholders. Use __COMPLETE__ if finished."
-        response = groq_client.chat.completions.create(
+        response = await llm_client.chat_completion(
             model=GROQ_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -208,80 +286,227 @@ def ai_next_question(data: AINextRequest):
         logging.exception("Error in /api/ai/next")
         return {"reply": "Error connecting to AI service."}
 
+CHAT_SYSTEM_PROMPT = (
+    "You are Guardian, a Legal Information Assistant for Indian law. "
+    "Provide clear, accurate legal information. Do not give professional legal advice. "
+    "Always include a disclaimer at the end."
+)
+CHAT_DISCLAIMER = "Disclaimer: This response provides general legal information for educational purposes only."
+response_cache = get_response_cache()
+# Paraphrases of answered first turns (see semantic_cache.py); None when turned off
+semantic_cache = get_semantic_cache()
+CHAT_CACHE_NAMESPACE = response_cache.namespace(CHAT_SYSTEM_PROMPT, GROQ_MODEL, 0.4, 1500)
+
+@app.get("/api/chat/cache/stats")
+def get_chat_cache_stats():
+    return {**response_cache.stats(), "semantic": semantic_cache.stats() if semantic_cache else None}
+
+def chat_cache_key(message: str) -> str:
+    return response_cache.key(message, CHAT_CACHE_NAMESPACE)
+
+async def save_chat_history(session_id: str, history: List[dict], new_messages: List[dict]):
+    # The client's history is only stored when the session is not known yet.
+    # SQLite work runs in a thread so it never blocks the event loop (or a stream)
+    await asyncio.to_thread(session_store.append_turn, session_id, new_messages, history=history)
+
+async def resolve_history(data: ChatRequest) -> List[dict]:
+    """History to send to the model: the stored session if known, otherwise the client's (trimmed) history."""
+    if data.session_id and await asyncio.to_thread(session_store.exists, data.session_id):
+        return await chat_context.load_history(session_store, data.session_id)
+    return chat_context.trim_history(data.history)
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
 @app.post("/api/chat")
-def legal_chat(data: ChatRequest):
+async def legal_chat(data: ChatRequest, response: Response,
+                     cache_bypass: str | None = Header(None, alias=BYPASS_HEADER)):
     try:
         session_id = data.session_id or str(uuid.uuid4())
-        system_prompt = (
-            "You are Guardian, a Legal Information Assistant for Indian law. "
-            "Provide clear, accurate legal information. Do not give professional legal advice. "
-            "Always include a disclaimer at the end."
-        )
-
-        response = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[{"role": "system", "content": system_prompt}, *data.history, {"role": "user", "content": data.message}],
-            temperature=0.4,
-            max_tokens=1500,
-        )
+        history = await resolve_history(data)
+
+        async def generate() -> str:
+            completion = await llm_client.chat_completion(
+                model=GROQ_MODEL,
+                messages=[{"role": "system", "content": CHAT_SYSTEM_PROMPT}, *history, {"role": "user", "content": data.message}],
+                temperature=0.4,
+                max_tokens=1500,
+            )
+            reply = completion.choices[0].message.content.strip()
+            if CHAT_DISCLAIMER not in reply:
+                reply += f"\n\n{CHAT_DISCLAIMER}"
+            return reply
 
-        reply = response.choices[0].message.content.strip()
-        disclaimer = "Disclaimer: This response provides general legal information for educational purposes only."
-        if disclaimer not in reply:
-            reply += f"\n\n{disclaimer}"
+        if history:
+            reply = await generate()
+        else:
+            bypass = bypass_requested(cache_bypass)
+            semantic_hit = False
+
+            async def generate_first_turn() -> str:
+                nonlocal semantic_hit
+                if semantic_cache is None:
+                    return await generate()
+                reply, semantic_hit = await semantic_cache.get_or_generate(
+                    CHAT_CACHE_NAMESPACE, data.message, generate, bypass=bypass
+                )
+                return reply
+
+            reply, cache_status = await response_cache.get_or_generate(
+                chat_cache_key(data.message), generate_first_turn, bypass=bypass
+            )
+            response.headers["X-Cache"] = "SEMANTIC" if semantic_hit else cache_status
 
-        # Save History
-        history_file = CHAT_HISTORY_DIR / f"{session_id}.json"
-        with open(history_file, "w", encoding="utf-8") as f:
-            json.dump({
-                "session_id": session_id,
-                "timestamp": datetime.now().isoformat(),
-                "conversation": data.history + [{"role": "user", "content": data.message}, {"role": "assistant", "content": reply}]
-            }, f, indent=2)
+        await save_chat_history(session_id, data.history, [{"role": "user", "content": data.message}, {"role": "assistant", "content": reply}])
 
         return {"reply": reply, "session_id": session_id}
     except Exception as e:
         logging.exception("Error in /api/chat")
         raise HTTPException(status_code=500, detail="Chat service error")
 
+@app.post("/api/chat/stream")
+async def legal_chat_stream(data: ChatRequest, cache_bypass: str | None = Header(None, alias=BYPASS_HEADER)):
+    """Same as /api/chat, but forwards tokens as Server-Sent Events while they are generated."""
+    session_id = data.session_id or str(uuid.uuid4())
+    history = await resolve_history(data)
+    first_turn = not history
+    bypass = bypass_requested(cache_bypass)
+    cached, cache_status = None, "BYPASS" if bypass else "MISS"
+    if first_turn and not bypass:
+        cached = response_cache.get(chat_cache_key(data.message))
+        if cached is not None:
+            cache_status = "HIT"
+        elif semantic_cache is not None:
+            found = await asyncio.to_thread(semantic_cache.get, CHAT_CACHE_NAMESPACE, data.message)
+            if found is not None:
+                cached, cache_status = found[0], "SEMANTIC"
+
+    async def event_stream():
+        yield sse_event({"session_id": session_id})
+        if cached is not None:
+            yield sse_event({"delta": cached})
+            await save_chat_history(session_id, data.history, [{"role": "user", "content": data.message}, {"role": "assistant", "content": cached}])
+            yield sse_event({"done": True, "session_id": session_id})
+            return
+
+        parts = []
+        try:
+            async for delta in llm_client.chat_completion_stream(
+                model=GROQ_MODEL,
+                messages=[{"role": "system", "content": CHAT_SYSTEM_PROMPT}, *history, {"role": "user", "content": data.message}],
+                temperature=0.4,
+                max_tokens=1500,
+            ):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+        except Exception:
+            logging.exception("Error in /api/chat/stream")
+            yield sse_event({"error": "Chat service error"})
+            return
+
+        reply = "".join(parts).strip()
+        if CHAT_DISCLAIMER not in reply:
+            yield sse_event({"delta": f"\n\n{CHAT_DISCLAIMER}"})
+            reply += f"\n\n{CHAT_DISCLAIMER}"
+        if first_turn:
+            response_cache.put(chat_cache_key(data.message), reply)
+            if semantic_cache is not None:
+                await asyncio.to_thread(semantic_cache.put, CHAT_CACHE_NAMESPACE, data.message, reply)
+
+        await save_chat_history(session_id, data.history, [{"role": "user", "content": data.message}, {"role": "assistant", "content": reply}])
+        yield sse_event({"done": True, "session_id": session_id})
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if first_turn:
+        headers["X-Cache"] = cache_status
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=headers,
+    )
+
+ANALYZE_TEXT_LIMIT = 10000
+CHUNK_SEPARATOR = "\x1e"
+TRUNCATION_NOTE = "\n\n[The document is longer than this; the text above is truncated.]"
+# Part of the analysis cache key: bump when the analysis or OCR prompt changes
+ANALYSIS_PROMPT_VERSION = "unified-2"
+analysis_cache = get_analysis_cache()
+
+@app.get("/api/analyze/cache/stats")
+def get_analysis_cache_stats():
+    return analysis_cache.stats()
+
+async def analyze_text(document_text: str) -> dict:
+    analysis_prompt = f"Analyze this legal document text and return ONLY JSON:\n{document_text}"
+    response = await llm_client.chat_completion(
+        model=GROQ_MODEL,
+        messages=[{"role": "system", "content": "You are a legal analyzer. Output JSON only."}, {"role": "user", "content": analysis_prompt}],
+        temperature=0.2,
+        max_tokens=3000,
+    )
+    return parse_json_reply(response.choices[0].message.content)
+
 @app.post("/api/analyze")
 async def analyze_document(file: UploadFile = File(...)):
     try:
-        file_bytes = await file.read()
-        extracted_text = ""
         filename = file.filename.lower()
-
-        if any(filename.endswith(ext) for ext in [".jpg", ".jpeg", ".png", ".webp"]):
-            encoded_image = base64.b64encode(file_bytes).decode("utf-8")
-            response = groq_client.chat.completions.create(
+        is_image = filename.endswith(document_ingest.IMAGE_EXTENSIONS)
+        async with document_ingest.spooled_upload(file) as (upload_path, digest):
+            analysis_key = cache_key(digest, ANALYSIS_PROMPT_VERSION, GROQ_MODEL, ANALYZE_TEXT_LIMIT, ANALYZE_MAX_CHUNKS)
+            cached = analysis_cache.get_analysis(analysis_key)
+            if cached is not None:
+                return JSONResponse(content=cached)
+
+            text_key = cache_key(digest, "image", ANALYSIS_PROMPT_VERSION, GROQ_VISION_MODEL, ocr.OCR_ENGINE) if is_image else cache_key(digest, "chunks", ANALYZE_TEXT_LIMIT, ANALYZE_MAX_CHUNKS)
+            cached_text = analysis_cache.get_text(text_key)
+            chunks = None
+            if cached_text is not None:
+                chunks, truncated = cached_text[0].split(CHUNK_SEPARATOR), cached_text[1]
+            elif is_image:
+                # Local OCR first, vision model as the fallback
+                ocr_text = await extraction_pool.run(ocr.ocr_image_file, upload_path, filename)
+                if ocr_text:
+                    chunks, truncated = [ocr_text[:ANALYZE_TEXT_LIMIT]], len(ocr_text) > ANALYZE_TEXT_LIMIT
+                    analysis_cache.put_text(text_key, chunks[0], truncated)
+                else:
+                    vision_images = await extraction_pool.run(image_prep.prepare_vision_images, upload_path, filename)
+            else:
+                chunks, truncated = await extraction_pool.run(
+                    document_ingest.extract_chunks, upload_path, filename, ANALYZE_TEXT_LIMIT, ANALYZE_MAX_CHUNKS
+                )
+                analysis_cache.put_text(text_key, CHUNK_SEPARATOR.join(chunks), truncated)
+
+        if chunks is None:
+            ocr_prompt = "Extract all text from this legal document image."
+            if len(vision_images) > 1:
+                ocr_prompt += " The page is split into consecutive, slightly overlapping parts; read them in order as one page."
+            response = await llm_client.chat_completion(
                 model=GROQ_VISION_MODEL,
-                messages=[{"role": "user", "content": [{"type": "text", "text": "Extract all text from this legal document image."}, {"type": "image_url", "image_url": {"url": f"data:{file.content_type};base64,{encoded_image}"}}]}],
+                messages=[{"role": "user", "content": [{"type": "text", "text": ocr_prompt}, *[{"type": "image_url", "image_url": {"url": url}} for url in vision_images]]}],
                 max_tokens=2000,
             )
             extracted_text = response.choices[0].message.content.strip()
-        elif filename.endswith(".pdf"):
-            doc = fitz.open(stream=file_bytes, filetype="pdf")
-            extracted_text = "".join([page.get_text() for page in doc])
-            doc.close()
-        elif filename.endswith(".docx"):
-            doc = Document(io.BytesIO(file_bytes))
-            extracted_text = "\n".join([p.text for p in doc.paragraphs])
-        else:
-            extracted_text = file_bytes.decode("utf-8", errors="ignore")
+            if extracted_text:
+                analysis_cache.put_text(text_key, extracted_text)
+            chunks, truncated = [extracted_text], False
 
-        analysis_prompt = f"Analyze this legal document text and return ONLY JSON:\n{extracted_text[:10000]}"
-        response = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[{"role": "system", "content": "You are a legal analyzer. Output JSON only."}, {"role": "user", "content": analysis_prompt}],
-            temperature=0.2,
-            max_tokens=3000,
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[-1].split("```")[0].strip()
-        
-        return JSONResponse(content=json.loads(result_text))
+        complete = True
+        if len(chunks) == 1:
+            result_json = await analyze_text(chunks[0] + (TRUNCATION_NOTE if truncated else ""))
+        else:
+            # Long document: analyse the chunks concurrently and merge the results locally
+            results = await analyze_chunks(chunks, lambda chunk, part, total: analyze_text(part_header(part, total) + chunk))
+            result_json = merge_analyses(results, truncated)
+            if result_json is None:
+                raise HTTPException(status_code=502, detail="Analysis failed for every part of the document")
+            complete = all_parts_analysed(results)
+
+        # A result missing failed parts is served once, not cached: the next upload retries them
+        if complete:
+            analysis_cache.put_analysis(analysis_key, result_json)
+        return JSONResponse(content=result_json)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.exception("Error in /api/analyze")
         raise HTTPException(status_code=500, detail=str(e))
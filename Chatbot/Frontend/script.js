@@ -129,6 +129,9 @@ document.addEventListener('DOMContentLoaded', () => {
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
     }
 
+    // The server keeps the conversation; only the session id is sent back with each message
+    let sessionId = null;
+
     async function sendMessage() {
         const message = chatInput.value.trim();
         if (!message) return;
@@ -153,11 +156,13 @@ document.addEventListener('DOMContentLoaded', () => {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     message: message,
+                    session_id: sessionId,
                     speed: currentSettings.speed,
                     api_key: currentSettings.apiKey
                 }),
             });
             const data = await response.json();
+            if (data.session_id) sessionId = data.session_id;
             messagesContainer.removeChild(loadingDiv);
             addMessage(data.reply, 'bot');
         } catch (error) {
@@ -0,0 +1,243 @@
+"""
+Section retrieval over acts/*.json for questions that name no section.
+
+Build the index offline after the act files change (e.g. after merge_ipc.py):
+
+    python act_search.py            # BM25, plus embeddings if sentence-transformers is installed
+    python act_search.py --no-embeddings
+
+Each section is indexed on its title, legal_text and practical_explanation.
+The BM25 index is stored as flat NumPy arrays (per-term offsets into
+document ids and precomputed BM25 weights), so a query is one vectorised add
+per query term. If the index was built with embeddings and the same model loads
+at query time, BM25 and cosine rankings are combined with reciprocal rank
+fusion; otherwise BM25 alone is used.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+
+from law_retriever import ACTS_DIR, NON_ACT_FILES
+
+INDEX_DIR = "acts_index"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+INDEXED_FIELDS = ("title", "legal_text", "practical_explanation")
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Reciprocal rank fusion constant
+RRF_K = 60
+# Results scoring below this fraction of the best BM25 score are dropped
+RELATIVE_CUTOFF = 0.35
+# Embedding matches below this cosine similarity are dropped
+MIN_SIMILARITY = 0.3
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = set("""
+a an the is are was were be been being am of to in on at by for with from as or and if any
+this that these those it its he she his her him they them their i me my we our you your who
+whom which what when where why how do does did done has have had shall should will would can
+could may might must not no nor so such than then there here into upon under over about after
+before against between during without within also other another same said whoever whatever
+every each all some one person persons thing
+""".split())
+
+_WORD_RE = re.compile(r"[a-z]+|\d+[a-z]?")
+
+
+def _stem(word):
+    for suffix in ("ations", "ation", "ings", "ing", "edly", "ed", "ies", "es", "s", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[:-len(suffix)] + ("y" if suffix == "ies" else "")
+            break
+    # "damage" and "damaged" both become "damag"
+    return word[:-1] if word.endswith("e") and len(word) > 4 else word
+
+
+def tokenize(text):
+    return [_stem(w) for w in _WORD_RE.findall(str(text).lower()) if w not in STOPWORDS]
+
+
+# Everyday words in users' facts -> the statutory words sections use (queries only)
+LAY_TERMS = {
+    "kill": "death murder", "killed": "death murder", "died": "death", "dead": "death",
+    "stole": "theft", "steal": "theft", "stolen": "theft", "snatch": "robbery theft",
+    "loot": "robbery dacoity", "slap": "hurt", "slapped": "hurt", "beat": "hurt", "injury": "hurt",
+    "fractur": "grievous hurt", "lock": "confinement", "locked": "confinement",
+    "threaten": "intimidation", "threat": "intimidation", "blackmail": "extortion",
+    "fake": "counterfeit forge", "bribe": "gratification", "damag": "mischief",
+    "fraud": "cheating", "cheat": "cheating", "harass": "cruelty",
+}
+_LAY_EXPANSIONS = {_stem(k): tokenize(v) for k, v in LAY_TERMS.items()}
+
+
+def query_terms(query):
+    tokens = tokenize(query)
+    return set(tokens).union(*[_LAY_EXPANSIONS.get(t, ()) for t in tokens])
+
+
+def section_text(section_data):
+    return " ".join(str(section_data.get(field) or "") for field in INDEXED_FIELDS)
+
+
+def _load_acts(acts_dir):
+    acts = {}
+    for name in sorted(os.listdir(acts_dir)):
+        if name.endswith(".json") and name not in NON_ACT_FILES:
+            with open(os.path.join(acts_dir, name), "r", encoding="utf-8") as f:
+                acts[name[:-5]] = json.load(f)
+    return acts
+
+
+def _load_embedder(model_name):
+    try:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, device="cpu")
+    except Exception as e:
+        logger.warning(f"Embeddings unavailable ({e}); using BM25 only")
+        return None
+
+
+def build_index(acts_dir=ACTS_DIR, index_dir=INDEX_DIR, embeddings=True):
+    """Build the BM25 (and optionally embedding) index for every act in `acts_dir`."""
+    acts = _load_acts(acts_dir)
+    docs, doc_tokens = [], []
+    for act, sections in acts.items():
+        for section, data in sections.items():
+            if isinstance(data, dict):
+                docs.append([act, section])
+                doc_tokens.append(tokenize(section_text(data)))
+
+    lengths = np.array([len(t) for t in doc_tokens], dtype=np.float32)
+    avg_length = float(lengths.mean()) if len(docs) else 0.0
+    postings = {}
+    for doc_id, tokens in enumerate(doc_tokens):
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            postings.setdefault(token, []).append((doc_id, tf))
+
+    vocab = sorted(postings)
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    doc_ids, weights = [], []
+    for i, term in enumerate(vocab):
+        entries = postings[term]
+        idf = np.log(1 + (len(docs) - len(entries) + 0.5) / (len(entries) + 0.5))
+        for doc_id, tf in entries:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / avg_length)
+            doc_ids.append(doc_id)
+            weights.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+        offsets[i + 1] = len(doc_ids)
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.savez(os.path.join(index_dir, "bm25.npz"), offsets=offsets,
+             doc_ids=np.array(doc_ids, dtype=np.int32), weights=np.array(weights, dtype=np.float32))
+
+    embedding_model = None
+    embeddings_path = os.path.join(index_dir, "embeddings.npy")
+    model = _load_embedder(EMBEDDING_MODEL) if embeddings else None
+    if model is not None:
+        texts = [section_text(acts[act][section]) for act, section in docs]
+        vectors = model.encode(texts, batch_size=64, normalize_embeddings=True, show_progress_bar=False)
+        np.save(embeddings_path, vectors.astype(np.float32))
+        embedding_model = EMBEDDING_MODEL
+    elif os.path.exists(embeddings_path):
+        os.remove(embeddings_path)
+
+    meta = {"docs": docs, "vocab": vocab, "embedding_model": embedding_model, "built_at": time.time()}
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return len(docs), len(vocab), embedding_model
+
+
+class ActIndex:
+    """A built index loaded into memory. search() is thread-safe."""
+
+    def __init__(self, index_dir=INDEX_DIR, use_embeddings=True):
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.docs = [tuple(d) for d in meta["docs"]]
+        self.vocab = {term: i for i, term in enumerate(meta["vocab"])}
+        bm25 = np.load(os.path.join(index_dir, "bm25.npz"))
+        self.offsets, self.doc_ids, self.weights = bm25["offsets"], bm25["doc_ids"], bm25["weights"]
+        self.acts = np.array([act for act, _ in self.docs]) if self.docs else np.array([], dtype=str)
+        self.embeddings = None
+        self._model = None
+        if use_embeddings and meta.get("embedding_model"):
+            self._model = _load_embedder(meta["embedding_model"])
+            if self._model is not None:
+                self.embeddings = np.load(os.path.join(index_dir, "embeddings.npy"))
+        self._lock = threading.Lock()
+
+    def bm25_scores(self, query):
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        for term in query_terms(query):
+            i = self.vocab.get(term)
+            if i is not None:
+                start, end = self.offsets[i], self.offsets[i + 1]
+                # A term's posting list holds each document once, so a plain indexed add is safe
+                scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def search(self, query, k=5, act=None):
+        """[(act, section, score)] best first. `act` restricts results to one act."""
+        scores = self.bm25_scores(query)
+        outside = self.acts != act if act is not None else None
+        if outside is not None:
+            scores[outside] = 0
+        best = float(scores.max()) if len(scores) else 0.0
+        ranked = np.array([], dtype=np.int64)
+        if best > 0:
+            keep = np.flatnonzero(scores >= best * RELATIVE_CUTOFF)
+            ranked = keep[np.argsort(-scores[keep])]
+        if self.embeddings is None:
+            return [(*self.docs[d], round(float(scores[d]), 3)) for d in ranked[:k]]
+
+        with self._lock:
+            vector = self._model.encode(query, normalize_embeddings=True)
+        similarity = self.embeddings @ vector
+        if outside is not None:
+            similarity[outside] = -1
+        depth = k * 4
+        by_vector = [d for d in np.argsort(-similarity)[:depth] if similarity[d] >= MIN_SIMILARITY]
+        bm25_rank = {int(d): r for r, d in enumerate(ranked[:depth])}
+        vector_rank = {int(d): r for r, d in enumerate(by_vector)}
+        fused = {d: 1 / (RRF_K + bm25_rank.get(d, depth)) + 1 / (RRF_K + vector_rank.get(d, depth))
+                 for d in set(bm25_rank) | set(vector_rank)}
+        top = sorted(fused, key=fused.get, reverse=True)[:k]
+        return [(*self.docs[d], round(fused[d], 5)) for d in top]
+
+
+_index = None
+_index_loaded = False
+
+
+def get_act_index():
+    """The index in INDEX_DIR, or None if it has not been built."""
+    global _index, _index_loaded
+    if not _index_loaded:
+        _index_loaded = True
+        if os.path.exists(os.path.join(INDEX_DIR, "meta.json")):
+            _index = ActIndex()
+        else:
+            logger.warning(f"No section index in {INDEX_DIR}/; run `python act_search.py` to build it")
+    return _index
+
+
+def search_sections(question, k=5, act=None):
+    index = get_act_index()
+    return index.search(question, k=k, act=act) if index else []
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    count, terms, model = build_index(embeddings="--no-embeddings" not in sys.argv)
+    print(f"Indexed {count} sections, {terms} terms in {time.perf_counter() - started:.1f}s"
+          f" ({'BM25 + ' + model if model else 'BM25 only'}) -> {INDEX_DIR}/")
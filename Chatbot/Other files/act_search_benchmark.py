@@ -0,0 +1,99 @@
+"""
+Recall and latency of act_search on a labelled set of case-study questions.
+
+Each query lists the IPC sections a lawyer would consider correct; a query
+counts as recalled at k if any of them is in the top k. Run after building
+the index (python act_search.py):
+
+    python act_search_benchmark.py [--no-embeddings]
+
+Needs acts/ipc.json; sections missing from it are left out of the labels.
+"""
+import sys
+import time
+
+import numpy as np
+
+import act_search
+from law_retriever import get_sections
+
+LABELLED_QUERIES = [
+    ("My neighbour killed a man with a knife after an argument", ["302", "300"]),
+    ("He tried to kill me by shooting but I survived", ["307"]),
+    ("Someone stole my mobile phone from my bag", ["379", "378"]),
+    ("A man snatched my chain and threatened me with a knife", ["392", "390"]),
+    ("Five men with weapons looted our house at night", ["395", "391"]),
+    ("My husband and in-laws harass me for dowry and beat me", ["498A"]),
+    ("My sister died within a year of marriage after dowry demands", ["304B"]),
+    ("A seller took money online and never delivered the goods, he cheated me", ["420", "415"]),
+    ("He threatened to kill me and my family", ["506", "503"]),
+    ("My colleague slapped me and caused a minor injury", ["323", "319"]),
+    ("He attacked me with an iron rod and fractured my arm", ["325", "326", "320"]),
+    ("He posted false statements about me that harmed my reputation", ["500", "499"]),
+    ("Someone forged my signature on a property document", ["465", "463", "467"]),
+    ("My employee took money entrusted to him and used it himself", ["406", "405", "409"]),
+    ("A man entered my house without permission to commit theft", ["454", "442", "441"]),
+    ("He kept me locked in a room for two days", ["342", "340"]),
+    ("A stranger follows me everywhere and keeps messaging me", ["354D"]),
+    ("A man touched a woman inappropriately in the bus", ["354"]),
+    ("He forced her into sexual intercourse without consent", ["376", "375"]),
+    ("My child was taken away from our lawful guardianship", ["363", "361"]),
+    ("They demanded money by threatening to leak photos", ["384", "383"]),
+    ("A driver hit a pedestrian by rash driving and the pedestrian died", ["304A"]),
+    ("Driving rashly on a public road endangering people", ["279"]),
+    ("He damaged my car on purpose", ["427", "425"]),
+    ("They threw acid on her face", ["326A"]),
+    ("A crowd with sticks gathered and rioted in the market", ["147", "146"]),
+    ("He insulted me intentionally to provoke a fight", ["504"]),
+    ("Her husband's cruelty pushed her to commit suicide", ["306", "498A"]),
+    ("He was found printing fake currency notes", ["489A"]),
+    ("A public servant took a bribe", ["161", "171B"]),
+]
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def evaluate(index, queries, label):
+    hits = {1: 0, 3: 0, 5: 0}
+    reciprocal_ranks, latencies = [], []
+    for query, gold in queries:
+        started = time.perf_counter()
+        results = index.search(query, k=5, act="ipc")
+        latencies.append((time.perf_counter() - started) * 1000)
+        ranked = [section.upper() for _, section, _ in results]
+        rank = next((i + 1 for i, section in enumerate(ranked) if section in gold), None)
+        for k in hits:
+            hits[k] += bool(rank and rank <= k)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    n = len(queries)
+    print(f"{label:12s} recall@1={hits[1] / n:.2f}  recall@3={hits[3] / n:.2f}  recall@5={hits[5] / n:.2f}  "
+          f"MRR={sum(reciprocal_ranks) / n:.2f}  latency p50={percentile(latencies, 50):.2f}ms  "
+          f"p95={percentile(latencies, 95):.2f}ms")
+
+
+def main():
+    queries = []
+    for query, gold in LABELLED_QUERIES:
+        known = [sec for sec, data in get_sections("ipc", gold).items() if data]
+        if known:
+            queries.append((query, [sec.upper() for sec in known]))
+    if not queries:
+        print("No labelled sections found in acts/ipc.json")
+        return
+    print(f"{len(queries)} labelled queries ({len(LABELLED_QUERIES) - len(queries)} skipped: sections not in acts/)")
+
+    index = act_search.ActIndex(use_embeddings=False)
+    print(f"Index: {len(index.docs)} sections, {len(index.vocab)} terms")
+    evaluate(index, queries, "BM25")
+    if "--no-embeddings" not in sys.argv:
+        hybrid = act_search.ActIndex(use_embeddings=True)
+        if hybrid.embeddings is not None:
+            evaluate(hybrid, queries, "BM25+vector")
+        else:
+            print("Index has no embeddings; rebuild with sentence-transformers installed for the hybrid numbers")
+
+
+if __name__ == "__main__":
+    main()
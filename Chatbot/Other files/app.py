@@ -4,16 +4,28 @@ import law_retriever
 import section_extractor
 import os
 import google_gemini
+from history_store import get_history_store, new_session_id
+from ollama_backend import warm_up_on_startup
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
+# Load the local model now so the first Detailed Mode question does not wait for it
+warm_up_on_startup()
+
+# Turns shown in the sidebar summary
+SIDEBAR_TURNS = 5
+
+def current_session_id():
+    """The visitor's history id; the cookie holds only this, the turns stay server-side."""
+    # Cookies from before the server-side store carried the whole history
+    session.pop('history', None)
+    if 'sid' not in session:
+        session['sid'] = new_session_id()
+    return session['sid']
 
 @app.route('/')
 def home():
-    if 'history' not in session:
-        session['history'] = []
-    # Keep last 5 for sidebar summary
-    recent_history = session['history'][-5:] if len(session['history']) > 5 else session['history']
+    recent_history = get_history_store().recent(current_session_id(), SIDEBAR_TURNS)
     return render_template('index.html', history=recent_history)
 
 @app.route('/chat', methods=['POST'])
@@ -61,18 +73,14 @@ def chat():
         response_text = llm.guardian_llm(user_input, "acts/ipc.json")
 
     # 3. Update History
-    if 'history' not in session:
-        session['history'] = []
-    
     summary = user_input[:30] + "..." if len(user_input) > 30 else user_input
-    session['history'].append({'summary': summary, 'user': user_input, 'bot': response_text})
-    session.modified = True
+    get_history_store().append(current_session_id(), {'summary': summary, 'user': user_input, 'bot': response_text})
     
     return jsonify({"response": response_text})
 
 @app.route('/clear_history', methods=['POST'])
 def clear_history():
-    session.pop('history', None)
+    get_history_store().clear(current_session_id())
     return jsonify({"status": "success"})
 
 if __name__ == '__main__':
@@ -1,21 +1,207 @@
+import atexit
+import logging
+import queue
 import sqlite3
+import threading
+from concurrent.futures import Future
 
-conn = sqlite3.connect("guardian.db", check_same_thread=False)
-cursor = conn.cursor()
+DB_PATH = "guardian.db"
+# Most rows written in one transaction by the writer thread
+WRITE_BATCH_SIZE = 500
+# Default and largest page returned by get_chat_page
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+def _settle(done, error=None):
+    """Resolve a save's future, unless its caller already cancelled it."""
+    if not done.set_running_or_notify_cancel():
+        return
+    if error is None:
+        done.set_result(None)
+    else:
+        done.set_exception(error)
+
+
+class ChatLog:
+    """
+    The chats table behind a single writer thread. save_chat and
+    save_chats_bulk queue rows; the writer takes everything queued (up to
+    WRITE_BATCH_SIZE rows) and commits it in one transaction, so concurrent
+    writers share commits instead of each paying for one. With wait=True
+    (the default) a save returns once its rows are committed and re-raises
+    the writer's error if the batch failed.
+
+    The database runs in WAL mode, so readers, each on its own per-thread
+    connection, never block the writer or each other.
+    """
+
+    def __init__(self, path=DB_PATH, batch_size=WRITE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._closed = False
+        # Held while checking _closed and queueing, so nothing lands behind _STOP
+        self._close_lock = threading.Lock()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS chats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT,
+            answer TEXT
+        )
+        """)
+        conn.commit()
+        self._writer = threading.Thread(target=self._write_loop, args=(conn,), name="chat-log-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        # Safe with WAL: a crash can lose the last commits but never corrupts the file
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # -------------------- Writes --------------------
+    def _write_loop(self, conn):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            count = len(item[0])
+            stop = False
+            # Everything queued while the last batch was committing goes into this one
+            while count < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+                count += len(item[0])
+            try:
+                self._insert(conn, batch)
+                outcomes = [(done, None) for _, done in batch]
+            except Exception:
+                # Retry one save at a time so only the failing one gets the error
+                outcomes = []
+                for item in batch:
+                    try:
+                        self._insert(conn, [item])
+                        outcomes.append((item[1], None))
+                    except Exception as e:
+                        logger.exception(f"Chat log write failed ({len(item[0])} rows)")
+                        outcomes.append((item[1], e))
+            # Futures are settled only here, once every commit is done, so
+            # none of them can be resolved twice
+            for done, error in outcomes:
+                _settle(done, error)
+            if stop:
+                break
+        conn.close()
+
+    def _insert(self, conn, batch):
+        with conn:
+            for rows, _ in batch:
+                conn.executemany("INSERT INTO chats (question, answer) VALUES (?, ?)", rows)
+
+    def save_chats_bulk(self, chats, wait=True):
+        """Queue [(question, answer), ...] to be written together."""
+        rows = [(q, a) for q, a in chats]
+        done = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("Chat log is closed")
+            if not rows:
+                done.set_result(None)
+                return done
+            self._queue.put((rows, done))
+        if wait:
+            done.result()
+        return done
+
+    def save_chat(self, q, a, wait=True):
+        return self.save_chats_bulk([(q, a)], wait=wait)
+
+    def flush(self):
+        """Wait until everything queued so far is committed."""
+        done = Future()
+        with self._close_lock:
+            if self._closed:
+                return
+            self._queue.put(([], done))
+        done.result()
+
+    def close(self):
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._writer.join()
+
+    # -------------------- Reads --------------------
+    def get_chats(self):
+        """Every (question, answer), oldest first. Prefer get_chat_page for large logs."""
+        return self._reader().execute("SELECT question, answer FROM chats ORDER BY id").fetchall()
+
+    def get_chat_page(self, limit=PAGE_SIZE, before_id=None):
+        """
+        Up to `limit` (id, question, answer) rows, newest first. Pass the last
+        id of a page as `before_id` to get the next one; an id range scan on
+        the primary key, so deep pages cost the same as the first.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        if before_id is None:
+            sql, params = "SELECT id, question, answer FROM chats ORDER BY id DESC LIMIT ?", (limit,)
+        else:
+            sql = "SELECT id, question, answer FROM chats WHERE id < ? ORDER BY id DESC LIMIT ?"
+            params = (int(before_id), limit)
+        return self._reader().execute(sql, params).fetchall()
+
+    def count(self):
+        return self._reader().execute("SELECT COUNT(*) FROM chats").fetchone()[0]
+
+
+_chat_log = None
+_chat_log_lock = threading.Lock()
+
+
+def get_chat_log():
+    global _chat_log
+    with _chat_log_lock:
+        if _chat_log is None:
+            _chat_log = ChatLog(DB_PATH)
+            atexit.register(_chat_log.close)
+    return _chat_log
 
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS chats (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    question TEXT,
-    answer TEXT
-)
-""")
-conn.commit()
 
 def save_chat(q, a):
-    cursor.execute("INSERT INTO chats VALUES (NULL, ?, ?)", (q, a))
-    conn.commit()
+    get_chat_log().save_chat(q, a)
+
+
+def save_chats_bulk(chats):
+    get_chat_log().save_chats_bulk(chats)
+
 
 def get_chats():
-    cursor.execute("SELECT question, answer FROM chats")
-    return cursor.fetchall()
+    return get_chat_log().get_chats()
+
+
+def get_chat_page(limit=PAGE_SIZE, before_id=None):
+    return get_chat_log().get_chat_page(limit, before_id)
@@ -0,0 +1,90 @@
+"""
+Insert throughput of the chat log at 1, 8 and 64 concurrent writers:
+
+    python db_benchmark.py [inserts_per_config]     # default 5000
+
+Compares the old pattern (one shared connection, a commit per insert; a
+lock added so it survives concurrent use) with ChatLog.save_chat
+(group commits by the writer thread) and ChatLog.save_chats_bulk.
+Each run uses a fresh database in a temporary directory.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from db import ChatLog
+
+WRITER_COUNTS = (1, 8, 64)
+QUESTION = "What is the punishment for theft under section 379?"
+ANSWER = "Section 379 IPC: imprisonment up to three years, or fine, or both. " * 10
+
+
+class LegacyChatLog:
+    """The previous db.py: shared connection and cursor, commit after every insert."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+        self.cursor.execute("CREATE TABLE IF NOT EXISTS chats (id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT, answer TEXT)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def save_chat(self, q, a):
+        with self.lock:
+            self.cursor.execute("INSERT INTO chats VALUES (NULL, ?, ?)", (q, a))
+            self.conn.commit()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM chats").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def run_writers(writers, total, write):
+    per_writer = total // writers
+    start = threading.Barrier(writers + 1)
+
+    def worker():
+        start.wait()
+        for _ in range(per_writer):
+            write()
+
+    threads = [threading.Thread(target=worker) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    start.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    return per_writer * writers, time.perf_counter() - started
+
+
+def bench(label, make_log, writers, total, bulk=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        log = make_log(os.path.join(tmp, "bench.db"))
+        if bulk:
+            rows = [(QUESTION, ANSWER)] * 50
+            written, seconds = run_writers(writers, total // 50, lambda: log.save_chats_bulk(rows))
+            written *= 50
+        else:
+            written, seconds = run_writers(writers, total, lambda: log.save_chat(QUESTION, ANSWER))
+        stored = log.count()
+        log.close()
+    print(f"{label:26s} writers={writers:3d}  {written / seconds:9.0f} inserts/s  ({stored} rows)")
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    for writers in WRITER_COUNTS:
+        bench("legacy commit-per-insert", LegacyChatLog, writers, total)
+        bench("ChatLog.save_chat", ChatLog, writers, total)
+        bench("ChatLog.save_chats_bulk", ChatLog, writers, total * 10, bulk=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Server-side chat history for app.py.
+
+The Flask session cookie only carries an opaque session id; the turns live
+here, in memory. Each session keeps its last HISTORY_TURNS turns in a ring
+buffer, and at most MAX_SESSIONS sessions are kept, the least recently used
+being dropped first. History does not survive a restart (neither do the
+sessions: app.py signs cookies with a per-process key).
+"""
+import secrets
+import threading
+from collections import OrderedDict, deque
+
+HISTORY_TURNS = 20
+MAX_SESSIONS = 1000
+
+
+def new_session_id():
+    return secrets.token_urlsafe(16)
+
+
+class HistoryStore:
+    """Thread-safe {session id: deque of turns} with LRU eviction over sessions."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, turns=HISTORY_TURNS):
+        self.max_sessions = max_sessions
+        self.turns = turns
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def append(self, session_id, turn):
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                history = self._sessions[session_id] = deque(maxlen=self.turns)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            history.append(turn)
+
+    def recent(self, session_id, n=None):
+        """The session's last `n` turns (all kept turns if None), oldest first."""
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            turns = list(history)
+        if n is None:
+            return turns
+        # turns[-0:] would be every turn
+        return turns[-n:] if n > 0 else []
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    global _store
+    # Under threaded Flask the first requests arrive together; they must share one store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+    return _store
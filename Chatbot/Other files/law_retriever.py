@@ -1,14 +1,109 @@
 import json
+import logging
 import os
+import threading
+import time
+
+ACTS_DIR = "acts"
+# JSON files in ACTS_DIR that are not acts (llm.OVERLAP_RULES_PATH)
+NON_ACT_FILES = {"overlap_rules.json"}
+# How often lookups check whether an act file was added or rewritten (e.g. by merge_ipc.py)
+RELOAD_CHECK_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_section(section_number):
+    """'124a', ' 302 ' -> '124A', '302'"""
+    return str(section_number).strip().upper()
+
+
+class ActStore:
+    """
+    Every acts/<act>.json (except NON_ACT_FILES) parsed once and kept in
+    memory as {act: {section: data}}, so a lookup is two dict lookups instead
+    of a full JSON parse. At most once per RELOAD_CHECK_SECONDS a lookup stats the
+    act files and re-parses the ones whose mtime or size changed. A file that
+    fails to parse (half-written) keeps its previous contents until the next
+    check. Returned section dicts are shared: do not modify them.
+    """
+
+    def __init__(self, acts_dir=ACTS_DIR, reload_check_seconds=RELOAD_CHECK_SECONDS):
+        self.acts_dir = acts_dir
+        self.reload_check_seconds = reload_check_seconds
+        self._acts = {}
+        self._stamps = {}
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _load_act(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {normalize_section(k): v for k, v in data.items()}
+
+    def _refresh(self):
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return
+            try:
+                names = [n for n in os.listdir(self.acts_dir) if n.endswith(".json") and n not in NON_ACT_FILES]
+            except FileNotFoundError:
+                names = []
+            acts = dict(self._acts)
+            stamps = dict(self._stamps)
+            for name in names:
+                act = name[:-5]
+                path = os.path.join(self.acts_dir, name)
+                try:
+                    stat = os.stat(path)
+                    stamp = (stat.st_mtime_ns, stat.st_size)
+                    if stamps.get(act) != stamp:
+                        acts[act] = self._load_act(path)
+                        stamps[act] = stamp
+                except (OSError, ValueError, AttributeError) as e:
+                    logger.warning(f"Could not load {path}, keeping the previous version: {e}")
+            for act in set(acts) - {n[:-5] for n in names}:
+                del acts[act]
+                del stamps[act]
+            # Swapped in whole, so readers never see a partly reloaded store
+            self._acts, self._stamps = acts, stamps
+            self._next_check = time.monotonic() + self.reload_check_seconds
+
+    def get_sections(self, act_name, section_numbers):
+        """{section: data or None} for each requested section, in request order."""
+        if time.monotonic() >= self._next_check:
+            self._refresh()
+        act = self._acts.get(act_name) or {}
+        return {str(s): act.get(normalize_section(s)) for s in section_numbers}
+
+    def get_section(self, act_name, section_number):
+        if time.monotonic() >= self._next_check:
+            self._refresh()
+        act = self._acts.get(act_name)
+        return act.get(normalize_section(section_number)) if act else None
+
+    def acts(self):
+        if time.monotonic() >= self._next_check:
+            self._refresh()
+        return sorted(self._acts)
+
+
+_store = None
+
+
+def get_act_store():
+    global _store
+    if _store is None:
+        _store = ActStore()
+    return _store
+
+
+def get_sections(act_name, section_numbers):
+    return get_act_store().get_sections(act_name, section_numbers)
+
 
 def load_section(act_name, section_number):
     """
     Load a specific section from the act JSON.
     """
-    path = f"acts/{act_name}.json"
-    if not os.path.exists(path):
-        return None
-
-    with open(path, "r", encoding="utf-8") as f:
-        act_data = json.load(f)
-        return act_data.get(str(section_number))
+    return get_act_store().get_section(act_name, section_number)
@@ -1,12 +1,14 @@
-import ollama
 import re
 import json
 import os
+import logging
 
 from prompts import SYSTEM_PROMPT
-from law_classifier import detect_law_type
-from law_retriever import load_section
-from language_utils import detect_language
+from law_retriever import get_sections
+from act_search import search_sections
+from query_analyzer import analyze_query
+from token_budget import estimate_tokens, truncate_to_tokens
+from ollama_backend import get_ollama_backend
 
 # -------------------- Load Overlap Rules --------------------
 OVERLAP_RULES_PATH = "acts/overlap_rules.json"
@@ -16,22 +18,48 @@ if os.path.exists(OVERLAP_RULES_PATH):
 else:
     OVERLAP_RULES = {}
 
+# Candidate sections retrieved for case-study questions
+CASE_STUDY_TOP_K = 3
+
+# Prompt budgets in estimated tokens. llama3 has an 8k context; the rest is left for the answer.
+PROMPT_TOKEN_LIMIT = 6000
+SECTION_CONTEXT_TOKENS = 2500
+DOCUMENT_CONTEXT_TOKENS = 1500
+QUESTION_TOKENS = 1000
+# Legal text kept in a shortened section block
+SHORT_LEGAL_TEXT_TOKENS = 150
+
 # -------------------- Helper Functions --------------------
 def extract_ipc_sections(question: str):
     """Extract IPC section numbers from the question"""
-    return re.findall(r'\b(?:section|ipc)\s*(\d+[A-Za-z]*)', question, re.IGNORECASE)
+    return analyze_query(question).ipc_sections
 
-def format_ipc_context(section_number: str, section_data: dict):
+def linked_sections(section_data: dict, described: set = None):
+    """
+    The section's overlaps as text. Overlaps in `described` (shown in full
+    elsewhere in the prompt, or already explained) are given by number only;
+    the others are added to it.
+    """
+    overlaps = section_data.get("overlaps", [])
+    if not overlaps:
+        return "None"
+    described = set() if described is None else described
+    linked_details = []
+    for o in overlaps:
+        key = str(o['section']).upper()
+        if key in described:
+            linked_details.append(f"{o['section']}")
+        else:
+            linked_details.append(f"{o['section']} ({o['description']})")
+            described.add(key)
+    return ", ".join(linked_details)
+
+def format_ipc_context(section_number: str, section_data: dict, linked_sections_text: str = None):
     """Prepare verified IPC data for LLM"""
     
     # Extract Linked Sections (Overlaps) from ipc.json directly
-    overlaps = section_data.get("overlaps", [])
-    linked_sections_text = "None"
-    if overlaps:
-        linked_details = []
-        for o in overlaps:
-            linked_details.append(f"{o['section']} ({o['description']})")
-        linked_sections_text = ", ".join(linked_details)
+    if linked_sections_text is None:
+        linked_sections_text = linked_sections(section_data)
 
     return f"""
 VERIFIED IPC DATA (DO NOT ALTER):
@@ -50,27 +78,106 @@ Conclusion: {section_data.get('conclusion')}
 Disclaimer: {section_data.get('disclaimer')}
 """
 
-# -------------------- MAIN FUNCTION --------------------
-def guardian_llm(question: str, document_context: str = ""):
+def format_short_ipc_context(section_number: str, section_data: dict):
+    """Title, shortened legal text and punishment only, for sections that do not fit in full"""
+    legal_text = truncate_to_tokens(str(section_data.get('legal_text') or ""), SHORT_LEGAL_TEXT_TOKENS)
+    return f"""
+VERIFIED IPC DATA (DO NOT ALTER, SHORTENED):
+
+IPC Section: {section_number}
+Title: {section_data.get('title')}
+Legal Text: {legal_text}
+Punishment: {section_data.get('punishment')}
+"""
+
+def rank_sections(sections: list):
+    """Unique section numbers, most often mentioned first, then in order of first mention"""
+    counts, first_seen = {}, {}
+    for i, sec in enumerate(sections):
+        key = sec.upper()
+        counts[key] = counts.get(key, 0) + 1
+        first_seen.setdefault(key, i)
+    return sorted(counts, key=lambda key: (-counts[key], first_seen[key]))
+
+def assemble_section_context(sections: dict, budget: int):
     """
-    GUARDIAN Legal AI Core Logic
-    Handles both IPC section questions and case-study / factual scenarios.
+    Pack {section: data or None} (in relevance order) into at most `budget` tokens.
+    Full blocks are used while they fit, then shortened ones; sections that do not
+    fit at all are only named. Returns (context, {"full", "shortened", "named", "missing"}).
     """
+    parts = {"full": [], "shortened": [], "named": [], "missing": []}
+    # Overlaps pointing at a section that has its own block are not described again
+    described = {sec.upper() for sec, data in sections.items() if data}
+    blocks, used = [], 0
+    for sec, section_data in sections.items():
+        if not section_data:
+            block = f"IPC Section {sec} is not in the verified database. Please use your internal knowledge base to answer, but explicitly state that this is a general generation.\n"
+            kind = "missing"
+        else:
+            block = format_ipc_context(sec, section_data, linked_sections(section_data, described))
+            kind = "full"
+            if used + estimate_tokens(block) > budget:
+                block = format_short_ipc_context(sec, section_data)
+                kind = "shortened"
+        cost = estimate_tokens(block)
+        if used + cost > budget:
+            parts["named"].append(sec)
+            continue
+        blocks.append(block)
+        used += cost
+        parts[kind].append(sec)
+    if parts["named"]:
+        blocks.append(f"\nAlso mentioned, verified data left out for length: IPC Sections {', '.join(parts['named'])}\n")
+    return "".join(blocks), parts
 
-    # 1️⃣ Detect law type & language
-    law_type = detect_law_type(question)
-    language = detect_language(question)
+# -------------------- PROMPT ASSEMBLY --------------------
+def build_prompt(question: str, document_context: str = ""):
+    """
+    Messages for the model plus a report of how the prompt was assembled:
+    estimated tokens per part, which sections went in full, shortened or only
+    by name, and (for case studies) the sections the answer may cite.
+    """
 
-    ipc_sections = extract_ipc_sections(question)
+    # 1️⃣ Detect law type, language and cited sections in one pass
+    law_type, language, ipc_sections = analyze_query(question)
     is_case_study = False
+    retrieved_sections = set()
+    section_parts = {}
     context = ""
 
+    # Verified sections get whatever the other parts leave, up to SECTION_CONTEXT_TOKENS
+    question = truncate_to_tokens(question, QUESTION_TOKENS)
+    document_context = truncate_to_tokens(document_context or "", DOCUMENT_CONTEXT_TOKENS)
+    fixed_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(question) + estimate_tokens(document_context) + 150
+    context_budget = max(0, min(SECTION_CONTEXT_TOKENS, PROMPT_TOKEN_LIMIT - fixed_tokens))
+
     # ---------------- IPC HANDLING ----------------
     if law_type == "ipc":
         # ✅ CASE STUDY (No section given)
         if not ipc_sections:
             is_case_study = True
-            context = """
+            candidates = search_sections(question, k=CASE_STUDY_TOP_K, act="ipc")
+            verified = get_sections("ipc", [sec for _, sec, _ in candidates])
+            verified = {sec: data for sec, data in verified.items() if data}
+            if verified:
+                context = """
+CASE STUDY MODE – STRICT RULES APPLY
+
+The verified provisions below were retrieved as possibly relevant to these facts.
+
+INSTRUCTIONS:
+- Refer ONLY to the sections listed below, and only where the facts clearly fit them
+- DO NOT mention any other section numbers
+- DO NOT state punishments beyond the verified data
+- If none of them fits, say so and focus on legal nature, seriousness, and risk
+- Use plain language
+"""
+                section_context, section_parts = assemble_section_context(
+                    verified, context_budget - estimate_tokens(context))
+                context += section_context
+                retrieved_sections = {sec.upper() for sec in section_parts["full"] + section_parts["shortened"]}
+            else:
+                context = """
 CASE STUDY MODE – STRICT RULES APPLY
 
 INSTRUCTIONS:
@@ -83,12 +190,9 @@ INSTRUCTIONS:
 """
         # ✅ IPC SECTION GIVEN
         else:
-            for sec in ipc_sections:
-                section_data = load_section("ipc", sec)
-                if not section_data:
-                    context += f"IPC Section {sec} is not in the verified database. Please use your internal knowledge base to answer, but explicitly state that this is a general generation.\n"
-                else:
-                    context += format_ipc_context(sec, section_data)
+            # One batch lookup in the in-memory act store, deduplicated and ranked
+            sections = get_sections("ipc", rank_sections(ipc_sections))
+            context, section_parts = assemble_section_context(sections, context_budget)
 
     # ---------------- FINAL PROMPT ----------------
     final_prompt = f"""
@@ -116,16 +220,37 @@ Follow the mandatory response structure exactly.
         }
     ]
 
-    response = ollama.chat(
-        model="llama3",
-        messages=messages
-    )
+    report = {
+        "tokens": {
+            "system": estimate_tokens(SYSTEM_PROMPT),
+            "context": estimate_tokens(context),
+            "document": estimate_tokens(document_context),
+            "question": estimate_tokens(question),
+            "total": sum(estimate_tokens(m["content"]) for m in messages),
+            "limit": PROMPT_TOKEN_LIMIT,
+        },
+        "sections": section_parts,
+        "case_study": is_case_study,
+        "retrieved_sections": retrieved_sections,
+    }
+    return messages, report
 
-    output = response["message"]["content"]
+def _prepare(question: str, document_context: str):
+    messages, report = build_prompt(question, document_context)
+    tokens = report["tokens"]
+    logging.info(
+        f"Prompt tokens: system={tokens['system']} context={tokens['context']} document={tokens['document']} "
+        f"question={tokens['question']} total={tokens['total']}/{tokens['limit']} sections={report['sections']}"
+    )
+    return messages, report
 
+def safety_filter(output: str, report: dict):
+    """The model's output, or a generic answer if a case study cites sections it was not given."""
     # ---------------- HARD SAFETY FILTER FOR CASE-STUDY ----------------
-    if is_case_study:
-        if re.search(r'\b(section|ipc)\s*\d+', output, re.IGNORECASE):
+    if report["case_study"]:
+        # Only the retrieved, verified sections may be cited
+        cited = {sec.upper() for sec in re.findall(r'\b(?:section|ipc)\s*(\d+[A-Za-z]*)', output, re.IGNORECASE)}
+        if cited - report["retrieved_sections"]:
             return """
 IPC Section Overview
 No IPC section has been specified.
@@ -151,3 +276,25 @@ This response is for informational purposes only and not legal advice.
 """
 
     return output
+
+# -------------------- MAIN FUNCTION --------------------
+def guardian_llm(question: str, document_context: str = ""):
+    """
+    GUARDIAN Legal AI Core Logic
+    Handles both IPC section questions and case-study / factual scenarios.
+    """
+    messages, report = _prepare(question, document_context)
+    output = get_ollama_backend().chat(messages)
+    return safety_filter(output, report)
+
+def guardian_llm_stream(question: str, document_context: str = ""):
+    """
+    guardian_llm as a generator of text pieces. Case-study answers must pass
+    the safety filter as a whole, so they are generated in full and yielded once.
+    """
+    messages, report = _prepare(question, document_context)
+    backend = get_ollama_backend()
+    if report["case_study"]:
+        yield safety_filter(backend.chat(messages), report)
+        return
+    yield from backend.stream_chat(messages)
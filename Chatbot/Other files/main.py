@@ -1,13 +1,14 @@
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import os
 import logging
 
 # Import the existing logic
-from llm import guardian_llm
+from llm import guardian_llm, guardian_llm_stream
+from ollama_backend import warm_up_on_startup
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +19,11 @@ app = FastAPI()
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.on_event("startup")
+def load_model():
+    # Load the model now so the first question does not wait for it
+    warm_up_on_startup()
+
 # Data model for chat request
 class ChatRequest(BaseModel):
     message: str
@@ -47,5 +53,22 @@ def chat_endpoint(request: ChatRequest):
         logger.error(f"Error processing request: {str(e)}", exc_info=True)
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+# Last chunk of a stream that failed partway, so the client is not left with a dropped connection
+STREAM_ERROR_TEXT = "\n\n[Guardian could not finish this answer. Please try again.]"
+
+def with_error_chunk(pieces):
+    """Pass the pieces through; if generation fails, log it and end with STREAM_ERROR_TEXT."""
+    try:
+        yield from pieces
+    except Exception as e:
+        logger.error(f"Error while streaming response: {str(e)}", exc_info=True)
+        yield STREAM_ERROR_TEXT
+
+@app.post("/chat/stream")
+def chat_stream_endpoint(request: ChatRequest):
+    logger.info(f"Received message (stream): {request.message}")
+    return StreamingResponse(with_error_chunk(guardian_llm_stream(question=request.message, document_context="")),
+                             media_type="text/plain; charset=utf-8")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -6,8 +6,11 @@ def load_json(path):
         return json.load(f)
 
 def save_json(path, data):
-    with open(path, 'w', encoding='utf-8') as f:
+    # Write a temp file and swap it in, so the running app's act store never reads a half-written file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
 
 try:
     # Load main file
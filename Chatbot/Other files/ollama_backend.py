@@ -0,0 +1,107 @@
+"""
+The local Ollama model behind guardian_llm.
+
+One ollama.Client (and so one pooled HTTP connection) is shared by every
+request. Each call passes keep_alive, so Ollama keeps the model loaded
+between requests instead of unloading it after its 5-minute default, and
+num_ctx, so prompts up to llm.PROMPT_TOKEN_LIMIT are not cut to Ollama's
+default context. A semaphore bounds how many generations run at once; the
+rest wait rather than piling onto the model. warm_up() loads the model
+before the first real question.
+
+Settings come from the environment:
+  OLLAMA_HOST             server URL (the ollama client's own default if unset)
+  OLLAMA_MODEL            llama3
+  OLLAMA_KEEP_ALIVE       how long the model stays loaded after a request (30m; -1 = forever)
+  OLLAMA_NUM_CTX          context window in tokens (8192, llama3's full window)
+  OLLAMA_NUM_THREAD       CPU threads for generation (Ollama decides if unset)
+  OLLAMA_MAX_CONCURRENCY  generations in flight at once (2)
+  OLLAMA_TIMEOUT          seconds before a request to Ollama is abandoned (300)
+  OLLAMA_WARMUP           1 to load the model when the app starts (1)
+"""
+import logging
+import os
+import threading
+
+import ollama
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST") or None
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3")
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", "8192"))
+OLLAMA_NUM_THREAD = int(os.environ["OLLAMA_NUM_THREAD"]) if os.environ.get("OLLAMA_NUM_THREAD") else None
+OLLAMA_MAX_CONCURRENCY = int(os.environ.get("OLLAMA_MAX_CONCURRENCY", "2"))
+OLLAMA_TIMEOUT = float(os.environ.get("OLLAMA_TIMEOUT", "300"))
+OLLAMA_WARMUP = os.environ.get("OLLAMA_WARMUP", "1") == "1"
+
+
+def _keep_alive(value):
+    """'30m' stays a duration string; '-1' or '600' become numbers as Ollama expects."""
+    try:
+        return float(value) if "." in str(value) else int(value)
+    except ValueError:
+        return value
+
+
+class OllamaBackend:
+    def __init__(self, host=OLLAMA_HOST, model=OLLAMA_MODEL, keep_alive=OLLAMA_KEEP_ALIVE,
+                 num_ctx=OLLAMA_NUM_CTX, num_thread=OLLAMA_NUM_THREAD,
+                 max_concurrency=OLLAMA_MAX_CONCURRENCY, timeout=OLLAMA_TIMEOUT):
+        self.model = model
+        self.keep_alive = _keep_alive(keep_alive)
+        self.options = {"num_ctx": num_ctx}
+        if num_thread:
+            self.options["num_thread"] = num_thread
+        self.client = ollama.Client(host=host, timeout=timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def chat(self, messages):
+        """The model's full reply to `messages`."""
+        with self._slots:
+            response = self.client.chat(model=self.model, messages=messages,
+                                        options=self.options, keep_alive=self.keep_alive)
+        return response["message"]["content"]
+
+    def stream_chat(self, messages):
+        """Yield the reply in pieces as the model generates it. Holds a slot until the generator is done or closed."""
+        with self._slots:
+            stream = self.client.chat(model=self.model, messages=messages, stream=True,
+                                      options=self.options, keep_alive=self.keep_alive)
+            for chunk in stream:
+                piece = chunk["message"]["content"]
+                if piece:
+                    yield piece
+
+    def warm_up(self):
+        """Load the model into memory (a chat with no messages). False if Ollama is unreachable."""
+        try:
+            self.client.chat(model=self.model, messages=[], options=self.options, keep_alive=self.keep_alive)
+            logging.info(f"Ollama model {self.model} loaded (keep_alive={self.keep_alive})")
+            return True
+        except Exception as e:
+            logging.warning(f"Ollama warm-up for {self.model} failed: {e}")
+            return False
+
+    def warm_up_in_background(self):
+        thread = threading.Thread(target=self.warm_up, name="ollama-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_ollama_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = OllamaBackend()
+    return _backend
+
+
+def warm_up_on_startup():
+    """Start loading the model in the background if OLLAMA_WARMUP is on."""
+    if OLLAMA_WARMUP:
+        return get_ollama_backend().warm_up_in_background()
+    return None
@@ -0,0 +1,127 @@
+"""
+Checks OllamaBackend against a stub HTTP server standing in for Ollama, so
+no model or Ollama install is needed:
+
+    python ollama_backend_check.py
+
+The stub answers /api/chat (plain and streamed NDJSON), records every
+request body, the client port of each TCP connection and the number of
+requests in flight. Prints one line per check and exits non-zero if any fail.
+"""
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ollama_backend import OllamaBackend
+
+REPLY_PIECES = ["Section 379 ", "punishes ", "theft."]
+GENERATION_SECONDS = 0.2
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+    client_ports = set()
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append(body)
+            cls.client_ports.add(self.client_address[1])
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            if self.path != "/api/chat":
+                return self._send(404, b'{"error": "not found"}')
+            if body.get("messages"):
+                time.sleep(GENERATION_SECONDS)
+            base = {"model": body.get("model"), "created_at": "2024-01-01T00:00:00Z"}
+            if not body.get("stream"):
+                content = "".join(REPLY_PIECES) if body.get("messages") else ""
+                reply = {**base, "message": {"role": "assistant", "content": content}, "done": True}
+                return self._send(200, json.dumps(reply).encode())
+            lines = [{**base, "message": {"role": "assistant", "content": p}, "done": False} for p in REPLY_PIECES]
+            lines.append({**base, "message": {"role": "assistant", "content": ""}, "done": True})
+            self._send(200, "".join(json.dumps(line) + "\n" for line in lines).encode(), "application/x-ndjson")
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    @classmethod
+    def reset(cls):
+        cls.requests.clear()
+        cls.client_ports.clear()
+        cls.max_in_flight = 0
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+    messages = [{"role": "user", "content": "What is the punishment for theft?"}]
+    results = []
+
+    def check(name, ok, detail=""):
+        results.append(ok)
+        print(f"{'PASS' if ok else 'FAIL'}  {name}{'  (' + detail + ')' if detail else ''}")
+
+    backend = OllamaBackend(host=host, model="llama3", keep_alive="30m", num_ctx=8192, num_thread=4, max_concurrency=2)
+
+    StubOllama.reset()
+    check("warm-up loads the model", backend.warm_up() and StubOllama.requests[0]["messages"] == [])
+    sent = StubOllama.requests[0]
+    check("keep_alive and options are sent", sent.get("keep_alive") == "30m"
+          and sent.get("options", {}).get("num_ctx") == 8192 and sent["options"].get("num_thread") == 4, json.dumps(sent))
+
+    StubOllama.reset()
+    replies = [backend.chat(messages) for _ in range(5)]
+    check("chat returns the reply", replies == ["".join(REPLY_PIECES)] * 5, repr(replies[0]))
+    check("sequential calls reuse one connection", len(StubOllama.client_ports) == 1,
+          f"{len(StubOllama.client_ports)} connections for 5 requests")
+
+    pieces = list(backend.stream_chat(messages))
+    check("stream_chat yields the pieces in order", pieces == REPLY_PIECES, repr(pieces))
+    check("streaming asks for a stream", StubOllama.requests[-1].get("stream") is True)
+
+    StubOllama.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(lambda _: backend.chat(messages), range(6)))
+    elapsed = time.perf_counter() - started
+    check("at most max_concurrency generations in flight", StubOllama.max_in_flight == 2,
+          f"max in flight {StubOllama.max_in_flight}, 6 calls in {elapsed:.2f}s")
+
+    StubOllama.reset()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        streams = list(pool.map(lambda _: list(backend.stream_chat(messages)), range(3)))
+    check("concurrent streams are bounded too", StubOllama.max_in_flight <= 2 and all(s == REPLY_PIECES for s in streams),
+          f"max in flight {StubOllama.max_in_flight}")
+
+    server.shutdown()
+    server.server_close()
+    offline = OllamaBackend(host=host, timeout=2)
+    check("warm-up with Ollama down returns False", offline.warm_up() is False)
+
+    print(f"{sum(results)}/{len(results)} checks passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
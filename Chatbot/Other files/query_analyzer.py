@@ -0,0 +1,176 @@
+"""
+Single-pass analysis of a user question: law type, language and IPC sections.
+
+One precompiled regex splits the question into section references
+("section 302", "ipc 498A"), Latin words and runs of Indic script (one
+Unicode range, U+0900-U+0D7F, Devanagari to Malayalam; the 128-codepoint
+block of a run's first character gives its script). Other scripts, such as
+Sinhala, are not tokens and so leave the language to the romanized check. Each distinct word is classified once (law
+keyword? romanized marker word?) and the result cached, and keywords feed a
+word-level Aho-Corasick automaton so phrases ("sexual harassment", "it act")
+are found in the same pass. A keyword also matches longer words it starts
+("child" matches "children", "arrest" matches "arrested"), but not words it
+merely occurs inside ("cybercrime" is not a "crime" keyword).
+
+Script detection counts characters per script and picks the dominant one.
+Devanagari is Hindi unless Marathi marker words or the letter ळ outnumber
+Hindi markers. Bengali script containing ৰ or ৱ is Assamese.
+"""
+import re
+from collections import namedtuple
+
+QueryAnalysis = namedtuple("QueryAnalysis", ["law_type", "language", "ipc_sections"])
+
+# (law type, keywords) in priority order: the first law type with a match wins
+LAW_TYPE_KEYWORDS = [
+    ("posco", ["posco", "pocso", "child"]),
+    ("sexual_harassment", ["sexual harassment", "workplace"]),
+    ("ipc", ["ipc", "offence", "crime"]),
+    ("crpc", ["crpc", "arrest", "bail"]),
+    ("cpc", ["cpc", "civil suit"]),
+    ("it_act", ["cyber", "it act"]),
+    ("constitution", ["constitution", "article"]),
+    ("contract_act", ["contract", "agreement"]),
+]
+DEFAULT_LAW_TYPE = "general_law"
+
+ROMANIZED_WORDS = {
+    "Hinglish": frozenset(["kya", "hai", "tum", "main", "mera", "nahi", "kaise", "kahan", "kyun", "ho", "raha", "gaya"]),
+    "Tanglish": frozenset(["enna", "irukku", "vaanga", "sollu", "poi", "adi", "vandhu", "kanna", "thaan", "pudi"]),
+    "TeluguRoman": frozenset(["emi", "cheppu", "vachindi", "chusara", "nenu", "meeru", "ledu"]),
+}
+# At least this many romanized words before the question counts as that language
+ROMANIZED_MIN_WORDS = 2
+
+# Indic Unicode blocks from U+0900, 128 code points each; _TOKEN_RE stops at the last one
+SCRIPT_BLOCKS = ["hi", "bn", "pa", "gu", "or", "ta", "te", "kn", "ml"]
+# Ties between scripts with the same number of characters go to the earlier one
+SCRIPT_PRIORITY = ["hi", "ta", "te", "kn", "ml", "bn", "pa", "gu", "or"]
+# Common words that tell Marathi from Hindi; ळ is also rare in Hindi
+MARATHI_MARKERS = frozenset(["आहे", "नाही", "काय", "आणि", "मला", "तुम्ही", "कसे", "झाले", "होते", "मध्ये", "कायदा", "माझा", "माझी", "माझे"])
+HINDI_MARKERS = frozenset(["है", "नहीं", "क्या", "और", "मुझे", "आप", "कैसे", "हुआ", "था", "में", "कानून", "मेरा", "मेरी", "मेरे"])
+MARATHI_LETTER = "\u0933"  # ळ
+ASSAMESE_LETTERS = ("\u09F0", "\u09F1")  # ৰ ৱ, not used in Bengali
+
+_SCRIPT_ORDER = {code: i for i, code in enumerate(SCRIPT_PRIORITY)}
+# Distinct words classified by _classify_word before it stops caching new ones
+WORD_CACHE_SIZE = 50000
+
+
+class WordAutomaton:
+    """Aho-Corasick over word sequences: reports every keyword phrase ending at each word."""
+
+    def __init__(self, phrases):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for phrase, value in phrases:
+            state = 0
+            for word in phrase.split():
+                if word not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][word] = len(self._goto) - 1
+                state = self._goto[state][word]
+            self._out[state].append(value)
+        # Breadth-first failure links
+        queue = list(self._goto[0].values())
+        while queue:
+            state = queue.pop(0)
+            for word, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def step(self, state, word):
+        """(next state, values of phrases ending at `word`)"""
+        while state and word not in self._goto[state]:
+            state = self._fail[state]
+        state = self._goto[state].get(word, 0)
+        return state, self._out[state]
+
+
+_LAW_PRIORITY = {law_type: i for i, (law_type, _) in enumerate(LAW_TYPE_KEYWORDS)}
+_AUTOMATON = WordAutomaton([(kw, law_type) for law_type, kws in LAW_TYPE_KEYWORDS for kw in kws])
+_ROMANIZED_LANGUAGE = {word: language for language, words in ROMANIZED_WORDS.items() for word in words}
+
+# A phrase's last word (or a one-word keyword) also matches longer words it
+# starts; earlier phrase words must match exactly ("it act", not "its act").
+_PHRASE_WORDS = [kw.split() for _, kws in LAW_TYPE_KEYWORDS for kw in kws]
+_PREFIX_WORDS = frozenset(words[-1] for words in _PHRASE_WORDS)
+_EXACT_WORDS = frozenset(w for words in _PHRASE_WORDS for w in words[:-1])
+_PREFIX_LENGTHS = sorted({len(w) for w in _PREFIX_WORDS})
+
+# The script range must end where SCRIPT_BLOCKS does, or the block lookup in analyze_query overruns
+_TOKEN_RE = re.compile(r"\b(section|ipc)\s*(\d+[a-z]*)|([a-z]+)|([\u0900-\u0D7F]+)", re.IGNORECASE)
+_word_cache = {}
+
+
+def _classify_word(word):
+    """(keyword word or None, romanized language or None) for a Latin word."""
+    lowered = word.lower()
+    keyword = lowered if lowered in _PREFIX_WORDS or lowered in _EXACT_WORDS else None
+    if keyword is None:
+        keyword = next((lowered[:n] for n in _PREFIX_LENGTHS if n < len(lowered) and lowered[:n] in _PREFIX_WORDS), None)
+    result = (keyword, _ROMANIZED_LANGUAGE.get(lowered))
+    if len(_word_cache) < WORD_CACHE_SIZE:
+        _word_cache[word] = result
+    return result
+
+
+def _devanagari_language(words):
+    words = [w.strip("\u0964\u0965") for w in words]  # dandas
+    marathi = sum(1 for w in words if w in MARATHI_MARKERS or MARATHI_LETTER in w)
+    hindi = sum(1 for w in words if w in HINDI_MARKERS)
+    return "mr" if marathi > hindi else "hi"
+
+
+def analyze_query(question):
+    """QueryAnalysis(law_type, language, ipc_sections) from one scan of `question`."""
+    sections = []
+    law_priority = len(LAW_TYPE_KEYWORDS)
+    state = 0
+    romanized = dict.fromkeys(ROMANIZED_WORDS, 0)
+    script_chars = {}
+    script_words = {}
+
+    for ref, section, word, run in _TOKEN_RE.findall(question):
+        if word:
+            keyword, romanized_language = _word_cache.get(word) or _classify_word(word)
+            if romanized_language:
+                romanized[romanized_language] += 1
+        elif section:
+            sections.append(section)
+            keyword = ref.lower()
+        else:
+            script = SCRIPT_BLOCKS[(ord(run[0]) - 0x900) >> 7]
+            script_chars[script] = script_chars.get(script, 0) + len(run)
+            script_words.setdefault(script, []).append(run)
+            keyword = None
+        if keyword is None:
+            # Not part of any keyword phrase
+            state = 0
+            continue
+        state, found = _AUTOMATON.step(state, keyword)
+        for law_type in found:
+            law_priority = min(law_priority, _LAW_PRIORITY[law_type])
+
+    law_type = LAW_TYPE_KEYWORDS[law_priority][0] if law_priority < len(LAW_TYPE_KEYWORDS) else DEFAULT_LAW_TYPE
+
+    if script_chars:
+        script = max(script_chars, key=lambda code: (script_chars[code], -_SCRIPT_ORDER[code]))
+        language = script
+        if script == "hi":
+            language = _devanagari_language(script_words["hi"])
+        elif script == "bn" and any(letter in w for w in script_words["bn"] for letter in ASSAMESE_LETTERS):
+            language = "as"
+    else:
+        best = max(romanized, key=romanized.get)
+        language = best if romanized[best] >= ROMANIZED_MIN_WORDS else "en"
+
+    return QueryAnalysis(law_type, language, sections)
@@ -0,0 +1,181 @@
+"""
+Speed and agreement of query_analyzer.analyze_query against the three
+separate detectors it replaced (copied below as legacy_*), on synthetic
+questions mixing English, romanized and native-script text:
+
+    python query_analyzer_benchmark.py [count]      # default 100000
+
+KNOWN_ANSWERS are checked first (the script exits non-zero if one fails).
+Disagreements are counted per field, with a few examples. Expected ones:
+Marathi and Assamese questions (unreachable before), keywords inside
+other words ("cybercrime" was ipc, "submit act" was it_act) and
+mixed-script text, now judged by the dominant script.
+"""
+import random
+import re
+import sys
+import time
+
+from query_analyzer import analyze_query
+
+
+# -------------------- Legacy detectors --------------------
+LEGACY_HINGLISH = ["kya", "hai", "tum", "main", "mera", "nahi", "kaise", "kahan", "kyun", "ho", "raha", "gaya"]
+LEGACY_TANGLISH = ["enna", "irukku", "vaanga", "sollu", "poi", "adi", "vandhu", "kanna", "thaan", "pudi"]
+LEGACY_TELUGU_ROMAN = ["emi", "cheppu", "vachindi", "chusara", "nenu", "meeru", "ledu"]
+LEGACY_SCRIPTS = [
+    ("hi", r"[ऀ-ॿ]"), ("ta", r"[஀-௿]"), ("te", r"[ఀ-౿]"),
+    ("kn", r"[ಀ-೿]"), ("ml", r"[ഀ-ൿ]"), ("bn", r"[ঀ-৿]"),
+    ("pa", r"[਀-੿]"), ("mr", r"[ऀ-ॿ]"), ("gu", r"[઀-૿]"),
+    ("or", r"[଀-୿]"), ("as", r"[ঀ-এ]"),
+]
+
+
+def legacy_detect_law_type(question):
+    q = question.lower()
+    if "posco" in q or "child" in q:
+        return "posco"
+    if "sexual harassment" in q or "workplace" in q:
+        return "sexual_harassment"
+    if "ipc" in q or "offence" in q or "crime" in q:
+        return "ipc"
+    if "crpc" in q or "arrest" in q or "bail" in q:
+        return "crpc"
+    if "cpc" in q or "civil suit" in q:
+        return "cpc"
+    if "cyber" in q or "it act" in q:
+        return "it_act"
+    if "constitution" in q or "article" in q:
+        return "constitution"
+    if "contract" in q or "agreement" in q:
+        return "contract_act"
+    return "general_law"
+
+
+def legacy_detect_language(text):
+    text = text.lower()
+    for code, pattern in LEGACY_SCRIPTS:
+        if re.search(pattern, text):
+            return code
+    words = re.findall(r'\b\w+\b', text)
+    counts = {
+        "Hinglish": sum(1 for w in words if w in LEGACY_HINGLISH),
+        "Tanglish": sum(1 for w in words if w in LEGACY_TANGLISH),
+        "TeluguRoman": sum(1 for w in words if w in LEGACY_TELUGU_ROMAN),
+    }
+    max_lang = max(counts, key=counts.get)
+    return max_lang if counts[max_lang] > 1 else "en"
+
+
+def legacy_extract_ipc_sections(question):
+    return re.findall(r'\b(?:section|ipc)\s*(\d+[A-Za-z]*)', question, re.IGNORECASE)
+
+
+def legacy_analyze(question):
+    return legacy_detect_law_type(question), legacy_detect_language(question), legacy_extract_ipc_sections(question)
+
+
+# -------------------- Synthetic questions --------------------
+ENGLISH = [
+    "What is the punishment under", "My landlord refuses to return my deposit, what can I do",
+    "Can the police arrest me without a warrant", "How do I get bail for a bailable offence",
+    "Is a verbal agreement a valid contract", "Someone hacked my email, is this a cyber crime",
+    "My employer ignores sexual harassment complaints at the workplace",
+    "What rights does Article 21 of the Constitution give me", "How to file a civil suit for recovery",
+    "What does the IT Act say about online fraud", "My child was abused, which POCSO provisions apply",
+    "Explain the difference between murder and culpable homicide", "How long does a divorce take in India",
+]
+ROMANIZED = [
+    "mera phone chori ho gaya kya karu", "police ne mujhe kyun pakda hai", "enna pannanum sollu thaan",
+    "nenu emi cheyali meeru cheppu", "kaise complaint file karu main",
+]
+NATIVE = [
+    "धारा 302 के तहत सजा क्या है", "मला जामीन कसा मिळेल काय", "माझा फोन चोरीला गेला आहे",
+    "என் வீட்டை யாரோ திருடினார்கள்", "నా ఫోన్ దొంగిలించబడింది", "ನನ್ನ ಹಕ್ಕುಗಳು ಯಾವುವು",
+    "എന്റെ അവകാശങ്ങൾ എന്തൊക്കെയാണ്", "আমার ফোন চুরি হয়েছে", "মোৰ ফোন চুৰি হৈছে", "ਮੇਰਾ ਫ਼ੋਨ ਚੋਰੀ ਹੋ ਗਿਆ",
+    "મારો ફોન ચોરાઈ ગયો", "ମୋ ଫୋନ ଚୋରି ହୋଇଗଲା", "මගේ දුරකථනය සොරකම් කළා",
+]
+# (question, expected QueryAnalysis fields)
+KNOWN_ANSWERS = [
+    ("What is the punishment under section 302?", ("general_law", "en", ["302"])),
+    ("IPC302 and Section 498a", ("ipc", "en", ["302", "498a"])),
+    ("Can the police arrest me without a warrant", ("crpc", "en", [])),
+    ("Sexual  Harassments at the office", ("sexual_harassment", "en", [])),
+    ("My children were taken away", ("posco", "en", [])),
+    ("Is this a cybercrime", ("it_act", "en", [])),
+    ("Please submit act details", ("general_law", "en", [])),
+    ("kya hai main kaise complaint karu", ("general_law", "Hinglish", [])),
+    ("धारा 302 के तहत सजा क्या है", ("general_law", "hi", [])),
+    ("माझा फोन चोरीला गेला आहे। section 379", ("general_law", "mr", ["379"])),
+    ("মোৰ ফোন চুৰি হৈছে", ("general_law", "as", [])),
+    ("আমার ফোন চুরি হয়েছে", ("general_law", "bn", [])),
+    ("என் வீட்டை யாரோ திருடினார்கள்", ("general_law", "ta", [])),
+    ("മോഷണം", ("general_law", "ml", [])),
+    # Sinhala (U+0D80-U+0DFF) is past the Indic blocks the analyser knows
+    ("මගේ දුරකථනය සොරකම් කළා section 379", ("general_law", "en", ["379"])),
+    ("", ("general_law", "en", [])),
+]
+SECTIONS = ["302", "420", "498A", "376", "354D", "304B", "124A", "506"]
+
+
+def synthetic_questions(count, seed=7):
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        parts = [rng.choice(ENGLISH)]
+        roll = rng.random()
+        if roll < 0.2:
+            parts.append(rng.choice(ROMANIZED))
+        elif roll < 0.4:
+            parts = [rng.choice(NATIVE)]
+        if rng.random() < 0.5:
+            parts.append(f"{rng.choice(['section', 'Section', 'IPC', 'ipc'])} {rng.choice(SECTIONS)}")
+        questions.append(" ".join(parts) + rng.choice(["?", "", ".", " please"]))
+    return questions
+
+
+def timed(fn, questions):
+    started = time.perf_counter()
+    results = [fn(q) for q in questions]
+    return results, time.perf_counter() - started
+
+
+def check_known_answers():
+    failures = 0
+    for question, expected in KNOWN_ANSWERS:
+        try:
+            got = tuple(analyze_query(question))
+        except Exception as e:
+            got = f"{type(e).__name__}: {e}"
+        if got != expected:
+            failures += 1
+            print(f"FAIL  {question!r}: expected {expected}, got {got}")
+    print(f"{len(KNOWN_ANSWERS) - failures}/{len(KNOWN_ANSWERS)} known answers correct")
+    return failures == 0
+
+
+def main():
+    if not check_known_answers():
+        sys.exit(1)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    questions = synthetic_questions(count)
+    legacy, legacy_seconds = timed(legacy_analyze, questions)
+    single, single_seconds = timed(analyze_query, questions)
+
+    print(f"{count} questions")
+    print(f"legacy (3 detectors)  {legacy_seconds:.2f}s  {legacy_seconds / count * 1e6:.1f} µs/question")
+    print(f"analyze_query         {single_seconds:.2f}s  {single_seconds / count * 1e6:.1f} µs/question"
+          f"  ({legacy_seconds / single_seconds:.1f}x)")
+
+    for i, field in enumerate(("law_type", "language", "ipc_sections")):
+        differing = [(q, old[i], new[i]) for q, old, new in zip(questions, legacy, single) if old[i] != new[i]]
+        print(f"{field:13s} differs on {len(differing)} questions")
+        seen = set()
+        for question, old, new in differing:
+            if (str(old), str(new)) not in seen and len(seen) < 5:
+                seen.add((str(old), str(new)))
+                print(f"    {old!r} -> {new!r}: {question}")
+
+
+if __name__ == "__main__":
+    main()
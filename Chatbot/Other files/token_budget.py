@@ -0,0 +1,39 @@
+"""
+Token estimates for prompts sent to the local model.
+
+llama3's tokenizer is a tiktoken BPE, so if tiktoken is installed its
+cl100k_base encoding gives a close local count. Without it, ASCII text is
+counted at about four characters per token and every other character as one
+token, which overestimates Indic scripts slightly rather than underestimating.
+"""
+CHARS_PER_TOKEN = 4
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    non_ascii = sum(1 for c in text if ord(c) > 127)
+    return (len(text) - non_ascii) // CHARS_PER_TOKEN + non_ascii + 1
+
+
+def truncate_to_tokens(text, max_tokens, marker=" [...]"):
+    """`text` cut (with `marker`) to at most `max_tokens` estimated tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(marker)
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + marker if low else ""
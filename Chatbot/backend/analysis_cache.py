@@ -0,0 +1,148 @@
+# analysis_cache.py
+"""
+Persistent cache for /api/analyze, keyed by the SHA-256 of the uploaded bytes.
+
+Two layers live in one WAL-mode SQLite file:
+  - `texts`:    extracted text per (upload hash, extractor, text budget), so a
+                re-analysis with a new prompt or model skips extraction and OCR
+  - `analyses`: parsed analysis JSON per (upload hash, prompt version, model)
+
+Entries expire after ANALYSIS_CACHE_TTL seconds. Each layer is trimmed to
+ANALYSIS_CACHE_MAX_BYTES, least recently used first.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+ANALYSIS_CACHE_PATH = Path(os.getenv("ANALYSIS_CACHE_PATH", str(BASE_DIR / "analysis_cache.db")))
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", str(7 * 24 * 3600)))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def cache_key(*parts) -> str:
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """One SQLite connection per thread, like SqliteSessionStore."""
+
+    def __init__(self, db_path: Path = ANALYSIS_CACHE_PATH, ttl: int = ANALYSIS_CACHE_TTL,
+                 max_bytes: int = ANALYSIS_CACHE_MAX_BYTES):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counts = {"text_hits": 0, "text_misses": 0, "analysis_hits": 0, "analysis_misses": 0}
+        self._conn().executescript("""
+        CREATE TABLE IF NOT EXISTS texts (
+            key TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            truncated INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_texts_last_used ON texts(last_used);
+        CREATE TABLE IF NOT EXISTS analyses (
+            key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_analyses_last_used ON analyses(last_used);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _get(self, table: str, key: str) -> sqlite3.Row | None:
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(f"SELECT * FROM {table} WHERE key = ? AND created_at > ?", (key, now - self.ttl)).fetchone()
+        if row is not None:
+            with conn:
+                conn.execute(f"UPDATE {table} SET last_used = ? WHERE key = ?", (now, key))
+        return row
+
+    def _put(self, table: str, columns: dict):
+        conn = self._conn()
+        now = time.time()
+        columns = {**columns, "created_at": now, "last_used": now}
+        names = ", ".join(columns)
+        marks = ", ".join("?" for _ in columns)
+        with conn:
+            conn.execute(f"INSERT OR REPLACE INTO {table} ({names}) VALUES ({marks})", tuple(columns.values()))
+            conn.execute(f"DELETE FROM {table} WHERE created_at <= ?", (now - self.ttl,))
+            total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk from least recently used, deleting until the layer fits again
+                excess = total - self.max_bytes
+                doomed = []
+                for row in conn.execute(f"SELECT key, size FROM {table} ORDER BY last_used"):
+                    if excess <= 0:
+                        break
+                    doomed.append((row["key"],))
+                    excess -= row["size"]
+                conn.executemany(f"DELETE FROM {table} WHERE key = ?", doomed)
+
+    def get_text(self, key: str) -> tuple[str, bool] | None:
+        row = self._get("texts", key)
+        self._count("text_hits" if row else "text_misses")
+        return (row["text"], bool(row["truncated"])) if row else None
+
+    def put_text(self, key: str, text: str, truncated: bool = False):
+        try:
+            self._put("texts", {"key": key, "text": text, "truncated": int(truncated),
+                                "size": len(text.encode("utf-8"))})
+        except sqlite3.Error as e:
+            logging.error(f"Failed to cache extracted text: {str(e)}")
+
+    def get_analysis(self, key: str) -> dict | None:
+        row = self._get("analyses", key)
+        self._count("analysis_hits" if row else "analysis_misses")
+        return json.loads(row["result"]) if row else None
+
+    def put_analysis(self, key: str, result: dict):
+        payload = json.dumps(result, ensure_ascii=False)
+        try:
+            self._put("analyses", {"key": key, "result": payload, "size": len(payload.encode("utf-8"))})
+        except sqlite3.Error as e:
+            logging.error(f"Failed to cache analysis: {str(e)}")
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        layers = {}
+        for table in ("texts", "analyses"):
+            row = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {table}").fetchone()
+            layers[table] = {"entries": row[0], "bytes": row[1]}
+        with self._lock:
+            counts = dict(self._counts)
+        return {**counts, **layers, "max_bytes": self.max_bytes, "ttl": self.ttl}
+
+
+_cache = None
+
+def get_analysis_cache() -> AnalysisCache:
+    global _cache
+    if _cache is None:
+        _cache = AnalysisCache()
+    return _cache
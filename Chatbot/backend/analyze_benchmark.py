@@ -0,0 +1,126 @@
+# analyze_benchmark.py
+"""
+Benchmark for long-document /api/analyze against a local stub Groq server.
+
+Synthetic 100-500 page PDFs are analysed twice: truncated to a single prompt
+(the old behaviour) and with map-reduce over page-aligned chunks. The stub
+charges a delay per prompt and completion token, so wall time reflects both
+the number of calls and how much text each one carries. Token counts are
+estimated at four characters per token.
+
+Usage: python analyze_benchmark.py [pages ...]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import fitz  # PyMuPDF
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+STUB_PORT = 8767
+PAGE_COUNTS = [int(p) for p in sys.argv[1:]] or [100, 250, 500]
+PAGE_TEXT = (
+    "The accused was found in possession of the property described in the seizure memo. "
+    "The prosecution relies on the statements recorded under Section 161 CrPC and the "
+    "panchnama prepared at the spot. The defence contends that the recovery is doubtful. "
+) * 12
+# Simulated provider latency: fixed overhead plus prefill and decode time per token
+CALL_OVERHEAD = 0.2
+PREFILL_PER_TOKEN = 0.00002
+DECODE_PER_TOKEN = 0.002
+COMPLETION_TOKENS = 250
+
+stub = FastAPI()
+usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "document_chars": 0}
+
+@stub.post("/openai/v1/chat/completions")
+async def fake_completion(request: Request):
+    body = await request.json()
+    prompt = "".join(m["content"] for m in body["messages"] if isinstance(m["content"], str))
+    prompt_tokens = len(prompt) // 4
+    document = prompt.split("DOCUMENT TEXT TO ANALYZE:\n")[-1].split("\n\nRespond ONLY")[0]
+    part = document.split(" of ")[0].replace("[Part ", "") if document.startswith("[Part ") else "1"
+    usage["calls"] += 1
+    usage["prompt_tokens"] += prompt_tokens
+    usage["completion_tokens"] += COMPLETION_TOKENS
+    usage["document_chars"] += len(document)
+    await asyncio.sleep(CALL_OVERHEAD + prompt_tokens * PREFILL_PER_TOKEN + COMPLETION_TOKENS * DECODE_PER_TOKEN)
+    content = json.dumps({
+        "document_type": "Judgment",
+        "applicable_laws": ["Code of Criminal Procedure, 1973", f"Act cited in part {part}"],
+        "important_sections": ["Section 161 CrPC"],
+        "summary": f"Summary of part {part}.",
+        "key_observations": [],
+        "warnings": [],
+        "disclaimer": "General information only.",
+    })
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": COMPLETION_TOKENS, "total_tokens": prompt_tokens + COMPLETION_TOKENS},
+    }
+
+def run_stub():
+    uvicorn.run(stub, host="127.0.0.1", port=STUB_PORT, log_level="warning")
+
+def make_pdf(pages: int) -> tuple[bytes, int]:
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), f"Page {i + 1}\n{PAGE_TEXT}", fontsize=9)
+    total_chars = sum(len(page.get_text()) for page in doc)
+    return doc.tobytes(), total_chars
+
+async def run_case(app, pdf: bytes, total_chars: int, label: str):
+    for key in usage:
+        usage[key] = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=600) as client:
+        start = time.perf_counter()
+        response = await client.post("/api/analyze", files={"file": ("bench.pdf", pdf, "application/pdf")})
+        elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    laws = len(response.json().get("applicable_laws", []))
+    coverage = min(usage["document_chars"] / total_chars, 1.0)
+    print(f"  {label:11s} time={elapsed:6.2f}s  calls={usage['calls']:3d}  prompt_tokens={usage['prompt_tokens']:7d}  "
+          f"completion_tokens={usage['completion_tokens']:6d}  coverage={coverage:6.1%}  merged_laws={laws}")
+
+async def main():
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}"
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    # Keep benchmark sessions and analyses out of the real databases
+    scratch = Path(tempfile.mkdtemp())
+    os.environ["CHAT_DB_PATH"] = str(scratch / "bench_chat.db")
+    os.environ["ANALYSIS_CACHE_PATH"] = str(scratch / "bench_analysis.db")
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import main as chatbot
+    import document_analysis
+    logging.getLogger().setLevel(logging.WARNING)
+
+    try:
+        for pages in PAGE_COUNTS:
+            pdf, total_chars = make_pdf(pages)
+            print(f"{pages} pages, {total_chars} characters")
+            # The mode is part of the analysis cache key, so neither run is served from the cache
+            chatbot.ANALYZE_MAX_CHUNKS = 1
+            await run_case(chatbot.app, pdf, total_chars, "truncated")
+            chatbot.ANALYZE_MAX_CHUNKS = document_analysis.ANALYZE_MAX_CHUNKS
+            await run_case(chatbot.app, pdf, total_chars, "map-reduce")
+    finally:
+        chatbot.extraction_pool.shutdown()
+
+if __name__ == "__main__":
+    threading.Thread(target=run_stub, daemon=True).start()
+    time.sleep(1)
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+# chat_context.py
+"""
+Conversation context for /api/chat.
+
+Keeps the history sent to the model under a token budget: recent messages are
+passed verbatim and older ones are folded into a rolling summary stored with
+the session, so prompt size stays bounded however long a session runs.
+
+Store reads and writes run in a thread. Requests on the same session build
+their history one at a time, so two of them never summarise the same
+messages and overwrite each other's summary.
+"""
+import os
+import asyncio
+import logging
+import weakref
+from typing import List
+
+import llm_client
+
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "llama-3.1-8b-instant")
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a legal information chat about Indian law.\n"
+    "Merge the previous summary and the new messages into one concise summary (max 150 words).\n"
+    "Keep the user's facts, the laws and sections discussed, and any open questions. Do not add new information."
+)
+
+
+def estimate_tokens(messages: List[dict]) -> int:
+    """Rough token count (about four characters per token)."""
+    return sum(len(m.get("content", "")) for m in messages) // CHARS_PER_TOKEN + 4 * len(messages)
+
+
+def trim_history(messages: List[dict], budget: int = CHAT_CONTEXT_TOKENS) -> List[dict]:
+    """Return the newest messages that fit within `budget` tokens."""
+    kept = []
+    used = 0
+    for msg in reversed(messages):
+        cost = estimate_tokens([msg])
+        if used + cost > budget:
+            break
+        kept.append(msg)
+        used += cost
+    return list(reversed(kept))
+
+
+async def summarize(previous_summary: str | None, messages: List[dict]) -> str:
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    response = await llm_client.chat_completion(
+        model=CHAT_SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Previous summary:\n{previous_summary or 'None'}\n\nNew messages:\n{transcript}"},
+        ],
+        temperature=0.2,
+        max_tokens=300,
+    )
+    return response.choices[0].message.content.strip()
+
+
+# One lock per session with a request in flight; dropped once nobody holds it
+_session_locks = weakref.WeakValueDictionary()
+
+
+def _session_lock(session_id: str) -> asyncio.Lock:
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _session_locks[session_id] = asyncio.Lock()
+    return lock
+
+
+async def load_history(store, session_id: str, budget: int = CHAT_CONTEXT_TOKENS) -> List[dict]:
+    """
+    Build the model history for a stored session.
+
+    When the unsummarised messages exceed `budget`, everything except the most
+    recent half-budget is folded into the session's rolling summary.
+    """
+    async with _session_lock(session_id):
+        summary, summarized_count, messages = await asyncio.to_thread(store.get_context, session_id)
+
+        if estimate_tokens(messages) > budget:
+            recent = trim_history(messages, budget // 2)
+            older = messages[:len(messages) - len(recent)]
+            try:
+                summary = await summarize(summary, older)
+                await asyncio.to_thread(store.set_summary, session_id, summary, summarized_count + len(older))
+                messages = recent
+            except Exception as e:
+                logging.warning(f"Could not summarise session {session_id}, trimming instead: {str(e)}")
+                messages = trim_history(messages, budget)
+
+    history = []
+    if summary:
+        history.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    return history + messages
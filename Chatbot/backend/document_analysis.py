@@ -0,0 +1,129 @@
+# document_analysis.py
+"""
+Map-reduce analysis for documents longer than one analysis prompt.
+
+The caller splits the document into page-aligned chunks
+(document_ingest.extract_chunks) and supplies `analyze(chunk, part, total)`,
+which runs its usual analysis prompt on one chunk and returns the parsed
+JSON. analyze_chunks() runs those calls concurrently, at most
+ANALYZE_CHUNK_CONCURRENCY at a time, and merge_analyses() folds the
+per-chunk results into one response without another LLM call:
+
+  - document_type: the most frequent one (earliest part wins ties)
+  - list fields (applicable_laws, important_sections, warnings, ...): union
+    in document order, duplicates removed
+  - summary: the per-part summaries, labelled by part
+  - any other field: the first non-empty value
+"""
+import os
+import re
+import json
+import asyncio
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, List
+
+ANALYZE_MAP_REDUCE = os.getenv("ANALYZE_MAP_REDUCE", "1") != "0"
+# With map-reduce off, documents are cut to a single chunk as before
+ANALYZE_MAX_CHUNKS = int(os.getenv("ANALYZE_MAX_CHUNKS", "20")) if ANALYZE_MAP_REDUCE else 1
+ANALYZE_CHUNK_CONCURRENCY = int(os.getenv("ANALYZE_CHUNK_CONCURRENCY", "4"))
+
+NON_LEGAL_TYPE = "Non-Legal Document"
+
+
+def part_header(part: int, total: int) -> str:
+    """Prefix for a chunk's text so the model knows it sees only part of the document."""
+    return (f"[Part {part} of {total} of a longer document. Analyse only this part; "
+            f"the results for all parts are merged afterwards.]\n\n")
+
+
+def parse_json_reply(text: str) -> dict:
+    """Parse a JSON reply, tolerating a markdown code fence around it."""
+    text = text.strip()
+    if "```json" in text:
+        text = text.split("```json")[-1].split("```")[0].strip()
+    elif "```" in text:
+        text = text.split("```")[1].strip()
+    return json.loads(text)
+
+
+async def analyze_chunks(chunks: List[str], analyze: Callable[[str, int, int], Awaitable[dict]],
+                         concurrency: int = ANALYZE_CHUNK_CONCURRENCY) -> List[dict | None]:
+    """Run `analyze` over every chunk, at most `concurrency` at once. Failed parts come back as None."""
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(chunks)
+
+    async def run(part: int, chunk: str):
+        async with semaphore:
+            try:
+                return await analyze(chunk, part, total)
+            except Exception as e:
+                logging.error(f"Analysis of part {part}/{total} failed: {str(e)}")
+                return None
+
+    return await asyncio.gather(*[run(i, chunk) for i, chunk in enumerate(chunks, start=1)])
+
+
+def _identity(item) -> str:
+    if isinstance(item, str):
+        return re.sub(r"\s+", " ", item).strip().casefold()
+    return json.dumps(item, sort_keys=True, ensure_ascii=False).casefold()
+
+
+def _union(lists: List[list]) -> list:
+    seen = set()
+    merged = []
+    for items in lists:
+        for item in items:
+            key = _identity(item)
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(item)
+    return merged
+
+
+def all_parts_analysed(results: List[dict | None]) -> bool:
+    """Whether every part produced a result. A merge with failed parts is a degraded answer and must not be cached."""
+    return all(isinstance(r, dict) for r in results)
+
+
+def merge_analyses(results: List[dict | None], truncated: bool = False) -> dict | None:
+    """
+    Deterministically merge per-part analyses (in part order). Returns None if no
+    part produced a result; a non-legal verdict is only returned if every part agrees.
+    """
+    answered = [(part, r) for part, r in enumerate(results, start=1) if isinstance(r, dict)]
+    if not answered:
+        return None
+    legal = [(part, r) for part, r in answered if r.get("document_type") != NON_LEGAL_TYPE]
+    if not legal:
+        return answered[0][1]
+
+    merged = {}
+    keys = []
+    for _, result in legal:
+        keys.extend(k for k in result if k not in keys)
+
+    for key in keys:
+        values = [(part, r[key]) for part, r in legal if r.get(key) not in (None, "", [])]
+        if not values:
+            merged[key] = legal[0][1].get(key)
+        elif key == "document_type":
+            merged[key] = Counter(str(v) for _, v in values).most_common(1)[0][0]
+        elif all(isinstance(v, list) for _, v in values):
+            merged[key] = _union([v for _, v in values])
+        elif key == "summary" and len(values) > 1:
+            merged[key] = "\n\n".join(f"Part {part}: {v}" for part, v in values)
+        else:
+            merged[key] = values[0][1]
+
+    notes = []
+    failed = [part for part, r in enumerate(results, start=1) if not isinstance(r, dict)]
+    if failed:
+        notes.append(f"Parts {', '.join(map(str, failed))} of {len(results)} could not be analysed; their content is not reflected above.")
+    if truncated:
+        notes.append(f"Only the first {len(results)} parts of this document were analysed.")
+    if notes:
+        warnings = merged.get("warnings") if isinstance(merged.get("warnings"), list) else []
+        merged["warnings"] = warnings + notes
+    return merged
@@ -0,0 +1,124 @@
+# document_ingest.py
+"""
+Bounded-memory ingestion for /api/analyze.
+
+Uploads are copied in fixed-size chunks to a temporary file, and rejected once
+they exceed ANALYZE_MAX_UPLOAD_BYTES. Text is then pulled out page by page (or
+paragraph / chunk) by a generator. extract_chunks() groups the pages into
+analysis-sized chunks for map-reduce analysis and closes the generator once
+the maximum chunk count is reached, so a 500-page PDF costs no more than the
+pages that are analysed. PDF pages with no text layer are OCR'd locally (see
+ocr.py).
+"""
+import os
+import codecs
+import hashlib
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+import fitz  # PyMuPDF
+from docx import Document
+from fastapi import HTTPException, UploadFile
+
+import ocr
+
+ANALYZE_MAX_UPLOAD_BYTES = int(os.getenv("ANALYZE_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+@asynccontextmanager
+async def spooled_upload(file: UploadFile, max_bytes: int = ANALYZE_MAX_UPLOAD_BYTES):
+    """
+    Copy the upload to a temp file chunk by chunk and yield (path, sha256 hex digest).
+    The file is removed afterwards.
+    """
+    suffix = Path(file.filename or "").suffix.lower()
+    fd, name = tempfile.mkstemp(prefix="analyze_", suffix=suffix)
+    path = Path(name)
+    try:
+        size = 0
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File is too large. The maximum upload size is {max_bytes // (1024 * 1024)} MB.",
+                    )
+                out.write(chunk)
+                digest.update(chunk)
+        yield path, digest.hexdigest()
+    finally:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            # e.g. Windows, while a timed-out extraction worker still has it open
+            logging.warning(f"Could not remove upload {path}: {str(e)}")
+
+
+def iter_text(path: Path, filename: str) -> Iterator[str]:
+    """Yield the document's text in pieces: one PDF page, DOCX paragraph or text chunk at a time."""
+    filename = filename.lower()
+    if filename.endswith(".pdf"):
+        ocr_pages = 0
+        with fitz.open(path) as doc:
+            for page in doc:
+                text = page.get_text()
+                # Scanned page without a text layer: rasterise and OCR it locally
+                if not text.strip() and ocr_pages < ocr.OCR_MAX_PAGES and ocr.get_engine() is not None:
+                    ocr_pages += 1
+                    text = ocr.ocr_pdf_page(page) + "\n"
+                yield text
+    elif filename.endswith(".docx"):
+        for paragraph in Document(path).paragraphs:
+            yield paragraph.text + "\n"
+    else:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        with open(path, "rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_BYTES):
+                yield decoder.decode(chunk)
+            yield decoder.decode(b"", final=True)
+
+
+def _split_long(piece: str, size: int) -> Iterator[str]:
+    """Cut a piece longer than `size` at line breaks where possible."""
+    while len(piece) > size:
+        cut = piece.rfind("\n", 0, size)
+        if cut < size // 2:
+            cut = size
+        yield piece[:cut]
+        piece = piece[cut:]
+    yield piece
+
+
+def extract_chunks(path: Path, filename: str, chunk_chars: int, max_chunks: int) -> tuple[List[str], bool]:
+    """
+    Return (chunks, truncated): the text grouped into chunks of at most `chunk_chars`
+    characters that break on page / paragraph boundaries, reading no further than
+    `max_chunks` chunks.
+    """
+    chunks = []
+    current = []
+    current_len = 0
+    pieces = iter_text(path, filename)
+    try:
+        for piece in pieces:
+            for part in _split_long(piece, chunk_chars):
+                if current and current_len + len(part) > chunk_chars:
+                    chunks.append("".join(current))
+                    current, current_len = [], 0
+                    if len(chunks) == max_chunks:
+                        return chunks, True
+                current.append(part)
+                current_len += len(part)
+        if current:
+            chunks.append("".join(current))
+        return chunks, False
+    finally:
+        pieces.close()
@@ -0,0 +1,152 @@
+# extraction_pool.py
+"""
+Process pool for CPU-bound document text extraction.
+
+PyMuPDF and python-docx parsing hold the GIL for the whole document, so
+running them inside an async handler stalls every other request on the
+worker. Jobs here run document_ingest extraction functions in a bounded
+ProcessPoolExecutor instead (see run()):
+
+  - EXTRACT_WORKERS processes (default: CPU count, at most 4)
+  - EXTRACT_MAX_PENDING jobs queued or running before new ones are refused (503)
+  - EXTRACT_TIMEOUT seconds before a request gives up on its job (504)
+
+If a worker dies (out of memory, or a parser crashing on a hostile file) the
+whole executor is broken; the next job replaces it with a fresh pool and
+runs once more before giving up.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from fastapi import HTTPException
+
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_MAX_PENDING = int(os.getenv("EXTRACT_MAX_PENDING", str(EXTRACT_WORKERS * 4)))
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "60"))
+
+_pool = None
+_lock = threading.Lock()
+_pending = 0
+_completed = 0
+_failed = 0
+_rejected = 0
+_timeouts = 0
+_busy_seconds = 0.0
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+        return _pool
+
+
+def _replace_pool(broken: ProcessPoolExecutor):
+    """Swap out `broken` for a new pool on the next _get_pool(), unless another request already did."""
+    global _pool
+    with _lock:
+        if _pool is broken:
+            _pool = None
+        else:
+            broken = None
+    if broken is not None:
+        logging.error("Text extraction worker died; starting a new process pool")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _job_done(started: float):
+    def callback(future):
+        global _pending, _completed, _failed, _busy_seconds
+        with _lock:
+            # A job keeps its slot until the worker actually finishes, even if the request timed out
+            _pending -= 1
+            _busy_seconds += time.monotonic() - started
+            if future.cancelled() or future.exception() is not None:
+                _failed += 1
+            else:
+                _completed += 1
+    return callback
+
+
+async def run(fn, path: Path, filename: str, *args):
+    """
+    Run a document_ingest extraction function, fn(path, filename, *args), in a
+    worker process with backpressure and a timeout.
+    """
+    global _pending, _rejected, _timeouts
+    with _lock:
+        if _pending >= EXTRACT_MAX_PENDING:
+            _rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="The server is busy processing other documents. Please try again shortly.",
+                headers={"Retry-After": "5"},
+            )
+        _pending += 1
+
+    for attempt in (1, 2):
+        pool = _get_pool()
+        started = time.monotonic()
+        try:
+            future = pool.submit(fn, path, filename, *args)
+        except BrokenProcessPool:
+            # Broken before this job got in: the slot is still ours, try a new pool
+            if attempt == 2:
+                with _lock:
+                    _pending -= 1
+                raise
+            _replace_pool(pool)
+            continue
+        except Exception:
+            with _lock:
+                _pending -= 1
+            raise
+        future.add_done_callback(_job_done(started))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=EXTRACT_TIMEOUT)
+        except BrokenProcessPool:
+            # A worker died while this job was queued or running; the callback freed the slot
+            _replace_pool(pool)
+            if attempt == 2:
+                raise
+            with _lock:
+                _pending += 1
+        except asyncio.TimeoutError:
+            # Drops the job if it is still queued; a running worker cannot be interrupted
+            future.cancel()
+            with _lock:
+                _timeouts += 1
+            logging.error(f"Text extraction for {filename} timed out after {EXTRACT_TIMEOUT}s")
+            raise HTTPException(status_code=504, detail="Text extraction took too long for this document.")
+
+
+def stats() -> dict:
+    with _lock:
+        done = _completed + _failed
+        return {
+            "workers": EXTRACT_WORKERS,
+            "pending": _pending,
+            "queue_depth": max(0, _pending - EXTRACT_WORKERS),
+            "max_pending": EXTRACT_MAX_PENDING,
+            "completed": _completed,
+            "failed": _failed,
+            "rejected": _rejected,
+            "timeouts": _timeouts,
+            "avg_seconds": round(_busy_seconds / done, 3) if done else 0.0,
+        }
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
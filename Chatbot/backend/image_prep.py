@@ -0,0 +1,100 @@
+# image_prep.py
+"""
+Shrinks images before they are sent to the vision model.
+
+A phone photo of a notice can be 10 MB, which becomes ~13 MB of base64 JSON.
+prepare_vision_images() applies EXIF orientation, converts to greyscale,
+resizes so the long edge is at most VISION_LONG_EDGE and re-encodes as
+JPEG or WebP at VISION_QUALITY. Pages much taller (or wider) than
+VISION_MAX_ASPECT are cut into up to VISION_MAX_TILES overlapping tiles
+first, so small print on a long page is not downscaled into a blur.
+
+Runs in the extraction process pool. VISION_PREPROCESS=0 sends the upload
+unchanged.
+"""
+import os
+import io
+import math
+import base64
+import logging
+import mimetypes
+from pathlib import Path
+from typing import List
+
+from PIL import Image, ImageOps
+
+VISION_PREPROCESS = os.getenv("VISION_PREPROCESS", "1") != "0"
+VISION_LONG_EDGE = int(os.getenv("VISION_LONG_EDGE", "1600"))
+VISION_FORMAT = os.getenv("VISION_FORMAT", "JPEG").upper()
+VISION_QUALITY = int(os.getenv("VISION_QUALITY", "80"))
+VISION_MAX_ASPECT = float(os.getenv("VISION_MAX_ASPECT", "2.0"))
+VISION_MAX_TILES = int(os.getenv("VISION_MAX_TILES", "4"))
+TILE_OVERLAP = 0.05
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+def orient_greyscale(image: Image.Image) -> Image.Image:
+    """Apply the EXIF orientation tag and convert to 8-bit greyscale."""
+    return ImageOps.exif_transpose(image).convert("L")
+
+
+def split_tiles(image: Image.Image, max_aspect: float = VISION_MAX_ASPECT,
+                max_tiles: int = VISION_MAX_TILES) -> List[Image.Image]:
+    """Cut an elongated image along its long axis into tiles no more elongated than `max_aspect`."""
+    width, height = image.size
+    long_side, short_side = max(width, height), min(width, height)
+    count = min(max_tiles, math.ceil(long_side / (short_side * max_aspect))) if short_side else 1
+    if count <= 1:
+        return [image]
+    step = long_side / count
+    overlap = int(step * TILE_OVERLAP)
+    tiles = []
+    for i in range(count):
+        start = max(0, int(i * step) - overlap)
+        end = min(long_side, int((i + 1) * step) + overlap)
+        box = (0, start, width, end) if height >= width else (start, 0, end, height)
+        tiles.append(image.crop(box))
+    return tiles
+
+
+def _data_url(data: bytes, mime: str) -> str:
+    return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def _encode_bytes(image: Image.Image) -> bytes:
+    if max(image.size) > VISION_LONG_EDGE:
+        image = image.copy()
+        image.thumbnail((VISION_LONG_EDGE, VISION_LONG_EDGE), Image.LANCZOS)
+    buf = io.BytesIO()
+    image.save(buf, format=VISION_FORMAT, quality=VISION_QUALITY, optimize=True)
+    return buf.getvalue()
+
+
+def _encode(image: Image.Image) -> str:
+    return _data_url(_encode_bytes(image), _MIME_TYPES.get(VISION_FORMAT, "image/jpeg"))
+
+
+def _raw_data_url(path: Path, filename: str) -> str:
+    return _data_url(Path(path).read_bytes(), mimetypes.guess_type(filename)[0] or "image/jpeg")
+
+
+def prepare_vision_images(path: Path, filename: str) -> List[str]:
+    """Data URLs to send to the vision model for the image at `path`, one per tile."""
+    if not VISION_PREPROCESS:
+        return [_raw_data_url(path, filename)]
+    try:
+        with Image.open(path) as image:
+            page = orient_greyscale(image)
+    except Exception as e:
+        logging.warning(f"Could not preprocess {filename}, sending it unchanged: {str(e)}")
+        return [_raw_data_url(path, filename)]
+    tiles = split_tiles(page)
+    if len(tiles) == 1:
+        # A clean scan can already be smaller than its re-encoded form. Compare
+        # byte sizes and base64-encode only the version that is sent
+        prepared = _encode_bytes(page)
+        if len(prepared) >= os.path.getsize(path):
+            return [_raw_data_url(path, filename)]
+        return [_data_url(prepared, _MIME_TYPES.get(VISION_FORMAT, "image/jpeg"))]
+    return [_encode(tile) for tile in tiles]
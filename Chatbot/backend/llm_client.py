@@ -0,0 +1,74 @@
+# llm_client.py
+"""
+Shared async Groq client.
+
+One pooled HTTP client (keep-alive) is reused by every request handler, and a
+semaphore caps how many completions are in flight at once so slow LLM calls
+queue here instead of exhausting the server threadpool.
+"""
+import os
+import asyncio
+import logging
+
+import httpx
+from groq import AsyncGroq
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "100"))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "20"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "64"))
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+
+_client: AsyncGroq | None = None
+_semaphore: asyncio.Semaphore | None = None
+
+
+def get_client() -> AsyncGroq:
+    """Return the process-wide AsyncGroq client, creating it on first use."""
+    global _client
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_KEEPALIVE,
+                keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(GROQ_TIMEOUT, connect=10.0),
+        )
+        # GROQ_BASE_URL is honoured by the SDK, which lets load tests point at a stub server
+        _client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=http_client)
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(GROQ_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def chat_completion(**kwargs):
+    """Run `chat.completions.create` on the shared client under the concurrency limit."""
+    async with _get_semaphore():
+        return await get_client().chat.completions.create(**kwargs)
+
+
+async def chat_completion_stream(**kwargs):
+    """Yield content deltas from a streamed completion, holding a concurrency slot until it ends."""
+    async with _get_semaphore():
+        stream = await get_client().chat.completions.create(stream=True, **kwargs)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+async def close():
+    """Close the pooled HTTP client. Call on application shutdown."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+        logging.info("Groq client closed")
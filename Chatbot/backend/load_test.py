@@ -0,0 +1,77 @@
+# load_test.py
+"""
+Load test for /api/chat against a local stub Groq server.
+
+The stub answers every completion after a fixed delay, so throughput should
+grow with concurrency until GROQ_MAX_CONCURRENCY is reached. Every request
+asks a different question, so the response cache never answers one and each
+request costs a completion; the cache stats printed at the end show it.
+
+Usage: python load_test.py [delay_seconds]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+STUB_PORT = 8765
+STUB_DELAY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+
+stub = FastAPI()
+
+@stub.post("/openai/v1/chat/completions")
+async def fake_completion():
+    await asyncio.sleep(STUB_DELAY)
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "stub reply"}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+def run_stub():
+    uvicorn.run(stub, host="127.0.0.1", port=STUB_PORT, log_level="warning")
+
+async def run_level(app, concurrency: int, rounds: int = 3):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=120) as client:
+        start = time.perf_counter()
+        for round_no in range(rounds):
+            await asyncio.gather(*[
+                client.post("/api/chat", json={"message": f"What is IPC {i}? (load test {concurrency}/{round_no})"})
+                for i in range(concurrency)
+            ])
+        elapsed = time.perf_counter() - start
+    total = concurrency * rounds
+    print(f"concurrency={concurrency:4d}  requests={total:5d}  time={elapsed:6.2f}s  throughput={total / elapsed:7.1f} req/s")
+
+async def main():
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}"
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    # Keep load-test sessions and replies out of the real databases
+    scratch = Path(tempfile.mkdtemp())
+    os.environ["CHAT_DB_PATH"] = str(scratch / "load_test_chat.db")
+    os.environ["SEMANTIC_CACHE_PATH"] = str(scratch / "load_test_semantic.db")
+    os.environ["ANALYSIS_CACHE_PATH"] = str(scratch / "load_test_analysis.db")
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import main as chatbot
+    logging.getLogger().setLevel(logging.WARNING)
+
+    for concurrency in (1, 8, 32, 128):
+        await run_level(chatbot.app, concurrency)
+    print(f"response cache: {chatbot.response_cache.stats()}")
+
+if __name__ == "__main__":
+    threading.Thread(target=run_stub, daemon=True).start()
+    time.sleep(1)
+    asyncio.run(main())
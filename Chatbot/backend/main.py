@@ -1,6 +1,6 @@
 # main.py
-from fastapi.responses import StreamingResponse
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form
+from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List
 import os
@@ -8,7 +8,6 @@ import base64
 from pathlib import Path
 from docx import Document
 from pydantic import BaseModel
-from groq import Groq
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
@@ -19,6 +18,26 @@ import fitz  # PyMuPDF
 from PIL import Image as PILImage
 import requests
 import io
+import asyncio
+import llm_client
+import template_cache
+import template_selector
+import template_fields
+import template_fill
+import document_ingest
+import extraction_pool
+import ocr
+import image_prep
+from template_prompts import FIRST_QUESTION_PROMPT
+from template_registry import get_registry
+import chat_context
+from session_store import get_session_store
+from response_cache import BYPASS_HEADER, bypass_requested, get_response_cache
+from semantic_cache import get_semantic_cache
+from analysis_cache import cache_key, get_analysis_cache
+from document_analysis import (
+    ANALYZE_MAX_CHUNKS, all_parts_analysed, analyze_chunks, merge_analyses, parse_json_reply, part_header,
+)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -42,13 +61,17 @@ CHAT_HISTORY_DIR = BASE_DIR / "chat_history"
 # Create chat history directory if it doesn't exist
 CHAT_HISTORY_DIR.mkdir(exist_ok=True)
 
+# Sessions are kept in the store selected by CHAT_STORE (SQLite by default)
+session_store = get_session_store()
+
+# Categories, metadata and docx paths, built once from TEMPLATES_DIR
+template_registry = get_registry()
+
 @app.get("/api/templates/{category}")
 def list_templates(category: str):
-    category_path = TEMPLATES_DIR / category
-    if not category_path.exists() or not category_path.is_dir():
+    if template_registry.folder(category) is None:
         raise HTTPException(status_code=404, detail="Category not found")
-    files = [f.name for f in category_path.glob("*.docx")]
-    return {"templates": files}
+    return {"templates": template_registry.template_names(category)}
 
 @app.get("/api/template")
 def get_template(category: str = Query(...), name: str = Query(...)):
@@ -59,19 +82,34 @@ def get_template(category: str = Query(...), name: str = Query(...)):
         encoded = base64.b64encode(f.read()).decode("utf-8")
     return {"base64": encoded}
 
+@app.get("/api/template/cache/stats")
+def get_template_cache_stats():
+    return template_cache.cache_stats()
+
+@app.get("/api/analyze/stats")
+def get_extraction_pool_stats():
+    return extraction_pool.stats()
+
 @app.get("/api/template/sections")
 def get_template_sections(category: str = Query(...), name: str = Query(...)):
     file_path = TEMPLATES_DIR / category / name
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
-    doc = Document(file_path)
-    sections = [para.text.strip() for para in doc.paragraphs if para.text.strip().lower().startswith("template for")]
+    paragraphs = template_cache.get_template(file_path)["paragraphs"]
+    sections = [text.strip() for text in paragraphs if text.strip().lower().startswith("template for")]
     if not sections:
         sections = ["Full Document"]
     return {"sections": sections}
 
 load_dotenv()
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm_client.close()
+
+@app.on_event("shutdown")
+def close_extraction_pool():
+    extraction_pool.shutdown()
 
 class AIStartRequest(BaseModel):
     category: str
@@ -80,48 +118,78 @@ class AIStartRequest(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
+    # Only needed for sessions the server has not stored yet; known sessions are loaded server-side
     history: List[dict] = []
     session_id: str | None = None
 
 def load_metadata(category: str, subtype: str | None = None):
-    if subtype:
-        target_path = TEMPLATES_DIR / category / subtype / "metadata.json"
-    else:
-        target_path = TEMPLATES_DIR / category / "metadata.json"
-    
-    if not target_path.exists():
-        logging.error(f"Metadata file not found at expected path: {target_path.absolute()}")
+    folder = template_registry.folder(category, subtype)
+
+    if folder is None or (folder["metadata"] is None and not folder["metadata_error"]):
+        logging.error(f"Metadata not found for category='{category}' subtype='{subtype}'")
         raise HTTPException(
             status_code=404, 
-            detail=f"metadata.json not found for category='{category}' subtype='{subtype}'. Expected at: {target_path}"
+            detail=f"metadata.json not found for category='{category}' subtype='{subtype}'"
         )
     
-    try:
-        with open(target_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        logging.error(f"Failed to decode JSON from {target_path}")
-        raise HTTPException(status_code=500, detail="metadata.json is not a valid JSON file")
-
-@app.post("/api/ai/start")
-def start_ai_flow(data: AIStartRequest):
-    try:
-        templates = load_metadata(data.category, data.subtype)
-        
-        if not templates:
-            raise HTTPException(status_code=404, detail="No templates found in metadata.")
-        for t in templates:
-            if not all(k in t for k in ("title", "summary", "filename")):
-                raise HTTPException(status_code=500, detail="Invalid metadata format")
-
-        summaries_str = "\n\n".join([
-            f"Title: {t['title']}\nSummary: {t['summary']}\nFilename: {t['filename']}"
-            for t in templates
-        ])
-
-        selection_prompt = (
+    if folder["metadata_error"]:
+        raise HTTPException(status_code=500, detail=folder["metadata_error"])
+    return folder["metadata"]
+
+def resolve_template_path(category: str, filename: str) -> Path | None:
+    """Resolve a "name" or "subtype/name" template reference through the registry."""
+    filename = filename.replace(".docx", "")
+    subtype_path = filename.split("/", 1)
+    if len(subtype_path) == 2:
+        return template_registry.docx_path(category, subtype_path[0], subtype_path[1])
+    return template_registry.docx_path(category, None, filename)
+
+TEMPLATE_SELECT_CANDIDATES = 5
+TEMPLATE_SPECULATIVE_QUESTIONS = int(os.getenv("TEMPLATE_SPECULATIVE_QUESTIONS", "2"))
+
+async def generate_first_question(template: dict, doc_path: Path) -> str:
+    """
+    Opening question for a template. Templates with detectable fields ask for the
+    first field (phrased once and cached, so the form session asks the same);
+    otherwise the question precomputed by summarize_templates.py is used, else a
+    live LLM call. Starts no form session, so a speculative draft can be dropped.
+    """
+    parsed = await asyncio.to_thread(template_cache.get_template, doc_path)
+    if parsed["fields"]:
+        return await template_fields.phrase_question(parsed["key"], parsed["fields"][0])
+
+    if template.get("first_question"):
+        return template["first_question"]
+
+    full_text = parsed["text"]
+    q_response = await llm_client.chat_completion(
+        model=GROQ_MODEL,
+        messages=[
+            {"role": "system", "content": FIRST_QUESTION_PROMPT},
+            {"role": "user", "content": full_text},
+        ],
+        temperature=0.3,
+        max_tokens=150,
+    )
+    return q_response.choices[0].message.content.strip()
+
+async def start_form_session(doc_path: Path) -> str | None:
+    """Id of a new form session tracking the template's fields, or None if it has none."""
+    parsed = await asyncio.to_thread(template_cache.get_template, doc_path)
+    if not parsed["fields"]:
+        return None
+    form_id, _ = template_fields.form_sessions.create(parsed["key"], parsed["fields"])
+    return form_id
+
+async def llm_select_template(user_input: str, templates: List[dict]) -> dict | None:
+    summaries_str = "\n\n".join([
+        f"Title: {t['title']}\nSummary: {t['summary']}\nFilename: {t['filename']}"
+        for t in templates
+    ])
+
+    selection_prompt = (
         "You are an expert legal assistant helping users find the most suitable document template.\n"
-        f"A user described their issue as:\n\n{data.user_input.strip()}\n\n"
+        f"A user described their issue as:\n\n{user_input.strip()}\n\n"
         "Here are the available legal document templates:\n\n"
         f"{summaries_str}\n\n"
         "Your task:\n"
@@ -132,71 +200,78 @@ def start_ai_flow(data: AIStartRequest):
         "— If unsure, pick the closest reasonable match anyway — do NOT say 'none match'."
     )
 
-        try:
-            response = groq_client.chat.completions.create(
-                model=GROQ_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a helpful legal assistant..."},
-                    {"role": "user", "content": selection_prompt},
-                ],
-                temperature=0.3,
-                max_tokens=60,
-            )
-        
-        except Exception as e:
-            logging.error(f"Groq API error during template selection: {str(e)}")
-            # Fallback: Pick the first template if AI is down
-            logging.info("Falling back to first available template.")
-            return {
-                "question": "The AI service is temporarily unavailable. Let's start with the basics: What is your name and address?",
-                "filename": f"{data.subtype}/{templates[0]['filename']}" if data.subtype else templates[0]['filename']
-            }
-
-        selected_filename = response.choices[0].message.content.strip()
-        logging.info(f"Selected Filename from GPT: {selected_filename}")
+    response = await llm_client.chat_completion(
+        model=GROQ_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a helpful legal assistant..."},
+            {"role": "user", "content": selection_prompt},
+        ],
+        temperature=0.3,
+        max_tokens=60,
+    )
 
-        matched_template = next(
-            (t for t in templates if t["filename"].strip().lower() == selected_filename.lower()),
-            None
-        )
+    reply = response.choices[0].message.content.strip()
+    logging.info(f"Selected Filename from GPT: {reply}")
+    return template_selector.match_filename(reply, templates)
 
-        if not matched_template:
-            raise HTTPException(status_code=404, detail="Template match not found in metadata")
+@app.post("/api/ai/start")
+async def start_ai_flow(data: AIStartRequest):
+    try:
+        templates = load_metadata(data.category, data.subtype)
+        
+        if not templates:
+            raise HTTPException(status_code=404, detail="No templates found in metadata.")
+        for t in templates:
+            if not all(k in t for k in ("title", "summary", "filename")):
+                raise HTTPException(status_code=500, detail="Invalid metadata format")
 
-        doc_filename = f"{selected_filename}.docx"
-        logging.info(f"Selected Template File: {doc_filename}")
+        ranked = template_selector.rank_templates(data.user_input, templates)
+        matched_template = template_selector.confident_choice(ranked)
+        question_task = None
 
-        if data.subtype:
-            doc_path = TEMPLATES_DIR / data.category / data.subtype / doc_filename
+        if matched_template:
+            logging.info(f"Selected template locally: {matched_template['filename']}")
         else:
-            doc_path = TEMPLATES_DIR / data.category / doc_filename
-
-        if not doc_path.exists():
+            # Local scores are too close to call, let the LLM choose among the best candidates.
+            # Meanwhile draft first questions for the likeliest ones, dropping the drafts it does not pick.
+            candidates = [t for _, t in ranked[:TEMPLATE_SELECT_CANDIDATES]]
+            drafts = {}
+            for t in candidates[:TEMPLATE_SPECULATIVE_QUESTIONS]:
+                path = template_registry.docx_path(data.category, data.subtype, t["filename"])
+                if path is not None and not t.get("first_question"):
+                    task = asyncio.create_task(generate_first_question(t, path))
+                    # Drafts that fail after being dropped should not log "exception never retrieved"
+                    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+                    drafts[t["filename"]] = task
+            try:
+                matched_template = await llm_select_template(data.user_input, candidates)
+            except Exception as e:
+                logging.error(f"Groq API error during template selection: {str(e)}")
+                # Fallback: Pick the best local match if AI is down
+                logging.info("Falling back to best local match.")
+                best = ranked[0][1]["filename"]
+                return {
+                    "question": "The AI service is temporarily unavailable. Let's start with the basics: What is your name and address?",
+                    "filename": f"{data.subtype}/{best}" if data.subtype else best
+                }
+            finally:
+                if matched_template:
+                    question_task = drafts.pop(matched_template["filename"], None)
+                for task in drafts.values():
+                    task.cancel()
+
+            if not matched_template:
+                raise HTTPException(status_code=404, detail="Template match not found in metadata")
+
+        selected_filename = matched_template["filename"].strip()
+        logging.info(f"Selected Template File: {selected_filename}.docx")
+
+        doc_path = template_registry.docx_path(data.category, data.subtype, selected_filename)
+        if doc_path is None:
             raise HTTPException(status_code=404, detail="Selected template file not found")
 
-        doc = Document(doc_path)
-        full_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
-        question_prompt = (
-            "You are a professional legal assistant helping a user complete a legal document.\n"
-            "You are given the full text of the template. Read it carefully and identify all placeholders or gaps that must be completed by the user (e.g. [insert full address], empty lines, bullet point options, or areas left blank for details).\n\n"
-            "Ask questions one at a time to gather the exact information needed to fill in these blanks. Start with the most essential or obvious missing fields.\n"
-            "Make each question clear, simple, and specific — just like you're guiding someone through a form.\n"
-            "If there are multiple options in a section (e.g. a, b, c), ask follow-up questions to help the user choose the correct one.\n"
-            "Do not explain the document. Just act like a legal assistant who knows what details are needed and asks for them naturally, one by one.\n"
-            "Avoid asking for contact info unless the template explicitly requires it.\n\n"
-            "Once the necessary information has been collected, the document will be auto-completed and downloaded by the user."
-        )
-
         try:
-            q_response = groq_client.chat.completions.create(
-                model=GROQ_MODEL,
-                messages=[
-                    {"role": "system", "content": question_prompt},
-                    {"role": "user", "content": full_text},
-                ],
-                temperature=0.3,
-                max_tokens=150,
-            )
+            question = await (question_task or generate_first_question(matched_template, doc_path))
         except Exception as e:
             logging.error(f"Groq API error during first question generation: {str(e)}")
             return {
@@ -204,10 +279,12 @@ def start_ai_flow(data: AIStartRequest):
                 "filename": f"{data.subtype}/{selected_filename}" if data.subtype else selected_filename
             }
 
-        question = q_response.choices[0].message.content.strip()
+        # Only the chosen template gets a form session, never a dropped draft
+        form_id = await start_form_session(doc_path)
         return {
         "question": question,
-        "filename": f"{data.subtype}/{selected_filename}" if data.subtype else selected_filename
+        "filename": f"{data.subtype}/{selected_filename}" if data.subtype else selected_filename,
+        "session_id": form_id
     }
 
     except Exception as e:
@@ -218,22 +295,23 @@ class AINextRequest(BaseModel):
     category: str
     filename: str
     messages: List[dict]
+    session_id: str | None = None
 
 @app.post("/api/ai/next")
-def ai_next_question(data: AINextRequest):
+async def ai_next_question(data: AINextRequest):
     try:
-        subtype_path = data.filename.split("/", 1)
-        if len(subtype_path) == 2:
-            subfolder, filename = subtype_path
-            file_path = TEMPLATES_DIR / data.category / subfolder / f"{filename}.docx"
-        else:
-            file_path = TEMPLATES_DIR / data.category / f"{data.filename}.docx"
-
-        if not file_path.exists():
+        form = template_fields.form_sessions.get(data.session_id)
+        if form is not None:
+            # Fields are tracked server-side: store the latest answer and ask for the next one
+            answer = next((m.get("content", "") for m in reversed(data.messages) if m.get("role") == "user"), "")
+            follow_up = await template_fields.record_answer(form, answer)
+            return {"reply": follow_up or await template_fields.next_question(form)}
+
+        file_path = resolve_template_path(data.category, data.filename)
+        if file_path is None:
             raise HTTPException(status_code=404, detail="Template not found")
 
-        doc = Document(file_path)
-        template_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+        template_text = (await asyncio.to_thread(template_cache.get_template, file_path))["text"]
 
         system_prompt = (
             "You are a professional legal assistant continuing a session to help a user complete a legal document.\n"
@@ -244,7 +322,7 @@ def ai_next_question(data: AINextRequest):
             "Do not explain or summarize the document — focus only on gathering the required inputs naturally and efficiently."
         )
 
-        response = groq_client.chat.completions.create(
+        response = await llm_client.chat_completion(
             model=GROQ_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -270,163 +348,204 @@ class AICompleteRequest(BaseModel):
     category: str
     filename: str
     messages: List[dict]
+    session_id: str | None = None
 
 def extract_answers(messages: List[dict]):
     return [messages[i]["content"] for i in range(1, len(messages), 2) if messages[i]["role"] == "user"]
 
 @app.get("/api/categories")
 def list_categories():
-    categories = {}
-    for cat in TEMPLATES_DIR.iterdir():
-        if not cat.is_dir(): continue
-        subtypes = [sub.name for sub in cat.iterdir() if sub.is_dir() and ((sub / "metadata.json").exists() or any(f.suffix == ".docx" for f in sub.glob("*.docx")))]
-        if subtypes or any(f.suffix == ".docx" for f in cat.glob("*.docx")) or (cat / "metadata.json").exists():
-            categories[cat.name] = subtypes
-    return categories
+    return template_registry.categories()
 
 @app.post("/api/ai/complete")
-def complete_template(data: AICompleteRequest):
+async def complete_template(data: AICompleteRequest):
     filename = data.filename.replace(".docx", "")
-    file_path = TEMPLATES_DIR / data.category / f"{filename}.docx"
-    if not file_path.exists():
+    file_path = resolve_template_path(data.category, filename)
+    if file_path is None:
         raise HTTPException(status_code=404, detail="Template not found")
-    doc = Document(file_path)
 
-    # GPT-driven fill‑in logic
-    raw_template = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-    chat_log = "\n".join(f"{m['role']}: {m['content']}" for m in data.messages)
+    fields = (await asyncio.to_thread(template_cache.get_template, file_path))["fields"]
+    form = template_fields.form_sessions.get(data.session_id)
+
+    if form is not None:
+        # Every answer is already recorded against its field
+        if form["index"] < len(form["fields"]):
+            return {"nextQuestion": await template_fields.next_question(form)}
+        values = form["values"]
+    elif fields:
+        # The LLM only maps the conversation onto the field schema; the document is filled locally
+        schema = "\n".join(
+            f"{f['id']}: {f['label']}" + (f"\n{template_fields.options_text(f['options'])}" if f.get("options") else "")
+            for f in fields
+        )
+        chat_log = "\n".join(f"{m['role']}: {m['content']}" for m in data.messages)
 
-    fill_prompt = f"""
+        fill_prompt = f"""
 You are a professional legal assistant.
-Fill every gap in the document below (brackets, underlines, dotted blanks) using only the conversation data.
+Fill the fields of a legal document using only the conversation data.
 
-DOCUMENT TEMPLATE:
-{raw_template}
+FIELDS:
+{schema}
 
 CONVERSATION:
 {chat_log}
 
 Return JSON with:
-  nextQuestion: <string or null>
-  filledDocument: <complete text or null>
+  values: object mapping field id to its value (for fields with options, the option letter; omit fields the conversation does not answer)
+  nextQuestion: <question for the most important missing field, or null if the document can be completed>
 """
 
-    try:
-        resp = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[
-                {"role":"system","content":"You fill in and ask for missing info. Your output must be valid JSON."},
-                {"role":"user","content": fill_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=2000
-        )
-        content = resp.choices[0].message.content.strip()
-        
-        # Groq sometimes wraps JSON in markdown blocks
-        if "```json" in content:
-            content = content.split("```json")[-1].split("```")[0].strip()
-        
-        result = json.loads(content)
+        try:
+            resp = await llm_client.chat_completion(
+                model=GROQ_MODEL,
+                messages=[
+                    {"role":"system","content":"You extract form values and ask for missing info. Your output must be valid JSON."},
+                    {"role":"user","content": fill_prompt}
+                ],
+                temperature=0.2,
+                max_tokens=min(2000, 100 + 40 * len(fields))
+            )
+            content = resp.choices[0].message.content.strip()
 
-        if result.get("nextQuestion"):
-            return {"nextQuestion": result["nextQuestion"]}
-    except Exception as e:
-        logging.error(f"Error during completion: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate document. Please ensure all details are provided.")
-
-    # build final .docx from result["filledDocument"]
-    from io import BytesIO
-    out_doc = Document()
-    for line in result["filledDocument"].split("\n"):
-        out_doc.add_paragraph(line)
-    buf = BytesIO()
-    out_doc.save(buf)
-    buf.seek(0)
+            # Groq sometimes wraps JSON in markdown blocks
+            if "```json" in content:
+                content = content.split("```json")[-1].split("```")[0].strip()
+
+            result = json.loads(content)
+
+            if result.get("nextQuestion"):
+                return {"nextQuestion": result["nextQuestion"]}
+            values = result.get("values") or {}
+        except Exception as e:
+            logging.error(f"Error during completion: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to generate document. Please ensure all details are provided.")
+    else:
+        values = {}
+
+    buf = await asyncio.to_thread(template_fill.fill_document, file_path, fields, values)
     return StreamingResponse(
         buf,
         media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
         headers={"Content-Disposition":f"attachment; filename=filled_{filename}.docx"}
     )
 
+LEGAL_CHAT_SYSTEM_PROMPT = (
+    "You are Guardian, a Legal Information Assistant for Indian law.\n"
+    "Your role is to provide clear, simple, accurate, and responsible legal information to users. "
+    "You are not a lawyer and you do not give professional legal advice.\n\n"
+    "🎯 CORE OBJECTIVES:\n"
+    "- Answer legal questions based on Indian law.\n"
+    "- Use simple language suitable for non-lawyers.\n"
+    "- Be factually accurate, updated, and neutral.\n"
+    "- Never encourage illegal, harmful, or unethical behavior.\n\n"
+    "📚 LEGAL SCOPE & ACCURACY RULES:\n"
+    "- Criminal law: Use IPC (Indian Penal Code) for offences committed before 1 July 2024. Use BNS (Bharatiya Nyaya Sanhita) for offences committed on or after 1 July 2024.\n"
+    "- Explain Civil, family, property, labour, and cyber laws at a high level.\n"
+    "- If facts are insufficient, explain possible sections and state that the final decision depends on the court.\n"
+    "- Never say a valid Indian law 'does not exist' if it is legally recognized (e.g., BNS).\n\n"
+    "🚫 STRICT SAFETY RULES:\n"
+    "- Do NOT provide: Instructions to commit crimes, advice to escape punishment, or guidance for violence/fraud.\n"
+    "- If a user asks how to avoid punishment or expresses violent intent: Refuse to assist with wrongdoing, provide high-level legal consequences ONLY, and encourage lawful behavior.\n\n"
+    "🗣️ RESPONSE STYLE:\n"
+    "- Be concise but complete. Use bullet points or steps where helpful.\n"
+    "- Avoid unnecessary legal jargon. Be respectful and neutral.\n"
+    "- Do NOT sound robotic or threatening.\n\n"
+    "- 🔒 DOMAIN RESTRICTION RULE:\n"
+    "- Answer ONLY questions related to Indian law and legal matters."
+    "- If a question is non-legal, general, personal, technical, or unrelated to law, clearly state that you cannot answer it and ask the user to reframe the query as a legal question."
+    "- Do NOT provide general knowledge, opinions, or non-legal assistance under any circumstances."
+    "⚖️ MANDATORY DISCLAIMER:\n"
+    "You must ALWAYS include the following at the end of every response:\n"
+    "'Disclaimer: This response provides general legal information for educational purposes only and does not constitute professional legal advice. Please consult a qualified advocate for advice specific to your situation.'"
+)
+DISCLAIMER_TEXT = "Disclaimer: This response provides general legal information for educational purposes only"
+FULL_DISCLAIMER = f"{DISCLAIMER_TEXT} and does not constitute professional legal advice. Please consult a qualified advocate for advice specific to your situation."
+
+# First-turn replies, shared by identical questions (see response_cache.py)
+response_cache = get_response_cache()
+# Paraphrases of answered first turns (see semantic_cache.py); None when turned off
+semantic_cache = get_semantic_cache()
+CHAT_CACHE_NAMESPACE = response_cache.namespace(LEGAL_CHAT_SYSTEM_PROMPT, GROQ_MODEL, 0.4, 1500)
+
+@app.get("/api/chat/cache/stats")
+def get_chat_cache_stats():
+    return {**response_cache.stats(), "semantic": semantic_cache.stats() if semantic_cache else None}
+
+def chat_cache_key(message: str) -> str:
+    return response_cache.key(message, CHAT_CACHE_NAMESPACE)
+
+async def save_chat_history(session_id: str, history: List[dict], new_messages: List[dict]):
+    # The client's history is only stored when the session is not known yet.
+    # SQLite work runs in a thread so it never blocks the event loop (or a stream)
+    await asyncio.to_thread(session_store.append_turn, session_id, new_messages, history=history)
+    logging.info(f"Chat history saved for session: {session_id}")
+
+async def resolve_history(data: ChatRequest) -> List[dict]:
+    """History to send to the model: the stored session if known, otherwise the client's (trimmed) history."""
+    if data.session_id and await asyncio.to_thread(session_store.exists, data.session_id):
+        return await chat_context.load_history(session_store, data.session_id)
+    return chat_context.trim_history(data.history)
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
 @app.post("/api/chat")
-def legal_chat(data: ChatRequest):
+async def legal_chat(data: ChatRequest, response: Response,
+                     cache_bypass: str | None = Header(None, alias=BYPASS_HEADER)):
     """
     Guardian - Legal Information Assistant for Indian Law.
     Provides clear, accurate, and responsible legal information.
-    Automatically saves chat history.
+    Automatically saves chat history. First turns are answered from the
+    response cache when possible; the X-Cache header reports how.
     """
     try:
         # Generate session_id if not provided
         session_id = data.session_id or str(uuid.uuid4())
-        
-        system_prompt = (
-            "You are Guardian, a Legal Information Assistant for Indian law.\n"
-            "Your role is to provide clear, simple, accurate, and responsible legal information to users. "
-            "You are not a lawyer and you do not give professional legal advice.\n\n"
-            "🎯 CORE OBJECTIVES:\n"
-            "- Answer legal questions based on Indian law.\n"
-            "- Use simple language suitable for non-lawyers.\n"
-            "- Be factually accurate, updated, and neutral.\n"
-            "- Never encourage illegal, harmful, or unethical behavior.\n\n"
-            "📚 LEGAL SCOPE & ACCURACY RULES:\n"
-            "- Criminal law: Use IPC (Indian Penal Code) for offences committed before 1 July 2024. Use BNS (Bharatiya Nyaya Sanhita) for offences committed on or after 1 July 2024.\n"
-            "- Explain Civil, family, property, labour, and cyber laws at a high level.\n"
-            "- If facts are insufficient, explain possible sections and state that the final decision depends on the court.\n"
-            "- Never say a valid Indian law 'does not exist' if it is legally recognized (e.g., BNS).\n\n"
-            "🚫 STRICT SAFETY RULES:\n"
-            "- Do NOT provide: Instructions to commit crimes, advice to escape punishment, or guidance for violence/fraud.\n"
-            "- If a user asks how to avoid punishment or expresses violent intent: Refuse to assist with wrongdoing, provide high-level legal consequences ONLY, and encourage lawful behavior.\n\n"
-            "🗣️ RESPONSE STYLE:\n"
-            "- Be concise but complete. Use bullet points or steps where helpful.\n"
-            "- Avoid unnecessary legal jargon. Be respectful and neutral.\n"
-            "- Do NOT sound robotic or threatening.\n\n"
-            "- 🔒 DOMAIN RESTRICTION RULE:\n"
-            "- Answer ONLY questions related to Indian law and legal matters."
-            "- If a question is non-legal, general, personal, technical, or unrelated to law, clearly state that you cannot answer it and ask the user to reframe the query as a legal question."
-            "- Do NOT provide general knowledge, opinions, or non-legal assistance under any circumstances."
-            "⚖️ MANDATORY DISCLAIMER:\n"
-            "You must ALWAYS include the following at the end of every response:\n"
-            "'Disclaimer: This response provides general legal information for educational purposes only and does not constitute professional legal advice. Please consult a qualified advocate for advice specific to your situation.'"
-        )
+        history = await resolve_history(data)
 
-        response = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                *data.history,
-                {"role": "user", "content": data.message},
-            ],
-            temperature=0.4,
-            max_tokens=1500,
-        )
+        async def generate() -> str:
+            completion = await llm_client.chat_completion(
+                model=GROQ_MODEL,
+                messages=[
+                    {"role": "system", "content": LEGAL_CHAT_SYSTEM_PROMPT},
+                    *history,
+                    {"role": "user", "content": data.message},
+                ],
+                temperature=0.4,
+                max_tokens=1500,
+            )
+            reply = completion.choices[0].message.content.strip()
 
-        reply = response.choices[0].message.content.strip()
-        
-        # Ensure disclaimer is present if the AI somehow misses it
-        disclaimer_text = "Disclaimer: This response provides general legal information for educational purposes only"
-        if disclaimer_text not in reply:
-            reply += f"\n\n{disclaimer_text} and does not constitute professional legal advice. Please consult a qualified advocate for advice specific to your situation."
+            # Ensure disclaimer is present if the AI somehow misses it
+            if DISCLAIMER_TEXT not in reply:
+                reply += f"\n\n{FULL_DISCLAIMER}"
+            return reply
+
+        if history:
+            reply = await generate()
+        else:
+            bypass = bypass_requested(cache_bypass)
+            semantic_hit = False
+
+            async def generate_first_turn() -> str:
+                nonlocal semantic_hit
+                if semantic_cache is None:
+                    return await generate()
+                reply, semantic_hit = await semantic_cache.get_or_generate(
+                    CHAT_CACHE_NAMESPACE, data.message, generate, bypass=bypass
+                )
+                return reply
+
+            reply, cache_status = await response_cache.get_or_generate(
+                chat_cache_key(data.message), generate_first_turn, bypass=bypass
+            )
+            response.headers["X-Cache"] = "SEMANTIC" if semantic_hit else cache_status
 
         # Save chat history
-        updated_history = data.history + [
+        await save_chat_history(session_id, data.history, [
             {"role": "user", "content": data.message},
             {"role": "assistant", "content": reply}
-        ]
-        
-        chat_data = {
-            "session_id": session_id,
-            "timestamp": datetime.now().isoformat(),
-            "last_updated": datetime.now().isoformat(),
-            "conversation": updated_history
-        }
-        
-        # Save to file
-        history_file = CHAT_HISTORY_DIR / f"{session_id}.json"
-        with open(history_file, "w", encoding="utf-8") as f:
-            json.dump(chat_data, f, indent=2, ensure_ascii=False)
-        
-        logging.info(f"Chat history saved for session: {session_id}")
+        ])
 
         return {
             "reply": reply,
@@ -437,155 +556,122 @@ def legal_chat(data: ChatRequest):
         logging.error(f"Guardian Chat Error: {str(e)}")
         raise HTTPException(status_code=500, detail="Guardian is currently unreachable. Please try again in a few moments.")
 
+@app.post("/api/chat/stream")
+async def legal_chat_stream(data: ChatRequest, cache_bypass: str | None = Header(None, alias=BYPASS_HEADER)):
+    """
+    Streaming variant of /api/chat.
+    Forwards tokens as Server-Sent Events while they are generated, sends the
+    disclaimer as the final chunk if the model left it out, and saves the chat
+    history once the stream has finished. A cached first-turn reply is sent
+    as a single delta; completed first-turn streams fill the cache.
+    """
+    session_id = data.session_id or str(uuid.uuid4())
+    history = await resolve_history(data)
+    first_turn = not history
+    bypass = bypass_requested(cache_bypass)
+    cached, cache_status = None, "BYPASS" if bypass else "MISS"
+    if first_turn and not bypass:
+        cached = response_cache.get(chat_cache_key(data.message))
+        if cached is not None:
+            cache_status = "HIT"
+        elif semantic_cache is not None:
+            found = await asyncio.to_thread(semantic_cache.get, CHAT_CACHE_NAMESPACE, data.message)
+            if found is not None:
+                cached, cache_status = found[0], "SEMANTIC"
+
+    async def event_stream():
+        yield sse_event({"session_id": session_id})
+        if cached is not None:
+            yield sse_event({"delta": cached})
+            await save_chat_history(session_id, data.history, [
+                {"role": "user", "content": data.message},
+                {"role": "assistant", "content": cached}
+            ])
+            yield sse_event({"done": True, "session_id": session_id})
+            return
+
+        parts = []
+        try:
+            async for delta in llm_client.chat_completion_stream(
+                model=GROQ_MODEL,
+                messages=[
+                    {"role": "system", "content": LEGAL_CHAT_SYSTEM_PROMPT},
+                    *history,
+                    {"role": "user", "content": data.message},
+                ],
+                temperature=0.4,
+                max_tokens=1500,
+            ):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+        except Exception as e:
+            logging.error(f"Guardian Chat Stream Error: {str(e)}")
+            yield sse_event({"error": "Guardian is currently unreachable. Please try again in a few moments."})
+            return
+
+        reply = "".join(parts).strip()
+        if DISCLAIMER_TEXT not in reply:
+            yield sse_event({"delta": f"\n\n{FULL_DISCLAIMER}"})
+            reply += f"\n\n{FULL_DISCLAIMER}"
+        if first_turn:
+            response_cache.put(chat_cache_key(data.message), reply)
+            if semantic_cache is not None:
+                await asyncio.to_thread(semantic_cache.put, CHAT_CACHE_NAMESPACE, data.message, reply)
+
+        await save_chat_history(session_id, data.history, [
+            {"role": "user", "content": data.message},
+            {"role": "assistant", "content": reply}
+        ])
+        yield sse_event({"done": True, "session_id": session_id})
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if first_turn:
+        headers["X-Cache"] = cache_status
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=headers,
+    )
+
 @app.get("/api/chat/history/{session_id}")
 def get_chat_history(session_id: str):
     """
     Retrieve chat history for a specific session.
     """
-    history_file = CHAT_HISTORY_DIR / f"{session_id}.json"
-    
-    if not history_file.exists():
-        raise HTTPException(status_code=404, detail="Chat session not found")
-    
     try:
-        with open(history_file, "r", encoding="utf-8") as f:
-            chat_data = json.load(f)
-        return chat_data
+        chat_data = session_store.get_session(session_id)
     except Exception as e:
         logging.error(f"Error loading chat history: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to load chat history")
 
+    if chat_data is None:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return chat_data
+
 @app.get("/api/chat/sessions")
 def list_chat_sessions():
     """
-    List all chat sessions with metadata.
+    List all chat sessions with metadata, most recently updated first.
     """
     try:
-        sessions = []
-        for history_file in CHAT_HISTORY_DIR.glob("*.json"):
-            try:
-                with open(history_file, "r", encoding="utf-8") as f:
-                    chat_data = json.load(f)
-                    
-                # Extract first user message as preview
-                first_message = "No messages"
-                for msg in chat_data.get("conversation", []):
-                    if msg.get("role") == "user":
-                        first_message = msg.get("content", "")[:100]
-                        break
-                
-                sessions.append({
-                    "session_id": chat_data.get("session_id"),
-                    "timestamp": chat_data.get("timestamp"),
-                    "last_updated": chat_data.get("last_updated"),
-                    "message_count": len(chat_data.get("conversation", [])),
-                    "preview": first_message
-                })
-            except Exception as e:
-                logging.error(f"Error reading session file {history_file}: {str(e)}")
-                continue
-        
-        # Sort by last_updated (most recent first)
-        sessions.sort(key=lambda x: x.get("last_updated", ""), reverse=True)
-        
-        return {"sessions": sessions}
+        return {"sessions": session_store.list_sessions()}
     except Exception as e:
         logging.error(f"Error listing chat sessions: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to list chat sessions")
 
-@app.post("/api/analyze")
-async def analyze_image(file: UploadFile = File(...)):
-    """
-    Legal Document Analyzer for Indian Law.
-    Analyzes uploaded legal documents and returns structured JSON output.
-    Supports: PDF, DOCX, TXT, images (JPG/PNG/WEBP), and other text-based formats.
-    """
-    filename = file.filename.lower()
-    logging.info(f"Received file for legal analysis: {filename}")
-    
-    try:
-        file_bytes = await file.read()
-        extracted_text = ""
-        
-        # Extract text based on file type
-        if any(filename.endswith(ext) for ext in [".jpg", ".jpeg", ".png", ".webp"]):
-            # Use Vision Model for images (OCR-like extraction)
-            encoded_image = base64.b64encode(file_bytes).decode("utf-8")
-            
-            ocr_prompt = (
-                "Extract ALL visible text from this image. "
-                "Include legal content, headings, sections, clauses, dates, names, and any other text. "
-                "Preserve the structure and formatting as much as possible. "
-                "If the image contains no readable text, respond with 'NO_TEXT_FOUND'."
-            )
-            
-            response = groq_client.chat.completions.create(
-                model=GROQ_VISION_MODEL,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": ocr_prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:{file.content_type};base64,{encoded_image}"},
-                            },
-                        ],
-                    }
-                ],
-                max_tokens=2000,
-            )
-            
-            extracted_text = response.choices[0].message.content.strip()
-            
-            if extracted_text == "NO_TEXT_FOUND" or not extracted_text:
-                return JSONResponse(content={
-                    "document_type": "Unreadable Document",
-                    "applicable_laws": [],
-                    "important_sections": [],
-                    "summary": "No readable text could be extracted from the uploaded image.",
-                    "key_observations": [],
-                    "warnings": ["The image does not contain readable text or is too blurry."],
-                    "disclaimer": "Only legal documents with readable text can be analyzed by this system."
-                })
+ANALYZE_TEXT_LIMIT = 30000
+TRUNCATION_NOTE = "\n\n[The document is longer than this; the text above is truncated.]"
+# Joins a document's chunks in the analysis cache's text layer
+CHUNK_SEPARATOR = "\x1e"
+# Part of the analysis cache key: bump when the analysis or OCR prompt changes
+ANALYSIS_PROMPT_VERSION = "1"
+analysis_cache = get_analysis_cache()
 
-        elif filename.endswith(".pdf"):
-            doc = fitz.open(stream=file_bytes, filetype="pdf")
-            for page in doc:
-                extracted_text += page.get_text()
-            doc.close()
+@app.get("/api/analyze/cache/stats")
+def get_analysis_cache_stats():
+    return analysis_cache.stats()
 
-        elif filename.endswith(".docx"):
-            doc = Document(io.BytesIO(file_bytes))
-            extracted_text = "\n".join([p.text for p in doc.paragraphs])
-
-        elif filename.endswith(".txt"):
-            extracted_text = file_bytes.decode("utf-8", errors="ignore")
-
-        else:
-            # Try generic text extraction
-            try:
-                extracted_text = file_bytes.decode("utf-8", errors="ignore")
-            except:
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Unsupported file format. Please upload PDF, DOCX, TXT, JPG, PNG, or WEBP."
-                )
-
-        # Check if text was extracted
-        if not extracted_text.strip():
-            return JSONResponse(content={
-                "document_type": "Empty Document",
-                "applicable_laws": [],
-                "important_sections": [],
-                "summary": "No readable text found in the uploaded file.",
-                "key_observations": [],
-                "warnings": ["The file appears to be empty or corrupted."],
-                "disclaimer": "Only legal documents with readable text can be analyzed by this system."
-            })
-
-        # Legal Document Analysis System Prompt
-        analysis_prompt = f"""You are a Legal Document Analyzer for Indian law.
+LEGAL_ANALYSIS_PROMPT = """You are a Legal Document Analyzer for Indian law.
 
 FILE HANDLING / UPLOAD RULES (STRICT):
 - You will receive text extracted from an uploaded file of ANY type, including but not limited to:
@@ -639,35 +725,138 @@ OUTPUT FORMAT (STRICT JSON):
 }}
 
 DOCUMENT TEXT TO ANALYZE:
-{extracted_text[:30000]}
+{document_text}
 
 Respond ONLY with valid JSON. Do not include markdown code blocks or any text outside the JSON structure."""
 
-        # Call Groq API for analysis
-        response = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a legal document analyzer. Always respond with valid JSON only."},
-                {"role": "user", "content": analysis_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=3000,
-        )
+async def analyze_legal_text(document_text: str) -> dict:
+    """One analysis call over `document_text`. Raises json.JSONDecodeError if the reply is not JSON."""
+    response = await llm_client.chat_completion(
+        model=GROQ_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a legal document analyzer. Always respond with valid JSON only."},
+            {"role": "user", "content": LEGAL_ANALYSIS_PROMPT.format(document_text=document_text)}
+        ],
+        temperature=0.2,
+        max_tokens=3000,
+    )
+    return parse_json_reply(response.choices[0].message.content)
 
-        result_text = response.choices[0].message.content.strip()
-        
-        # Clean up potential markdown wrapping
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[-1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].strip()
-        
-        # Parse JSON
-        try:
-            result_json = json.loads(result_text)
-            from fastapi.responses import JSONResponse
-            return JSONResponse(content=result_json)
-        except json.JSONDecodeError:
+@app.post("/api/analyze")
+async def analyze_image(file: UploadFile = File(...)):
+    """
+    Legal Document Analyzer for Indian Law.
+    Analyzes uploaded legal documents and returns structured JSON output.
+    Supports: PDF, DOCX, TXT, images (JPG/PNG/WEBP), and other text-based formats.
+    """
+    filename = file.filename.lower()
+    logging.info(f"Received file for legal analysis: {filename}")
+    
+    try:
+        is_image = filename.endswith(document_ingest.IMAGE_EXTENSIONS)
+        async with document_ingest.spooled_upload(file) as (upload_path, digest):
+            # Identical uploads are answered from the cache without any extraction or LLM call
+            analysis_key = cache_key(digest, ANALYSIS_PROMPT_VERSION, GROQ_MODEL, ANALYZE_TEXT_LIMIT, ANALYZE_MAX_CHUNKS)
+            cached = analysis_cache.get_analysis(analysis_key)
+            if cached is not None:
+                logging.info(f"Analysis cache hit for {filename}")
+                return JSONResponse(content=cached)
+
+            if is_image:
+                text_key = cache_key(digest, "image", ANALYSIS_PROMPT_VERSION, GROQ_VISION_MODEL, ocr.OCR_ENGINE)
+            else:
+                text_key = cache_key(digest, "chunks", ANALYZE_TEXT_LIMIT, ANALYZE_MAX_CHUNKS)
+            cached_text = analysis_cache.get_text(text_key)
+
+            chunks = None
+            if cached_text is not None:
+                chunks, truncated = cached_text[0].split(CHUNK_SEPARATOR), cached_text[1]
+            elif is_image:
+                # Local OCR in the extraction pool; the vision model is only the fallback
+                ocr_text = await extraction_pool.run(ocr.ocr_image_file, upload_path, filename)
+                if ocr_text:
+                    chunks, truncated = [ocr_text[:ANALYZE_TEXT_LIMIT]], len(ocr_text) > ANALYZE_TEXT_LIMIT
+                    analysis_cache.put_text(text_key, chunks[0], truncated)
+                else:
+                    # Greyscale, resized and re-encoded (tiled if very tall) to keep the payload small
+                    vision_images = await extraction_pool.run(image_prep.prepare_vision_images, upload_path, filename)
+            else:
+                # In the extraction process pool: page-aligned chunks of at most ANALYZE_TEXT_LIMIT characters
+                chunks, truncated = await extraction_pool.run(
+                    document_ingest.extract_chunks, upload_path, filename, ANALYZE_TEXT_LIMIT, ANALYZE_MAX_CHUNKS
+                )
+                analysis_cache.put_text(text_key, CHUNK_SEPARATOR.join(chunks), truncated)
+
+        if chunks is None:
+            # No local OCR result: use the Vision Model for the image
+            ocr_prompt = (
+                "Extract ALL visible text from this image. "
+                "Include legal content, headings, sections, clauses, dates, names, and any other text. "
+                "Preserve the structure and formatting as much as possible. "
+                "If the image contains no readable text, respond with 'NO_TEXT_FOUND'."
+            )
+            if len(vision_images) > 1:
+                ocr_prompt += " The page is split into consecutive, slightly overlapping parts; read them in order as one page."
+            
+            response = await llm_client.chat_completion(
+                model=GROQ_VISION_MODEL,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": ocr_prompt},
+                            *[{"type": "image_url", "image_url": {"url": url}} for url in vision_images],
+                        ],
+                    }
+                ],
+                max_tokens=2000,
+            )
+            
+            extracted_text = response.choices[0].message.content.strip()
+            truncated = False
+            
+            if extracted_text == "NO_TEXT_FOUND" or not extracted_text:
+                return JSONResponse(content={
+                    "document_type": "Unreadable Document",
+                    "applicable_laws": [],
+                    "important_sections": [],
+                    "summary": "No readable text could be extracted from the uploaded image.",
+                    "key_observations": [],
+                    "warnings": ["The image does not contain readable text or is too blurry."],
+                    "disclaimer": "Only legal documents with readable text can be analyzed by this system."
+                })
+            analysis_cache.put_text(text_key, extracted_text)
+            chunks, truncated = [extracted_text], False
+
+        # Check if text was extracted
+        if not any(chunk.strip() for chunk in chunks):
+            return JSONResponse(content={
+                "document_type": "Empty Document",
+                "applicable_laws": [],
+                "important_sections": [],
+                "summary": "No readable text found in the uploaded file.",
+                "key_observations": [],
+                "warnings": ["The file appears to be empty or corrupted."],
+                "disclaimer": "Only legal documents with readable text can be analyzed by this system."
+            })
+
+        complete = True
+        if len(chunks) == 1:
+            document_text = chunks[0] + (TRUNCATION_NOTE if truncated else "")
+            try:
+                result_json = await analyze_legal_text(document_text)
+            except json.JSONDecodeError:
+                result_json = None
+        else:
+            # Long document: analyse every chunk concurrently, then merge the results locally
+            logging.info(f"Analysing {filename} in {len(chunks)} parts")
+            results = await analyze_chunks(
+                chunks, lambda chunk, part, total: analyze_legal_text(part_header(part, total) + chunk)
+            )
+            result_json = merge_analyses(results, truncated)
+            complete = all_parts_analysed(results)
+
+        if result_json is None:
             # Fallback if JSON parsing fails
             return JSONResponse(content={
                 "document_type": "Analysis Error",
@@ -678,7 +867,13 @@ Respond ONLY with valid JSON. Do not include markdown code blocks or any text ou
                 "warnings": ["JSON parsing error occurred during analysis."],
                 "disclaimer": "This analysis provides general legal information for educational purposes only."
             })
+        # A result missing failed parts is served once, not cached: the next upload retries them
+        if complete:
+            analysis_cache.put_analysis(analysis_key, result_json)
+        return JSONResponse(content=result_json)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Legal Analysis Error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
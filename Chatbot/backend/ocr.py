@@ -0,0 +1,151 @@
+# ocr.py
+"""
+Local OCR for /api/analyze, run inside the extraction process pool.
+
+Images are normalised with PIL before recognition: EXIF rotation applied,
+converted to greyscale, downscaled to OCR_MAX_SIDE pixels and binarised with
+an Otsu threshold. Textless (scanned) PDF pages are rasterised with PyMuPDF and
+go through the same path.
+
+Engines are pluggable: subclass OcrEngine, register_engine() it and select it
+with OCR_ENGINE. The default is Tesseract via pytesseract (pip install
+pytesseract, plus the tesseract binary). OCR_ENGINE=none, or a missing
+engine, disables local OCR; callers then fall back to the vision model. So
+does an upload PIL or the engine cannot read: it is logged and OCR returns "".
+"""
+import os
+import logging
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageOps
+
+from image_prep import orient_greyscale
+
+OCR_ENGINE = os.getenv("OCR_ENGINE", "tesseract").lower()
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "eng")
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2000"))
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "200"))
+# Scanned pages OCR'd per PDF; later textless pages are skipped
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "30"))
+# Less text than this counts as "nothing found", so the caller can fall back
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "20"))
+
+
+class OcrEngine:
+    name = "base"
+
+    def available(self) -> bool:
+        return False
+
+    def image_to_text(self, image: Image.Image) -> str:
+        raise NotImplementedError
+
+
+class TesseractEngine(OcrEngine):
+    name = "tesseract"
+
+    def __init__(self, languages: str = OCR_LANGUAGES):
+        self.languages = languages
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            self._tesseract = pytesseract
+        except Exception as e:
+            logging.warning(f"Tesseract OCR is not available: {str(e)}")
+            self._tesseract = None
+
+    def available(self) -> bool:
+        return self._tesseract is not None
+
+    def image_to_text(self, image: Image.Image) -> str:
+        # --psm 3: automatic page segmentation, suits letters, notices and judgments
+        return self._tesseract.image_to_string(image, lang=self.languages, config="--psm 3")
+
+
+_ENGINES = {"tesseract": TesseractEngine}
+_engine = None
+_engine_loaded = False
+
+
+def register_engine(name: str, engine_class: type):
+    _ENGINES[name.lower()] = engine_class
+
+
+def get_engine() -> OcrEngine | None:
+    """The configured engine for this process, or None if local OCR is off or unavailable."""
+    global _engine, _engine_loaded
+    if not _engine_loaded:
+        _engine_loaded = True
+        engine_class = _ENGINES.get(OCR_ENGINE)
+        if engine_class is None:
+            if OCR_ENGINE != "none":
+                logging.warning(f"Unknown OCR_ENGINE '{OCR_ENGINE}', local OCR disabled")
+        else:
+            engine = engine_class()
+            _engine = engine if engine.available() else None
+    return _engine
+
+
+def _otsu_threshold(image: Image.Image) -> int:
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_below = weight_below = 0
+    best, threshold = 0.0, 127
+    for i, h in enumerate(histogram):
+        weight_below += h
+        if weight_below == 0:
+            continue
+        weight_above = total - weight_below
+        if weight_above == 0:
+            break
+        sum_below += i * h
+        mean_below = sum_below / weight_below
+        mean_above = (sum_all - sum_below) / weight_above
+        between = weight_below * weight_above * (mean_below - mean_above) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+
+def preprocess(image: Image.Image, max_side: int = OCR_MAX_SIDE) -> Image.Image:
+    """Greyscale, downscaled, binarised copy of `image` for OCR."""
+    image = ImageOps.autocontrast(orient_greyscale(image))
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    threshold = _otsu_threshold(image)
+    return image.point(lambda p: 255 if p > threshold else 0, mode="1")
+
+
+def _recognise(image: Image.Image) -> str:
+    engine = get_engine()
+    if engine is None:
+        return ""
+    text = engine.image_to_text(preprocess(image)).strip()
+    return text if len(text) >= OCR_MIN_CHARS else ""
+
+
+def ocr_image_file(path, filename: str = "") -> str:
+    """OCR an uploaded image file. Returns "" when nothing usable was recognised or OCR is unavailable."""
+    if get_engine() is None:
+        return ""
+    try:
+        with Image.open(path) as image:
+            return _recognise(image)
+    except Exception as e:
+        # Corrupt or unsupported upload, or a Tesseract failure: let the vision model try
+        logging.warning(f"Local OCR failed for {filename or path}: {str(e)}")
+        return ""
+
+
+def ocr_pdf_page(page: fitz.Page) -> str:
+    """Rasterise a PDF page (one without a text layer) and OCR it."""
+    if get_engine() is None:
+        return ""
+    try:
+        pixmap = page.get_pixmap(dpi=OCR_PDF_DPI, colorspace=fitz.csGRAY)
+        image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples, "raw", "L", pixmap.stride)
+        return _recognise(image)
+    except Exception as e:
+        logging.warning(f"Local OCR failed for PDF page {page.number + 1}: {str(e)}")
+        return ""
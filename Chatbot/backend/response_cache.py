@@ -0,0 +1,162 @@
+# response_cache.py
+"""
+In-process cache for first-turn /api/chat replies.
+
+Many chats open with the same question ("What is IPC 302?"), and each one is
+a full 70B completion. A first turn (no history) is keyed by the normalised
+message, a hash of the system prompt and the model, so editing the prompt or
+switching models never serves stale answers. Entries expire after
+CHAT_CACHE_TTL seconds and the least recently used are dropped beyond
+CHAT_CACHE_MAX_ENTRIES (0 disables the cache).
+
+get_or_generate() is single-flight: while one request is generating a reply
+for a key, identical requests wait for that call instead of starting their
+own. Clients can skip the lookup with the X-Cache-Bypass header; the fresh
+reply then replaces the cached one.
+"""
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1000"))
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", str(24 * 3600)))
+BYPASS_HEADER = "X-Cache-Bypass"
+
+
+def normalize_message(message: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question."""
+    text = unicodedata.normalize("NFKC", message).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip("?!.。 ")
+
+
+def bypass_requested(header_value: str | None) -> bool:
+    return header_value is not None and header_value.strip().lower() not in ("", "0", "false", "no")
+
+
+class ResponseCache:
+    """LRU + TTL map from cache key to reply text. Used from the event loop only."""
+
+    def __init__(self, max_entries: int = CHAT_CACHE_MAX_ENTRIES, ttl: int = CHAT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._pending: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    @staticmethod
+    def namespace(system_prompt: str, model: str, *params) -> str:
+        """Identifies the prompt, model and sampling settings a reply was generated with."""
+        parts = [hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(), model, *params]
+        return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def key(self, message: str, namespace: str) -> str:
+        return hashlib.sha256(f"{namespace}\x1f{normalize_message(message)}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, reply = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return reply
+
+    def get(self, key: str) -> str | None:
+        if not self.enabled:
+            return None
+        reply = self._lookup(key)
+        if reply is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return reply
+
+    def put(self, key: str, reply: str):
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_generate(self, key: str, generate: Callable[[], Awaitable[str]],
+                              bypass: bool = False) -> tuple[str, str]:
+        """
+        Return (reply, status) where status is HIT, COALESCED (shared another request's
+        call), MISS or BYPASS. Only MISS and BYPASS call `generate`; failures are not cached.
+        """
+        if not self.enabled:
+            return await generate(), "BYPASS"
+        if bypass:
+            self.bypassed += 1
+            status = "BYPASS"
+        else:
+            reply = self._lookup(key)
+            if reply is not None:
+                self.hits += 1
+                return reply, "HIT"
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                # Shielded so a disconnecting follower does not cancel the shared call
+                return await asyncio.shield(pending), "COALESCED"
+            self.misses += 1
+            status = "MISS"
+
+        async def run() -> str:
+            reply = await generate()
+            self.put(key, reply)
+            return reply
+
+        task = asyncio.ensure_future(run())
+        if not bypass:
+            self._pending[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task), status
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Chat reply generation failed, not cached: {str(task.exception())}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            # Share of cacheable requests answered without their own LLM call
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "in_flight": len(self._pending),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+        }
+
+
+_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
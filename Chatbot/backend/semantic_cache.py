@@ -0,0 +1,394 @@
+# semantic_cache.py
+"""
+Near-duplicate cache for first-turn /api/chat questions.
+
+The exact-match response cache misses paraphrases ("punishment for murder
+IPC" / "what is the sentence for murder under IPC"). This layer embeds each
+answered question on the CPU and keeps the vectors in an in-memory NumPy
+matrix; a new question whose cosine similarity to a cached one reaches
+SEMANTIC_CACHE_THRESHOLD gets that question's reply.
+
+Legal questions that differ only in a section number or an act ("IPC 302" /
+"IPC 307", "murder under IPC" / "murder under BNS"), or in who does what to
+whom ("wife ... from her husband" / "husband ... from his wife", "FIR against
+my husband" / "FIR against the police") embed almost identically, so a match
+also requires the same numbers, act abbreviations and parties in the same
+order and roles. semantic_cache_check.py lists paraphrases that must match
+and contrasting questions that must not; run it after changing the embedder,
+the threshold or the anchors.
+
+Embedders are pluggable like OCR engines (SEMANTIC_CACHE_EMBEDDER):
+  - "hashing" (default): hashed word and character-trigram features with
+    legal synonyms folded together. No model download, microseconds per query.
+  - "sentence-transformers": a local sentence-transformers model
+    (SEMANTIC_CACHE_MODEL); pip install sentence-transformers. Use a higher
+    threshold, around 0.9.
+
+Entries (question, reply, vector) are persisted in SQLite and reloaded on
+start, skipping expired ones and those from a different embedder. Each entry
+expires SEMANTIC_CACHE_TTL seconds after it was stored, and beyond
+SEMANTIC_CACHE_MAX_ENTRIES the least recently used are evicted.
+The layer is off unless SEMANTIC_CACHE=1: a wrong hit serves another
+question's legal answer, so enable it only after semantic_cache_check.py
+passes for the embedder and threshold in use.
+"""
+import os
+import re
+import time
+import zlib
+import sqlite3
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import numpy as np
+
+from response_cache import normalize_message
+
+BASE_DIR = Path(__file__).resolve().parent
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_PATH = Path(os.getenv("SEMANTIC_CACHE_PATH", str(BASE_DIR / "semantic_cache.db")))
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing").lower()
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.88"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", str(7 * 24 * 3600)))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+# Words that carry no meaning for matching questions. "how" is kept: "what is anticipatory
+# bail" and "how to get anticipatory bail" need different answers.
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "what", "whats", "which", "who",
+    "do", "does", "did", "can", "could", "should", "would", "will", "i", "me", "my", "we", "you",
+    "your", "it", "its", "of", "for", "to", "in", "on", "at", "by", "with", "about", "under", "as",
+    "per", "and", "or", "if", "any", "there", "this", "that", "please", "tell", "explain", "say",
+    "says", "give", "know", "want", "meaning", "mean", "means", "according", "law", "indian",
+    "india", "section", "act", "code",
+}
+# Interchangeable words in users' legal questions, folded onto one token
+SYNONYMS = {
+    "punishment": "punish", "punishments": "punish", "punished": "punish", "sentence": "punish",
+    "sentenced": "punish", "penalty": "punish", "penalties": "punish", "jail": "punish",
+    "imprisonment": "punish", "prison": "punish",
+    "sec": "section", "sections": "section", "s": "section", "u/s": "section",
+    "killing": "murder", "murdering": "murder", "murdered": "murder",
+    "bailable": "bail", "fir": "complaint", "complain": "complaint",
+}
+# Act abbreviations that must match exactly, with their common long forms
+ACTS = {
+    "ipc": "ipc", "penal": "ipc", "bns": "bns", "nyaya": "bns", "crpc": "crpc", "bnss": "bnss",
+    "nagarik": "bnss", "cpc": "cpc", "iea": "iea", "bsa": "bsa", "sakshya": "bsa", "pocso": "pocso",
+    "ndps": "ndps", "rti": "rti", "mva": "mva", "posh": "posh", "dv": "dv", "ni": "ni",
+}
+
+# People and bodies a question is about, folded to one name each. Which parties a question
+# names, in what order and in what role decide its answer ("can a wife claim maintenance from
+# her husband" / "can a husband claim maintenance from his wife"), but barely move a
+# bag-of-words vector, so they must match exactly too.
+PARTIES = {
+    "husband": "husband", "husbands": "husband", "wife": "wife", "wives": "wife",
+    "spouse": "spouse", "police": "police", "policeman": "police", "cop": "police", "cops": "police",
+    "officer": "police", "landlord": "landlord", "owner": "landlord", "tenant": "tenant",
+    "tenants": "tenant", "employer": "employer", "boss": "employer", "company": "employer",
+    "employee": "employee", "employees": "employee", "worker": "employee", "seller": "seller",
+    "shopkeeper": "seller", "builder": "seller", "buyer": "buyer", "customer": "buyer",
+    "consumer": "buyer", "neighbour": "neighbour", "neighbor": "neighbour", "father": "father",
+    "mother": "mother", "parent": "parent", "parents": "parent", "son": "son", "daughter": "daughter",
+    "child": "child", "children": "child", "brother": "brother", "sister": "sister",
+    "friend": "friend", "doctor": "doctor", "hospital": "hospital", "bank": "bank",
+    "government": "government", "accused": "accused", "victim": "victim", "minor": "child",
+    "lawyer": "lawyer", "advocate": "lawyer", "judge": "judge", "court": "court",
+}
+# Prepositions that give the party after them a role, and the words that may sit in between
+ROLE_WORDS = {"against": "against", "on": "against", "from": "from", "to": "to", "for": "to", "by": "by"}
+DETERMINERS = {"a", "an", "the", "my", "his", "her", "our", "their", "your", "its", "s"}
+# Words that negate the word after them ("non-bailable", "without notice"); the negated word is anchored
+NEGATIONS = {"non", "not", "no", "without", "never", "cannot", "cant", "nahi"}
+
+_TOKEN_RE = re.compile(r"[a-z]+/?[a-z]*|\d+[a-z]?")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in _TOKEN_RE.findall(normalize_message(text)):
+        token = SYNONYMS.get(token, token)
+        if token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def anchors(text: str) -> str:
+    """
+    What a cached question must share exactly with `text`: its section numbers
+    and acts, negated words ("not:bail"), and the parties it names in order,
+    each with its role ("wife from:husband", "against:police").
+    """
+    found = set()
+    parties = []
+    role = None
+    negated = False
+    for token in _TOKEN_RE.findall(normalize_message(text)):
+        if token in NEGATIONS:
+            negated = True
+        elif negated and token not in DETERMINERS:
+            found.add(f"not:{SYNONYMS.get(token, token)}")
+            negated = False
+        if token[0].isdigit():
+            found.add(token)
+        elif token in ACTS:
+            found.add(ACTS[token])
+        if token in PARTIES:
+            party = f"{role}:{PARTIES[token]}" if role else PARTIES[token]
+            if not parties or parties[-1] != party:
+                parties.append(party)
+            role = None
+        elif token in ROLE_WORDS:
+            role = ROLE_WORDS[token]
+        elif token not in DETERMINERS:
+            role = None
+    return " ".join(sorted(found) + parties)
+
+
+class Embedder:
+    name = "base"
+    dim = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        """Unit-length float32 vector for `text`."""
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    name = "hashing"
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            # crc32, unlike hash(), is stable across processes, so persisted vectors stay valid
+            vector[zlib.crc32(token.encode("utf-8")) % self.dim] += 2.0
+            padded = f"<{token}>"
+            for i in range(len(padded) - 2):
+                vector[zlib.crc32(padded[i:i + 3].encode("utf-8")) % self.dim] += 0.5
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder(Embedder):
+    name = "sentence-transformers"
+
+    def __init__(self, model: str = SEMANTIC_CACHE_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self._model = SentenceTransformer(model, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers:{model}"
+
+    def embed(self, text: str) -> np.ndarray:
+        return self._model.encode(normalize_message(text), normalize_embeddings=True).astype(np.float32)
+
+
+_EMBEDDERS = {"hashing": HashingEmbedder, "sentence-transformers": SentenceTransformerEmbedder}
+
+
+def register_embedder(name: str, embedder_class: type):
+    _EMBEDDERS[name.lower()] = embedder_class
+
+
+def load_embedder(name: str = SEMANTIC_CACHE_EMBEDDER) -> Embedder | None:
+    embedder_class = _EMBEDDERS.get(name)
+    if embedder_class is None:
+        logging.warning(f"Unknown SEMANTIC_CACHE_EMBEDDER '{name}', semantic cache disabled")
+        return None
+    try:
+        return embedder_class()
+    except Exception as e:
+        logging.warning(f"Embedder '{name}' is not available, semantic cache disabled: {str(e)}")
+        return None
+
+
+class SemanticCache:
+    """
+    Vectors live in a preallocated (max_entries, dim) matrix searched with one
+    matrix-vector product; replies are read from SQLite on a hit. Thread-safe.
+    """
+
+    def __init__(self, embedder: Embedder, db_path: Path = SEMANTIC_CACHE_PATH,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl: int = SEMANTIC_CACHE_TTL,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.embedder = embedder
+        self.db_path = Path(db_path)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((max_entries, embedder.dim), dtype=np.float32)
+        # Row metadata, parallel to the first len(self._ids) rows of self._vectors
+        self._ids: list[int] = []
+        self._meta: list[tuple[str, str, float]] = []  # (namespace, anchors, expires_at)
+        self._last_used: list[float] = []
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                question TEXT NOT NULL,
+                anchors TEXT NOT NULL,
+                reply TEXT NOT NULL,
+                embedder TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_semantic_question ON semantic_cache(namespace, question);
+            """)
+        self._load()
+
+    def _load(self):
+        now = time.time()
+        with self._conn:
+            self._conn.execute("DELETE FROM semantic_cache WHERE expires_at <= ? OR embedder != ?",
+                               (now, self.embedder.name))
+        rows = self._conn.execute(
+            "SELECT id, namespace, question, vector, expires_at, last_used FROM semantic_cache "
+            "ORDER BY last_used DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        for row_id, namespace, question, blob, expires_at, last_used in reversed(rows):
+            # Recomputed rather than read back, so entries stored under older anchor rules are held to the current ones
+            anchor_text = anchors(question)
+            vector = np.frombuffer(blob, dtype=np.float32)
+            if vector.shape[0] != self.embedder.dim:
+                continue
+            self._append(row_id, vector, namespace, anchor_text, expires_at, last_used)
+        logging.info(f"Semantic cache loaded {len(self._ids)} entries ({self.embedder.name})")
+
+    def _append(self, row_id: int, vector: np.ndarray, namespace: str, anchor_text: str,
+                expires_at: float, last_used: float):
+        self._vectors[len(self._ids)] = vector
+        self._ids.append(row_id)
+        self._meta.append((namespace, anchor_text, expires_at))
+        self._last_used.append(last_used)
+
+    def _remove(self, index: int) -> int:
+        """Drop row `index` by moving the last row into its place. Returns the removed row id."""
+        last = len(self._ids) - 1
+        row_id = self._ids[index]
+        if index != last:
+            self._vectors[index] = self._vectors[last]
+            self._ids[index] = self._ids[last]
+            self._meta[index] = self._meta[last]
+            self._last_used[index] = self._last_used[last]
+        self._ids.pop()
+        self._meta.pop()
+        self._last_used.pop()
+        return row_id
+
+    def get(self, namespace: str, question: str) -> tuple[str, float] | None:
+        """(reply, similarity) of the closest cached question that is similar enough, or None."""
+        vector = self.embedder.embed(question)
+        question_anchors = anchors(question)
+        now = time.time()
+        with self._lock:
+            count = len(self._ids)
+            if count:
+                scores = self._vectors[:count] @ vector
+                for index in np.argsort(-scores)[:8]:
+                    score = float(scores[index])
+                    if score < self.threshold:
+                        break
+                    entry_namespace, entry_anchors, expires_at = self._meta[index]
+                    if entry_namespace != namespace or entry_anchors != question_anchors or expires_at <= now:
+                        continue
+                    row = self._conn.execute("SELECT reply FROM semantic_cache WHERE id = ?",
+                                             (self._ids[index],)).fetchone()
+                    if row is None:
+                        continue
+                    self._last_used[index] = now
+                    with self._conn:
+                        self._conn.execute("UPDATE semantic_cache SET last_used = ? WHERE id = ?",
+                                           (now, self._ids[index]))
+                    self.hits += 1
+                    return row[0], score
+            self.misses += 1
+        return None
+
+    def put(self, namespace: str, question: str, reply: str):
+        vector = self.embedder.embed(question)
+        normalized = normalize_message(question)
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            doomed = []
+            # Replace an earlier answer to the same question, and drop expired entries
+            for index in range(len(self._ids) - 1, -1, -1):
+                if self._meta[index][2] <= now:
+                    doomed.append(self._remove(index))
+            same = {r[0] for r in self._conn.execute(
+                "SELECT id FROM semantic_cache WHERE namespace = ? AND question = ?", (namespace, normalized))}
+            for index in range(len(self._ids) - 1, -1, -1):
+                if self._ids[index] in same:
+                    doomed.append(self._remove(index))
+            while len(self._ids) >= self.max_entries:
+                doomed.append(self._remove(int(np.argmin(self._last_used))))
+            try:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM semantic_cache WHERE id = ?", [(i,) for i in doomed + list(same)])
+                    cursor = self._conn.execute(
+                        "INSERT INTO semantic_cache (namespace, question, anchors, reply, embedder, vector, "
+                        "created_at, expires_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (namespace, normalized, anchors(question), reply, self.embedder.name,
+                         vector.tobytes(), now, expires_at, now),
+                    )
+            except sqlite3.Error as e:
+                logging.error(f"Failed to store semantic cache entry: {str(e)}")
+                return
+            self._append(cursor.lastrowid, vector, namespace, anchors(question), expires_at, now)
+
+    async def get_or_generate(self, namespace: str, question: str, generate: Callable[[], Awaitable[str]],
+                              bypass: bool = False) -> tuple[str, bool]:
+        """(reply, hit). On a miss (or with `bypass`) `generate` runs and its reply is stored."""
+        if not bypass:
+            found = await asyncio.to_thread(self.get, namespace, question)
+            if found is not None:
+                return found[0], True
+        reply = await generate()
+        await asyncio.to_thread(self.put, namespace, question, reply)
+        return reply, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._ids),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+                "embedder": self.embedder.name,
+            }
+
+
+_cache: SemanticCache | None = None
+_cache_loaded = False
+
+
+def get_semantic_cache() -> SemanticCache | None:
+    """The process-wide semantic cache, or None if it is turned off or no embedder is available."""
+    global _cache, _cache_loaded
+    if not _cache_loaded:
+        _cache_loaded = True
+        if SEMANTIC_CACHE_ENABLED and SEMANTIC_CACHE_MAX_ENTRIES > 0:
+            embedder = load_embedder()
+            if embedder is not None:
+                _cache = SemanticCache(embedder)
+    return _cache
@@ -0,0 +1,79 @@
+# semantic_cache_check.py
+"""
+Paraphrase and contrast pairs for the semantic cache. Each pair stores the
+first question in a fresh cache (temporary database) and looks up the
+second: paraphrases must hit, contrasts (different parties, roles, targets,
+sections or acts) must miss. Run it before turning SEMANTIC_CACHE on and after
+changing the embedder, the threshold or the anchors:
+
+    python semantic_cache_check.py [--embedder hashing] [--threshold 0.88]
+
+Exits non-zero if any pair fails.
+"""
+import sys
+import tempfile
+import argparse
+from pathlib import Path
+
+from semantic_cache import SEMANTIC_CACHE_THRESHOLD, SemanticCache, anchors, load_embedder
+
+NAMESPACE = "check"
+
+# (cached question, new question) pairs that must be served from the cache
+PARAPHRASES = [
+    ("What is the punishment for murder under IPC?", "punishment for murder ipc"),
+    ("What is the punishment for murder under IPC?", "What is the sentence for murder under IPC"),
+    ("What is Section 302 IPC?", "Explain section 302 of IPC"),
+    ("How to get anticipatory bail?", "How can I get anticipatory bail"),
+    ("Can a wife claim maintenance from her husband?", "Can the wife claim maintenance from her husband"),
+    ("How to file FIR against my husband", "How do I file an FIR against my husband?"),
+    ("What is the punishment for theft?", "What is the penalty for theft?"),
+    ("Can police arrest without a warrant?", "Can the police arrest me without warrant"),
+]
+
+# Pairs that must NOT be served from the cache: same words, different answer
+CONTRASTS = [
+    ("Can a wife claim maintenance from her husband?", "Can a husband claim maintenance from his wife?"),
+    ("How to file FIR against police", "How to file FIR against my husband"),
+    ("My husband filed an FIR against me", "How to file an FIR against my husband"),
+    ("Can a landlord evict a tenant without notice?", "Can a tenant evict a landlord without notice?"),
+    ("Can my employer deduct my salary?", "Can my employee deduct my salary?"),
+    ("What is the punishment under IPC 302?", "What is the punishment under IPC 307?"),
+    ("Punishment for murder under IPC", "Punishment for murder under BNS"),
+    ("What is anticipatory bail?", "How to apply for anticipatory bail?"),
+    ("Is bail possible for a bailable offence?", "Is bail possible for a non-bailable offence?"),
+    ("Can a landlord evict a tenant with notice?", "Can a landlord evict a tenant without notice?"),
+]
+
+
+def run(embedder_name: str, threshold: float) -> bool:
+    embedder = load_embedder(embedder_name)
+    if embedder is None:
+        print(f"Embedder '{embedder_name}' is not available")
+        return False
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for expect_hit, pairs in ((True, PARAPHRASES), (False, CONTRASTS)):
+            for cached, asked in pairs:
+                cache = SemanticCache(embedder, db_path=Path(tmp) / f"check_{failures}_{id(cached)}.db",
+                                      threshold=threshold)
+                cache.put(NAMESPACE, cached, "reply")
+                similarity = float(cache._vectors[0] @ embedder.embed(asked))
+                hit = cache.get(NAMESPACE, asked) is not None
+                ok = hit == expect_hit
+                failures += not ok
+                kind = "paraphrase" if expect_hit else "contrast"
+                print(f"{'PASS' if ok else 'FAIL'}  {kind:10s} cos={similarity:.2f}  {'hit ' if hit else 'miss'}  "
+                      f"{cached!r} / {asked!r}  anchors {anchors(cached)!r} / {anchors(asked)!r}")
+                cache._conn.close()
+    total = len(PARAPHRASES) + len(CONTRASTS)
+    print(f"{total - failures}/{total} pairs behave as expected ({embedder.name}, threshold {threshold})")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedder", default="hashing")
+    parser.add_argument("--threshold", type=float, default=SEMANTIC_CACHE_THRESHOLD)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.embedder, args.threshold) else 1)
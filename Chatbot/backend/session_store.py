@@ -0,0 +1,271 @@
+# session_store.py
+"""
+Chat session storage.
+
+Two interchangeable backends are provided:
+  - SqliteSessionStore (default): a WAL-mode SQLite database with a `sessions`
+    table (id, timestamps, message_count, preview) and an append-only
+    `messages` table, so listing is one indexed query and a turn is a
+    constant-size insert.
+  - JsonSessionStore: the original one-JSON-file-per-session layout.
+
+Select with CHAT_STORE=sqlite|json. Existing JSON sessions can be imported
+once with:  python session_store.py migrate
+"""
+import os
+import sys
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parent
+CHAT_HISTORY_DIR = BASE_DIR / "chat_history"
+CHAT_DB_PATH = Path(os.getenv("CHAT_DB_PATH", str(BASE_DIR / "chat_history.db")))
+PREVIEW_LENGTH = 100
+
+
+def _preview(messages: List[dict]) -> str | None:
+    for msg in messages:
+        if msg.get("role") == "user":
+            return msg.get("content", "")[:PREVIEW_LENGTH]
+    return None
+
+
+class JsonSessionStore:
+    """One `<session_id>.json` file per session, rewritten on every turn."""
+
+    def __init__(self, directory: Path = CHAT_HISTORY_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, session_id: str) -> Path:
+        return self.directory / f"{session_id}.json"
+
+    def exists(self, session_id: str) -> bool:
+        return self._path(session_id).exists()
+
+    def append_turn(self, session_id: str, messages: List[dict], history: List[dict] = ()):
+        now = datetime.now().isoformat()
+        chat_data = self.get_session(session_id) or {
+            "session_id": session_id,
+            "timestamp": now,
+            "conversation": list(history),
+        }
+        chat_data["last_updated"] = now
+        chat_data["conversation"] = chat_data.get("conversation", []) + list(messages)
+        with open(self._path(session_id), "w", encoding="utf-8") as f:
+            json.dump(chat_data, f, indent=2, ensure_ascii=False)
+
+    def get_session(self, session_id: str) -> dict | None:
+        path = self._path(session_id)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_context(self, session_id: str) -> tuple[str | None, int, List[dict]]:
+        """Return (rolling summary, number of messages it covers, messages after those)."""
+        chat_data = self.get_session(session_id) or {}
+        summarized = chat_data.get("summarized_count", 0)
+        return chat_data.get("summary"), summarized, chat_data.get("conversation", [])[summarized:]
+
+    def set_summary(self, session_id: str, summary: str, summarized_count: int):
+        chat_data = self.get_session(session_id)
+        if chat_data is None:
+            return
+        chat_data["summary"] = summary
+        chat_data["summarized_count"] = summarized_count
+        with open(self._path(session_id), "w", encoding="utf-8") as f:
+            json.dump(chat_data, f, indent=2, ensure_ascii=False)
+
+    def list_sessions(self) -> List[dict]:
+        sessions = []
+        for history_file in self.directory.glob("*.json"):
+            try:
+                with open(history_file, "r", encoding="utf-8") as f:
+                    chat_data = json.load(f)
+            except Exception as e:
+                logging.error(f"Error reading session file {history_file}: {str(e)}")
+                continue
+            conversation = chat_data.get("conversation", [])
+            sessions.append({
+                "session_id": chat_data.get("session_id"),
+                "timestamp": chat_data.get("timestamp"),
+                "last_updated": chat_data.get("last_updated"),
+                "message_count": len(conversation),
+                "preview": _preview(conversation) or "No messages",
+            })
+        sessions.sort(key=lambda x: x.get("last_updated") or "", reverse=True)
+        return sessions
+
+
+class SqliteSessionStore:
+    """Sessions and messages in SQLite (WAL). One connection per thread."""
+
+    def __init__(self, db_path: Path = CHAT_DB_PATH):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            last_updated TEXT NOT NULL,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            preview TEXT,
+            summary TEXT,
+            summarized_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_last_updated ON sessions(last_updated DESC);
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL REFERENCES sessions(id),
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+        """)
+        # Databases created before rolling summaries were added
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "summary" not in columns:
+            with conn:
+                conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT")
+                conn.execute("ALTER TABLE sessions ADD COLUMN summarized_count INTEGER NOT NULL DEFAULT 0")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def exists(self, session_id: str) -> bool:
+        row = self._conn().execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row is not None
+
+    def append_turn(self, session_id: str, messages: List[dict], history: List[dict] = (),
+                    timestamp: str | None = None, created_at: str | None = None):
+        """
+        Append `messages` to a session. `history` is only written when the
+        session does not exist yet (e.g. a conversation started elsewhere).
+        """
+        now = timestamp or datetime.now().isoformat()
+        conn = self._conn()
+        with conn:
+            created = conn.execute(
+                "INSERT OR IGNORE INTO sessions (id, created_at, last_updated) VALUES (?, ?, ?)",
+                (session_id, created_at or now, now),
+            ).rowcount
+            to_insert = (list(history) if created else []) + list(messages)
+            conn.executemany(
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                [(session_id, m.get("role", ""), m.get("content", ""), now) for m in to_insert],
+            )
+            conn.execute(
+                "UPDATE sessions SET last_updated = ?, message_count = message_count + ?, "
+                "preview = COALESCE(preview, ?) WHERE id = ?",
+                (now, len(to_insert), _preview(to_insert), session_id),
+            )
+
+    def get_session(self, session_id: str) -> dict | None:
+        conn = self._conn()
+        session = conn.execute(
+            "SELECT id, created_at, last_updated FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if session is None:
+            return None
+        rows = conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+        ).fetchall()
+        return {
+            "session_id": session["id"],
+            "timestamp": session["created_at"],
+            "last_updated": session["last_updated"],
+            "conversation": [{"role": r["role"], "content": r["content"]} for r in rows],
+        }
+
+    def get_context(self, session_id: str) -> tuple[str | None, int, List[dict]]:
+        """Return (rolling summary, number of messages it covers, messages after those)."""
+        conn = self._conn()
+        session = conn.execute(
+            "SELECT summary, summarized_count FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if session is None:
+            return None, 0, []
+        rows = conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id LIMIT -1 OFFSET ?",
+            (session_id, session["summarized_count"]),
+        ).fetchall()
+        return session["summary"], session["summarized_count"], [{"role": r["role"], "content": r["content"]} for r in rows]
+
+    def set_summary(self, session_id: str, summary: str, summarized_count: int):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE sessions SET summary = ?, summarized_count = ? WHERE id = ?",
+                (summary, summarized_count, session_id),
+            )
+
+    def list_sessions(self) -> List[dict]:
+        rows = self._conn().execute(
+            "SELECT id, created_at, last_updated, message_count, preview FROM sessions ORDER BY last_updated DESC"
+        ).fetchall()
+        return [{
+            "session_id": r["id"],
+            "timestamp": r["created_at"],
+            "last_updated": r["last_updated"],
+            "message_count": r["message_count"],
+            "preview": r["preview"] or "No messages",
+        } for r in rows]
+
+
+def migrate_json_dir(store: SqliteSessionStore, directory: Path = CHAT_HISTORY_DIR) -> int:
+    """Import `<session_id>.json` files into `store`. Sessions already present are skipped."""
+    migrated = 0
+    for history_file in sorted(Path(directory).glob("*.json")):
+        try:
+            with open(history_file, "r", encoding="utf-8") as f:
+                chat_data = json.load(f)
+        except Exception as e:
+            logging.error(f"Skipping unreadable session file {history_file}: {str(e)}")
+            continue
+        session_id = chat_data.get("session_id") or history_file.stem
+        if store.exists(session_id):
+            continue
+        store.append_turn(
+            session_id,
+            chat_data.get("conversation", []),
+            timestamp=chat_data.get("last_updated") or chat_data.get("timestamp"),
+            created_at=chat_data.get("timestamp"),
+        )
+        migrated += 1
+    return migrated
+
+
+_store = None
+
+def get_session_store():
+    """Return the process-wide store selected by CHAT_STORE (default: sqlite)."""
+    global _store
+    if _store is None:
+        if os.getenv("CHAT_STORE", "sqlite").lower() == "json":
+            _store = JsonSessionStore()
+        else:
+            _store = SqliteSessionStore()
+    return _store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        logging.basicConfig(level=logging.INFO)
+        count = migrate_json_dir(SqliteSessionStore())
+        print(f"Migrated {count} session(s) from {CHAT_HISTORY_DIR} into {CHAT_DB_PATH}")
+    else:
+        print("Usage: python session_store.py migrate")
@@ -5,6 +5,8 @@ from pathlib import Path
 from docx import Document
 from dotenv import load_dotenv
 from time import sleep
+from template_registry import write_index, INDEX_FILE
+from template_prompts import FIRST_QUESTION_PROMPT
 
 # Load environment variables
 load_dotenv()
@@ -62,6 +64,27 @@ def summarize_template(file_path: Path) -> dict | None:
         print(f"   ❌ Error summarizing {file_path.name}: {e}")
         return None
 
+# Precompute the opening Q&A question so /api/ai/start needs no LLM call for it
+def generate_first_question(file_path: Path) -> str | None:
+    try:
+        doc = Document(file_path)
+        full_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+
+        completion = groq_client.chat.completions.create(
+            model=GROQ_MODEL,
+            messages=[
+                {"role": "system", "content": FIRST_QUESTION_PROMPT},
+                {"role": "user", "content": full_text}
+            ],
+            temperature=0.3,
+            max_tokens=150,
+        )
+        return completion.choices[0].message.content.strip()
+
+    except Exception as e:
+        print(f"   ❌ Error generating first question for {file_path.name}: {e}")
+        return None
+
 # Process a folder like /possession/private
 def process_folder(folder_path: Path):
     print(f"\n📂 Processing folder: {folder_path.relative_to(TEMPLATES_ROOT)}")
@@ -73,16 +96,24 @@ def process_folder(folder_path: Path):
         try:
             with open(metadata_file, "r", encoding="utf-8") as f:
                 for item in json.load(f):
-                    existing_summaries[item["filename"]] = item
+                    # The API stores bare template names; older runs wrote "<name>.docx"
+                    existing_summaries[Path(item["filename"]).stem] = item
         except:
             print("⚠️ Could not read existing metadata, starting fresh.")
 
     updated_metadata = []
 
     for file in folder_path.glob("*.docx"):
-        if file.name in existing_summaries:
-            print(f"   ⏭️ Skipping {file.name} (cached)")
-            updated_metadata.append(existing_summaries[file.name])
+        if file.stem in existing_summaries:
+            item = existing_summaries[file.stem]
+            if not item.get("first_question"):
+                print(f"   ❓ Generating first question for {file.name}")
+                item["first_question"] = generate_first_question(file)
+                sleep(1)  # To respect Groq rate limits
+            else:
+                print(f"   ⏭️ Skipping {file.name} (cached)")
+            item["filename"] = file.stem
+            updated_metadata.append(item)
             continue
 
         print(f"   ✍️ Summarizing {file.name}")
@@ -95,7 +126,8 @@ def process_folder(folder_path: Path):
             updated_metadata.append({
                 "title": title,
                 "summary": summary,
-                "filename": file.name
+                "filename": file.stem,
+                "first_question": generate_first_question(file)
             })
 
             sleep(1)  # To respect Groq rate limits
@@ -117,6 +149,10 @@ def run_all():
                     if subtype.is_dir():
                         process_folder(subtype)
 
+    # Prebuilt registry index so the API server can skip walking the tree on startup
+    index = write_index(TEMPLATES_ROOT)
+    print(f"🗂️ Wrote template index ({len(index['folders'])} folders) → {INDEX_FILE}")
+
 
 if __name__ == "__main__":
     run_all()
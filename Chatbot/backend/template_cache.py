@@ -0,0 +1,98 @@
+# template_cache.py
+"""
+Process-wide LRU cache of parsed DOCX templates.
+
+Entries are keyed by path and validated against the file's (mtime, size), so
+an edited template is re-parsed on the next request while repeated Q&A turns
+on the same template never touch python-docx. Total cached text is capped at
+TEMPLATE_CACHE_BYTES.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from docx import Document
+
+from template_fields import BLANK_PATTERN, extract_fields
+from template_fill import iter_paragraphs
+
+TEMPLATE_CACHE_BYTES = int(os.getenv("TEMPLATE_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# [insert ...] blocks, runs of underscores and dotted blanks (the same blanks extract_fields finds)
+PLACEHOLDER_RE = re.compile(r"\[[^\]]*\]|" + BLANK_PATTERN)
+
+_cache: "OrderedDict[str, tuple[int, int, dict]]" = OrderedDict()
+_cache_bytes = 0
+_hits = 0
+_misses = 0
+_lock = threading.Lock()
+
+
+def _parse(path: Path) -> dict:
+    doc = Document(path)
+    paragraphs = [p.text for p in iter_paragraphs(doc)]
+    text = "\n".join(p for p in paragraphs if p.strip())
+    return {
+        "text": text,
+        "paragraphs": paragraphs,
+        "placeholders": PLACEHOLDER_RE.findall(text),
+        "fields": extract_fields(paragraphs),
+    }
+
+
+def _entry_size(entry: dict) -> int:
+    return (len(entry["text"].encode("utf-8"))
+            + sum(len(p.encode("utf-8")) for p in entry["paragraphs"])
+            + sum(len(p.encode("utf-8")) for p in entry["placeholders"]))
+
+
+def get_template(path: Path) -> dict:
+    """
+    Return {"text", "paragraphs", "placeholders", "fields", "key"} for the DOCX at `path`.
+    `paragraphs` includes table cells in document order (see template_fill.iter_paragraphs),
+    `text` is the non-empty ones joined by newlines and `fields` is the schema from
+    template_fields.extract_fields.
+    """
+    global _cache_bytes, _hits, _misses
+    key = str(Path(path).resolve())
+    stat = os.stat(key)
+
+    with _lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            _cache.move_to_end(key)
+            _hits += 1
+            return cached[2]
+        _misses += 1
+
+    entry = _parse(Path(key))
+    # Identifies this version of the template, e.g. for caches derived from its fields
+    entry["key"] = f"{key}:{stat.st_mtime_ns}:{stat.st_size}"
+    size = _entry_size(entry)
+
+    with _lock:
+        old = _cache.pop(key, None)
+        if old:
+            _cache_bytes -= _entry_size(old[2])
+        if size <= TEMPLATE_CACHE_BYTES:
+            _cache[key] = (stat.st_mtime_ns, stat.st_size, entry)
+            _cache_bytes += size
+            while _cache_bytes > TEMPLATE_CACHE_BYTES:
+                _, (_, _, evicted) = _cache.popitem(last=False)
+                _cache_bytes -= _entry_size(evicted)
+    return entry
+
+
+def cache_stats() -> dict:
+    with _lock:
+        total = _hits + _misses
+        return {
+            "hits": _hits,
+            "misses": _misses,
+            "hit_rate": round(_hits / total, 3) if total else 0.0,
+            "entries": len(_cache),
+            "bytes": _cache_bytes,
+            "max_bytes": TEMPLATE_CACHE_BYTES,
+        }
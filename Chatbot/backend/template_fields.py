@@ -0,0 +1,233 @@
+# template_fields.py
+"""
+Deterministic field extraction and form sessions for the template Q&A loop.
+
+extract_fields() turns a template's paragraphs into a field schema:
+  - "insert":  [insert full name], [Date], ...
+  - "blank":   runs of underscores or dots (Name: ________)
+  - "choice":  [option a / option b] brackets
+  - "options": two or more consecutive list paragraphs such as (a) ... (b) ...
+
+A form session walks those fields in document order and stores the answers
+server-side. The LLM is only used to phrase a field's question (once per
+template field, then cached) and to interpret an answer to a choice that
+cannot be matched locally, so each call sees a single field instead of the
+whole template and conversation.
+"""
+import os
+import re
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import List
+
+import llm_client
+
+FORM_MODEL = os.getenv("FORM_MODEL", "llama-3.1-8b-instant")
+FORM_SESSION_LIMIT = int(os.getenv("FORM_SESSION_LIMIT", "1000"))
+FORM_QUESTION_CACHE_LIMIT = int(os.getenv("FORM_QUESTION_CACHE_LIMIT", "5000"))
+COMPLETE_TOKEN = "__COMPLETE__"
+
+BRACKET_RE = re.compile(r"\[([^\[\]]+)\]")
+# Runs of underscores, dots or ellipses. A single "…" is ordinary prose ("etc…"), not a blank
+BLANK_PATTERN = r"_{3,}|\.{4,}|…{2,}"
+BLANK_RE = re.compile(BLANK_PATTERN)
+LIST_ITEM_RE = re.compile(r"^\s*(?:\(?[a-h]\)|\(?(?:i|ii|iii|iv|v|vi)\)|[•\-–])\s+", re.IGNORECASE)
+SKIP_ANSWERS = frozenset({"skip", "n/a", "na", "none", "not applicable", "-"})
+# Written into the document in place of a field the user skipped (stored as "")
+NOT_PROVIDED = "[not provided]"
+
+
+def _label_before(text: str, end: int) -> str:
+    words = re.sub(r"[\s:;,\-–]+$", "", text[:end]).split()
+    return " ".join(words[-6:])
+
+
+def _label_after(text: str, start: int) -> str:
+    words = re.sub(r"^[\s:;,\-–]+", "", text[start:]).split()
+    return " ".join(words[:6])
+
+
+def _paragraph_fields(index: int, text: str, previous: str = "") -> List[dict]:
+    fields = []
+    spans = []
+    for m in BRACKET_RE.finditer(text):
+        content = m.group(1).strip()
+        lowered = content.lower()
+        if "/" in content and not lowered.startswith("insert"):
+            options = [o.strip() for o in content.split("/") if o.strip()]
+            if len(options) >= 2:
+                fields.append({"kind": "choice", "label": _label_before(text, m.start()) or "Choose one",
+                               "options": options, "match": m.group(0), "paragraph": index, "start": m.start()})
+                spans.append((m.start(), m.end()))
+                continue
+        label = re.sub(r"^insert\s+(?:the\s+)?", "", content, flags=re.IGNORECASE)
+        fields.append({"kind": "insert", "label": label, "match": m.group(0), "paragraph": index, "start": m.start()})
+        spans.append((m.start(), m.end()))
+
+    for m in BLANK_RE.finditer(text):
+        if any(s <= m.start() < e for s, e in spans):
+            continue
+        # A blank alone in a table cell is usually labelled by the cell before it
+        label = (_label_before(text, m.start()) or _label_after(text, m.end())
+                 or _label_after(previous, 0) or f"blank in paragraph {index + 1}")
+        fields.append({"kind": "blank", "label": label, "match": m.group(0), "paragraph": index, "start": m.start()})
+
+    fields.sort(key=lambda f: f["start"])
+    return fields
+
+
+def extract_fields(paragraphs: List[str]) -> List[dict]:
+    """Build the field schema for a template from its paragraph texts (empty ones included)."""
+    fields = []
+    previous = ""
+    i = 0
+    while i < len(paragraphs):
+        # Only the first item of a list starts an options field
+        if LIST_ITEM_RE.match(paragraphs[i]) and not LIST_ITEM_RE.match(previous):
+            j = i
+            while j < len(paragraphs) and LIST_ITEM_RE.match(paragraphs[j]):
+                j += 1
+            if j - i >= 2:
+                fields.append({"kind": "options", "label": previous.strip()[:160] or "Choose the option that applies",
+                               "options": [p.strip() for p in paragraphs[i:j]], "paragraphs": list(range(i, j)),
+                               "paragraph": i, "start": 0})
+        fields.extend(_paragraph_fields(i, paragraphs[i], previous))
+        if paragraphs[i].strip():
+            previous = paragraphs[i]
+        i += 1
+
+    for n, field in enumerate(fields, start=1):
+        field["id"] = f"f{n}"
+        field["context"] = paragraphs[field["paragraph"]].strip()[:200]
+    return fields
+
+
+def match_option(answer: str, options: List[str]) -> int | None:
+    """Resolve an answer such as "b", "2" or part of an option's text to an option index."""
+    a = answer.strip().lower().strip(".)( ")
+    if len(a) == 1 and "a" <= a <= "z" and ord(a) - ord("a") < len(options):
+        return ord(a) - ord("a")
+    if a.isdigit() and 1 <= int(a) <= len(options):
+        return int(a) - 1
+    if not a:
+        return None
+    hits = [i for i, o in enumerate(options) if a in LIST_ITEM_RE.sub("", o).lower()]
+    return hits[0] if len(hits) == 1 else None
+
+
+class FormSessions:
+    """In-memory form sessions, least recently used evicted beyond FORM_SESSION_LIMIT."""
+
+    def __init__(self, limit: int = FORM_SESSION_LIMIT):
+        self.limit = limit
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, template_key: str, fields: List[dict]) -> tuple[str, dict]:
+        session_id = str(uuid.uuid4())
+        state = {"template": template_key, "fields": fields, "values": {}, "index": 0}
+        with self._lock:
+            self._sessions[session_id] = state
+            while len(self._sessions) > self.limit:
+                self._sessions.popitem(last=False)
+        return session_id, state
+
+    def get(self, session_id: str | None) -> dict | None:
+        if not session_id:
+            return None
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is not None:
+                self._sessions.move_to_end(session_id)
+            return state
+
+
+form_sessions = FormSessions()
+# Phrased questions by (template, field id), least recently used evicted beyond FORM_QUESTION_CACHE_LIMIT
+_question_cache = OrderedDict()
+
+
+def options_text(options: List[str]) -> str:
+    return "\n".join(f"{chr(ord('a') + i)}) {LIST_ITEM_RE.sub('', o)}" for i, o in enumerate(options))
+
+
+async def phrase_question(template_key: str, field: dict) -> str:
+    """A question for one field. Choice questions are built locally; others are phrased once by the LLM."""
+    if field["kind"] in ("choice", "options"):
+        return f"{field['label']}\nWhich of these applies?\n{options_text(field['options'])}"
+
+    cache_key = (template_key, field["id"])
+    if cache_key in _question_cache:
+        _question_cache.move_to_end(cache_key)
+        return _question_cache[cache_key]
+
+    question = f"Please provide: {field['label']}"
+    try:
+        response = await llm_client.chat_completion(
+            model=FORM_MODEL,
+            messages=[
+                {"role": "system", "content": "You help a user fill in a legal document. Ask ONE short, clear question that asks for exactly the requested detail. Output only the question."},
+                {"role": "user", "content": f"Detail needed: {field['label']}\nWhere it appears: {field.get('context', '')}"},
+            ],
+            temperature=0.3,
+            max_tokens=60,
+        )
+        question = response.choices[0].message.content.strip() or question
+        _question_cache[cache_key] = question
+        while len(_question_cache) > FORM_QUESTION_CACHE_LIMIT:
+            _question_cache.popitem(last=False)
+    except Exception as e:
+        logging.warning(f"Could not phrase question for {field['id']}: {str(e)}")
+    return question
+
+
+async def interpret_choice(field: dict, answer: str) -> int | None:
+    """Ask the LLM which option an ambiguous answer refers to."""
+    try:
+        response = await llm_client.chat_completion(
+            model=FORM_MODEL,
+            messages=[
+                {"role": "system", "content": "Map the user's answer to one of the options. Reply with only the option letter, or NONE if it matches none."},
+                {"role": "user", "content": f"Question: {field['label']}\nOptions:\n{options_text(field['options'])}\n\nAnswer: {answer}"},
+            ],
+            temperature=0,
+            max_tokens=5,
+        )
+        reply = response.choices[0].message.content.strip()
+        return None if reply.upper().startswith("NONE") else match_option(reply, field["options"])
+    except Exception as e:
+        logging.warning(f"Could not interpret answer for {field['id']}: {str(e)}")
+        return None
+
+
+async def record_answer(state: dict, answer: str) -> str | None:
+    """Store `answer` for the current field. Returns a follow-up question if it could not be used."""
+    if state["index"] >= len(state["fields"]):
+        return None
+    field = state["fields"][state["index"]]
+    answer = answer.strip()
+
+    if field["kind"] in ("choice", "options"):
+        choice = match_option(answer, field["options"])
+        if choice is None and answer:
+            choice = await interpret_choice(field, answer)
+        if choice is None:
+            return f"Sorry, I couldn't tell which option you meant. Please reply with the letter.\n{options_text(field['options'])}"
+        state["values"][field["id"]] = field["options"][choice]
+    else:
+        if not answer:
+            return await phrase_question(state["template"], field)
+        state["values"][field["id"]] = "" if answer.lower() in SKIP_ANSWERS else answer
+
+    state["index"] += 1
+    return None
+
+
+async def next_question(state: dict) -> str:
+    """The question for the next unfilled field, or COMPLETE_TOKEN when every field has a value."""
+    if state["index"] >= len(state["fields"]):
+        return COMPLETE_TOKEN
+    return await phrase_question(state["template"], state["fields"][state["index"]])
+
@@ -0,0 +1,121 @@
+# template_fill.py
+"""
+In-place filling of DOCX templates.
+
+Values are written into the template's existing runs, so fonts, numbering,
+tables and page layout survive. Fields come from template_fields.extract_fields
+over iter_paragraphs(), which walks body paragraphs and table cells in
+document order; the same walk is used here so field paragraph indices line up.
+"""
+import io
+from typing import Iterator, List
+
+from docx import Document
+from docx.oxml.ns import qn
+from docx.table import Table, _Cell
+from docx.text.paragraph import Paragraph
+
+from template_fields import NOT_PROVIDED, match_option
+
+
+def _iter_block(parent_element, parent) -> Iterator[Paragraph]:
+    for child in parent_element.iterchildren():
+        if child.tag == qn("w:p"):
+            yield Paragraph(child, parent)
+        elif child.tag == qn("w:tbl"):
+            table = Table(child, parent)
+            for row in table.rows:
+                seen = set()
+                for cell in row.cells:
+                    # Merged cells are returned once per grid column they span
+                    if id(cell._tc) in seen:
+                        continue
+                    seen.add(id(cell._tc))
+                    yield from _iter_block(cell._tc, cell)
+
+
+def iter_paragraphs(doc) -> Iterator[Paragraph]:
+    """Every paragraph of the document body, including those inside (nested) tables, in document order."""
+    yield from _iter_block(doc.element.body, doc)
+
+
+def _replace_span(paragraph: Paragraph, start: int, end: int, value: str):
+    """Replace characters [start, end) of the paragraph's run text, keeping the first run's formatting."""
+    pos = 0
+    for run in paragraph.runs:
+        text = run.text
+        run_start, run_end = pos, pos + len(text)
+        pos = run_end
+        if run_end <= start or run_start >= end:
+            continue
+        head = text[:max(start - run_start, 0)]
+        tail = text[min(end, run_end) - run_start:]
+        if run_start <= start:
+            run.text = head + value + tail
+        else:
+            run.text = tail
+
+
+def _fill_paragraph(paragraph: Paragraph, replacements: List[tuple]):
+    """Apply (start_hint, match, value) replacements, right to left so earlier offsets stay valid."""
+    text = "".join(r.text for r in paragraph.runs)
+    for hint, match, value in sorted(replacements, key=lambda r: r[0], reverse=True):
+        # Offsets come from paragraph.text, which may include hyperlink text the runs do not
+        candidates = [i for i in range(len(text)) if text.startswith(match, i)]
+        if not candidates:
+            continue
+        start = min(candidates, key=lambda i: abs(i - hint))
+        _replace_span(paragraph, start, start + len(match), value)
+        text = text[:start] + value + text[start + len(match):]
+
+
+def _remove(paragraph: Paragraph):
+    element = paragraph._element
+    element.getparent().remove(element)
+
+
+def fill_document(path, fields: List[dict], values: dict) -> io.BytesIO:
+    """
+    Fill the template at `path` with `values` ({field id: value}) and return the .docx bytes.
+    Fields without a value keep their placeholder so the user can see what is still missing;
+    fields answered with "" (skipped) get NOT_PROVIDED instead of a raw placeholder.
+    For option lists only the chosen option's paragraph is kept.
+    """
+    doc = Document(path)
+    paragraphs = list(iter_paragraphs(doc))
+    replacements = {}
+    removals = []
+
+    for field in fields:
+        value = values.get(field["id"])
+        if value is None:
+            continue
+        value = str(value).strip()
+        if not value:
+            # A skipped option list keeps every option; anything else is marked as not provided
+            if field["kind"] == "options":
+                continue
+            value = NOT_PROVIDED
+        if field["kind"] in ("choice", "options"):
+            # Values may be the option text (form sessions) or a letter (LLM mapping)
+            options = field["options"]
+            choice = options.index(value) if value in options else match_option(value, options)
+            if field["kind"] == "options":
+                if choice is not None:
+                    removals.extend(i for n, i in enumerate(field["paragraphs"]) if n != choice)
+                continue
+            if choice is not None:
+                value = options[choice]
+        replacements.setdefault(field["paragraph"], []).append((field["start"], field["match"], value))
+
+    for index, items in replacements.items():
+        if index < len(paragraphs):
+            _fill_paragraph(paragraphs[index], items)
+    for index in sorted(set(removals), reverse=True):
+        if index < len(paragraphs):
+            _remove(paragraphs[index])
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    buf.seek(0)
+    return buf
@@ -0,0 +1,174 @@
+# template_registry.py
+"""
+In-memory registry of the templates tree.
+
+The tree under TEMPLATES_DIR is scanned once (or read from the compact
+templates/index.json written by summarize_templates.py) into plain dicts:
+category -> subtypes, folder -> parsed metadata.json, and folder -> template
+name -> docx path + SHA-256. Request handlers then only do dictionary reads.
+
+Set TEMPLATE_RELOAD_SECONDS to a positive number to poll the tree and rebuild
+the registry when a template or metadata file changes.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+INDEX_FILE = TEMPLATES_DIR / "index.json"
+INDEX_VERSION = 1
+TEMPLATE_RELOAD_SECONDS = float(os.getenv("TEMPLATE_RELOAD_SECONDS", "0"))
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _scan_folder(folder: Path, root: Path) -> dict:
+    info = {"metadata": None, "metadata_error": None, "templates": {}}
+    metadata_file = folder / "metadata.json"
+    if metadata_file.exists():
+        try:
+            with open(metadata_file, "r", encoding="utf-8") as f:
+                info["metadata"] = json.load(f)
+        except json.JSONDecodeError:
+            logging.error(f"Failed to decode JSON from {metadata_file}")
+            info["metadata_error"] = "metadata.json is not a valid JSON file"
+    for docx in sorted(folder.glob("*.docx")):
+        info["templates"][docx.stem] = {
+            "path": docx.relative_to(root).as_posix(),
+            "sha256": _sha256(docx),
+        }
+    return info
+
+
+def _has_templates(folder: Path) -> bool:
+    return (folder / "metadata.json").exists() or any(folder.glob("*.docx"))
+
+
+def build_index(root: Path = TEMPLATES_DIR) -> dict:
+    """Walk `root` and return the registry as a JSON-serialisable dict."""
+    categories = {}
+    folders = {}
+    if root.exists():
+        for cat in sorted(root.iterdir()):
+            if not cat.is_dir():
+                continue
+            subtypes = [sub.name for sub in sorted(cat.iterdir()) if sub.is_dir() and _has_templates(sub)]
+            if subtypes or _has_templates(cat):
+                categories[cat.name] = subtypes
+                folders[cat.name] = _scan_folder(cat, root)
+                for sub in subtypes:
+                    folders[f"{cat.name}/{sub}"] = _scan_folder(cat / sub, root)
+    return {
+        "version": INDEX_VERSION,
+        "signature": tree_signature(root),
+        "categories": categories,
+        "folders": folders,
+    }
+
+
+def write_index(root: Path = TEMPLATES_DIR, index_file: Path = INDEX_FILE) -> dict:
+    index = build_index(root)
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    return index
+
+
+def tree_signature(root: Path = TEMPLATES_DIR) -> str:
+    """Cheap fingerprint of the tree: names, sizes and mtimes of templates and metadata files."""
+    h = hashlib.sha256()
+    if root.exists():
+        for path in sorted(root.rglob("*")):
+            if path.suffix in (".docx", ".json") and path.name != INDEX_FILE.name:
+                stat = path.stat()
+                h.update(f"{path.relative_to(root).as_posix()}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return h.hexdigest()
+
+
+class TemplateRegistry:
+
+    def __init__(self, root: Path = TEMPLATES_DIR, index_file: Path = INDEX_FILE):
+        self.root = root
+        self.index_file = index_file
+        self._index = self._load()
+
+    def _load(self) -> dict:
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                if index.get("version") == INDEX_VERSION and index.get("signature") == tree_signature(self.root):
+                    logging.info(f"Loaded template index from {self.index_file}")
+                    return index
+                logging.info("Template index is stale, rebuilding from the tree")
+            except json.JSONDecodeError:
+                logging.warning(f"Ignoring unreadable template index {self.index_file}")
+        return build_index(self.root)
+
+    def reload(self):
+        self._index = build_index(self.root)
+        logging.info("Template registry reloaded")
+
+    def start_polling(self, interval: float = TEMPLATE_RELOAD_SECONDS):
+        """Rebuild the registry in a background thread whenever the tree changes."""
+        if interval <= 0:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    if tree_signature(self.root) != self._index.get("signature"):
+                        self.reload()
+                except Exception as e:
+                    logging.error(f"Template registry reload failed: {str(e)}")
+
+        threading.Thread(target=poll, name="template-registry-poll", daemon=True).start()
+
+    @staticmethod
+    def _folder_key(category: str, subtype: str | None = None) -> str:
+        return f"{category}/{subtype}" if subtype else category
+
+    def categories(self) -> dict:
+        return self._index["categories"]
+
+    def folder(self, category: str, subtype: str | None = None) -> dict | None:
+        return self._index["folders"].get(self._folder_key(category, subtype))
+
+    def template_names(self, category: str, subtype: str | None = None) -> list:
+        folder = self.folder(category, subtype)
+        return [f"{name}.docx" for name in folder["templates"]] if folder else []
+
+    def docx_path(self, category: str, subtype: str | None, filename: str) -> Path | None:
+        """Resolve a template filename (with or without .docx) to its path, or None if unknown."""
+        folder = self.folder(category, subtype)
+        if not folder:
+            return None
+        name = filename[:-5] if filename.endswith(".docx") else filename
+        entry = folder["templates"].get(name)
+        return self.root / entry["path"] if entry else None
+
+    def content_hash(self, category: str, subtype: str | None, filename: str) -> str | None:
+        folder = self.folder(category, subtype)
+        name = filename[:-5] if filename.endswith(".docx") else filename
+        entry = folder["templates"].get(name) if folder else None
+        return entry["sha256"] if entry else None
+
+
+_registry = None
+
+def get_registry() -> TemplateRegistry:
+    global _registry
+    if _registry is None:
+        _registry = TemplateRegistry()
+        _registry.start_polling()
+    return _registry
@@ -0,0 +1,94 @@
+# template_selector.py
+"""
+Local template selection for /api/ai/start.
+
+Templates are ranked against the user's description with BM25 over each
+template's title and summary from metadata.json. When the best match clearly
+beats the runner-up the LLM selection call is skipped; otherwise the caller
+falls back to the LLM and maps its free-text reply back to a template.
+"""
+import os
+import re
+import math
+from collections import Counter
+from typing import List
+
+TEMPLATE_SELECT_MARGIN = float(os.getenv("TEMPLATE_SELECT_MARGIN", "1.3"))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i in is it its me my of on or our so that the their them
+this to was we were will with you your am been being do does did can could would should not no
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(w) for w in _TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def _document(template: dict) -> List[str]:
+    name = template.get("filename", "").replace("_", " ")
+    return tokenize(f"{template.get('title', '')} {template.get('summary', '')} {name}")
+
+
+def rank_templates(query: str, templates: List[dict]) -> List[tuple]:
+    """Return [(score, template), ...] sorted best first."""
+    docs = [_document(t) for t in templates]
+    if not docs:
+        return []
+    avg_len = sum(len(d) for d in docs) / len(docs) or 1.0
+    df = Counter(term for d in docs for term in set(d))
+    n = len(docs)
+    query_terms = set(tokenize(query))
+
+    ranked = []
+    for template, doc in zip(templates, docs):
+        tf = Counter(doc)
+        score = 0.0
+        for term in query_terms:
+            if term not in tf:
+                continue
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            freq = tf[term]
+            score += idf * freq * (BM25_K1 + 1) / (freq + BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg_len))
+        ranked.append((score, template))
+    ranked.sort(key=lambda pair: pair[0], reverse=True)
+    return ranked
+
+
+def confident_choice(ranked: List[tuple], margin: float = TEMPLATE_SELECT_MARGIN) -> dict | None:
+    """The top template if it is the only one or beats the runner-up by `margin`, else None."""
+    if len(ranked) == 1:
+        return ranked[0][1]
+    if not ranked or ranked[0][0] <= 0:
+        return None
+    top, second = ranked[0][0], ranked[1][0]
+    if second <= 0 or top / second >= margin:
+        return ranked[0][1]
+    return None
+
+
+def match_filename(reply: str, templates: List[dict]) -> dict | None:
+    """Map an LLM reply to a template, tolerating quotes, a .docx suffix or surrounding text."""
+    cleaned = reply.strip().strip("`'\". ").lower()
+    if cleaned.endswith(".docx"):
+        cleaned = cleaned[:-5]
+    by_name = {t["filename"].strip().lower().replace(".docx", ""): t for t in templates}
+    if cleaned in by_name:
+        return by_name[cleaned]
+    # Longest name first so e.g. "section202_review" wins over "review"
+    for name in sorted(by_name, key=len, reverse=True):
+        if name in cleaned:
+            return by_name[name]
+    return None
@@ -0,0 +1,133 @@
+# vision_benchmark.py
+"""
+Benchmark for vision-model payloads in /api/analyze.
+
+Each sample image is analysed twice through the chatbot app with local OCR
+off: once sending the upload unchanged (VISION_PREPROCESS=0) and once after
+image_prep's greyscale / resize / re-encode / tiling stage. The stub Groq
+server sleeps for the time the request body would take over an
+UPLINK_MBPS connection, plus a fixed per-image cost, so end-to-end latency
+reflects payload size.
+
+Without arguments it generates synthetic document photos (a 12 MP phone
+photo, an A4 300 dpi PNG scan, a long receipt). Pass image paths to
+benchmark real photos instead.
+
+Usage: python vision_benchmark.py [image ...]
+"""
+import os
+import io
+import sys
+import time
+import random
+import asyncio
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from PIL import Image, ImageDraw, ImageFilter
+
+STUB_PORT = 8768
+UPLINK_MBPS = float(os.getenv("UPLINK_MBPS", "20"))
+PER_IMAGE_SECONDS = 0.4
+
+stub = FastAPI()
+# Size of the most recent vision request
+last_request = {"bytes": 0, "images": 0}
+
+@stub.post("/openai/v1/chat/completions")
+async def fake_completion(request: Request):
+    body = await request.body()
+    # "image_url" appears twice per image: as the part type and as its key
+    images = body.count(b'"image_url"') // 2
+    if images:
+        last_request.update(bytes=len(body), images=images)
+    await asyncio.sleep(len(body) * 8 / (UPLINK_MBPS * 1_000_000) + PER_IMAGE_SECONDS * images)
+    content = "NOTICE under Section 138 of the Negotiable Instruments Act" if images else '{"document_type": "Legal Notice"}'
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+def run_stub():
+    uvicorn.run(stub, host="127.0.0.1", port=STUB_PORT, log_level="warning")
+
+def synthetic_page(size: tuple, fmt: str, noise: bool) -> bytes:
+    """A page of text lines on off-white paper; `noise` adds sensor grain and blur like a phone photo."""
+    rng = random.Random(size[0] * size[1])
+    image = Image.new("RGB", size, (236, 230, 218))
+    draw = ImageDraw.Draw(image)
+    line_height = max(12, size[0] // 60)
+    for y in range(line_height * 3, size[1] - line_height * 3, line_height * 2):
+        x = line_height * 3
+        while x < size[0] - line_height * 8:
+            word = rng.randint(2, 8) * line_height // 2
+            draw.rectangle((x, y, x + word, y + line_height), fill=(40, 40, 48))
+            x += word + line_height
+    if noise:
+        grain = Image.effect_noise(size, 40).convert("RGB")
+        image = Image.blend(image, grain, 0.15).filter(ImageFilter.GaussianBlur(1))
+    buf = io.BytesIO()
+    image.save(buf, format=fmt, quality=95) if fmt == "JPEG" else image.save(buf, format=fmt)
+    return buf.getvalue()
+
+def samples() -> list:
+    if len(sys.argv) > 1:
+        return [(Path(p).name, Path(p).read_bytes()) for p in sys.argv[1:]]
+    return [
+        ("phone_photo_12mp.jpg", synthetic_page((4032, 3024), "JPEG", noise=True)),
+        ("a4_scan_300dpi.png", synthetic_page((2480, 3508), "PNG", noise=False)),
+        ("long_receipt.jpg", synthetic_page((1200, 5200), "JPEG", noise=True)),
+    ]
+
+async def run_case(chatbot, name: str, data: bytes, preprocess: bool, scratch: Path):
+    import image_prep
+    from analysis_cache import AnalysisCache
+    # Worker processes pick the setting up when the pool is recreated (module state on fork, env on spawn)
+    os.environ["VISION_PREPROCESS"] = "1" if preprocess else "0"
+    image_prep.VISION_PREPROCESS = preprocess
+    chatbot.extraction_pool.shutdown()
+    chatbot.analysis_cache = AnalysisCache(scratch / f"{name}_{int(preprocess)}.db")
+
+    transport = httpx.ASGITransport(app=chatbot.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=600) as client:
+        start = time.perf_counter()
+        response = await client.post("/api/analyze", files={"file": (name, data, "image/jpeg")})
+        elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    label = "prepared" if preprocess else "raw"
+    print(f"  {label:8s} payload={last_request['bytes'] / 1e6:7.2f} MB  images={last_request['images']}  latency={elapsed:6.2f}s")
+
+async def main():
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}"
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    # Force the vision path and keep benchmark data out of the real databases
+    os.environ["OCR_ENGINE"] = "none"
+    scratch = Path(tempfile.mkdtemp())
+    os.environ["CHAT_DB_PATH"] = str(scratch / "bench_chat.db")
+    os.environ["ANALYSIS_CACHE_PATH"] = str(scratch / "bench_analysis.db")
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import main as chatbot
+    logging.getLogger().setLevel(logging.WARNING)
+
+    try:
+        for name, data in samples():
+            with Image.open(io.BytesIO(data)) as image:
+                print(f"{name}: {image.size[0]}x{image.size[1]}, {len(data) / 1e6:.2f} MB upload (uplink {UPLINK_MBPS:g} Mbit/s)")
+            await run_case(chatbot, name, data, preprocess=False, scratch=scratch)
+            await run_case(chatbot, name, data, preprocess=True, scratch=scratch)
+    finally:
+        chatbot.extraction_pool.shutdown()
+
+if __name__ == "__main__":
+    threading.Thread(target=run_stub, daemon=True).start()
+    time.sleep(1)
+    asyncio.run(main())